@@ -5,6 +5,11 @@ This module provides functionality to interact with Google Cloud Document AI
 for processing documents like PDFs and extracting structured information.
 """
 
-from .document_processor import DocumentAIProcessor
+try:
+    from .document_processor import DocumentAIProcessor
+except ImportError:
+    # Imported as a top-level module (the directory name is not a valid
+    # package name), e.g. during test collection
+    from document_processor import DocumentAIProcessor
 
 __all__ = ['DocumentAIProcessor'] 
\ No newline at end of file
@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Admission Form Ingestion to Application Drafts
+
+Paper and scanned enrollment forms (use case 5 in docs/USE_CASES.md) are
+read with a Form Parser processor. The key/value pairs and their confidences
+are mapped through the field schema of the applied-for `Program`, then
+validated and normalized, and each form becomes a DRAFT `Application` (see
+modules/admissions/types) with its form data attached for review.
+
+Forms are ingested through the durable job queue (job_queue.py), so a run
+can be stopped and restarted without reprocessing finished forms, and
+several workers drain the queue concurrently. Each batch of forms, and
+the run as a whole, reports its throughput and how many fields fell below
+the confidence threshold or failed validation. Drafts are exported in bulk as NDJSON, one line per form, and
+each is checked for resubmissions by the same applicant (record_linkage.py).
+
+Catalog file format (JSON):
+
+    {
+      "program_field": ["program", "programme", "course applied for"],
+      "default_fields": {
+        "full_name": {"labels": ["name", "applicant name"], "type": "string", "required": true},
+        "email": {"labels": ["e-mail"], "type": "email", "required": true},
+        "date_of_birth": {"labels": ["dob"], "type": "date"}
+      },
+      "programs": [
+        {"id": "prog-cs", "name": "Computer Science", ...Program fields...,
+         "fields": {"gpa": {"type": "number", "min": 0, "max": 4, "required": true}}}
+      ]
+    }
+
+Field types: string, email, phone, date, number, choice (with "choices") and
+checkbox. A field is matched by its key (underscores read as spaces) or any
+of its labels, compared case- and punctuation-insensitively. A field named
+"userId" fills Application.userId; otherwise the applicant is identified by
+a stable ID derived from the email address, or from name and date of birth.
+Application.id is derived from the form's content (the same digest the job
+queue uses as job ID), so reprocessing a form keeps its ID while a second
+form from the same applicant gets an ID of its own.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from common import parse_date
+from job_queue import JobQueue, run_worker
+from record_linkage import ApplicantIndex
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[a-z]{2,}$", re.IGNORECASE)
+_CHECKED = "filled_checkbox"
+USER_ID = "userId"
+# Ingestor counts reported per batch and per run
+_REPORT_COUNTS = ("low_confidence_fields", "invalid_fields", "forms_needing_review", "unknown_program")
+
+
+def normalize_label(label: str) -> str:
+    """
+    Normalize a form label for matching.
+
+    Args:
+        label: Field label as printed on the form or written in a schema
+
+    Returns:
+        Lowercase words separated by single spaces
+    """
+    return " ".join(_NON_WORD.sub(" ", label.lower()).split())
+
+
+def normalize_value(value: str, spec: Dict[str, Any], value_type: str = "") -> Tuple[Any, Optional[str]]:
+    """
+    Validate and normalize one field value against its schema entry.
+
+    Args:
+        value: Text read from the form
+        spec: Field schema (type and type-specific options)
+        value_type: Form Parser value type, e.g. 'filled_checkbox'
+
+    Returns:
+        (normalized value, problem) where problem is None for valid values
+    """
+    kind = spec.get("type", "string")
+    text = " ".join(value.split())
+    if kind == "checkbox":
+        return value_type == _CHECKED or normalize_label(text) in ("yes", "x", "true", "checked"), None
+    if not text:
+        return None, "missing"
+    if kind == "email":
+        email = text.replace(" ", "").lower()
+        return (email, None) if _EMAIL.match(email) else (email, "invalid email")
+    if kind == "phone":
+        digits = re.sub(r"\D", "", text)
+        if not 7 <= len(digits) <= 15:
+            return text, "invalid phone number"
+        return ("+" if text.startswith("+") else "") + digits, None
+    if kind == "date":
+        parsed = parse_date(text, spec.get("day_first", True))
+        return (parsed, None) if parsed else (text, "invalid date")
+    if kind == "number":
+        try:
+            number = float(text.replace(",", "").replace(" ", ""))
+        except ValueError:
+            return text, "not a number"
+        if ("min" in spec and number < spec["min"]) or ("max" in spec and number > spec["max"]):
+            return number, "out of range"
+        return number, None
+    if kind == "choice":
+        choices = {normalize_label(choice): choice for choice in spec.get("choices", [])}
+        choice = choices.get(normalize_label(text))
+        return (choice, None) if choice is not None else (text, "not an allowed choice")
+    return text, None
+
+
+class ProgramSchema:
+    """Field schema of one Program's application form."""
+
+    def __init__(self, program: Dict[str, Any], fields: Dict[str, Dict[str, Any]]):
+        """
+        Create a schema.
+
+        Args:
+            program: Program record (needs 'id')
+            fields: Field key -> spec (labels, type, required, type options)
+        """
+        self.program = program
+        self.fields = fields
+        self._labels: Dict[str, str] = {}
+        for key, spec in fields.items():
+            for label in [key.replace("_", " ")] + list(spec.get("labels", [])):
+                self._labels.setdefault(normalize_label(label), key)
+
+    def field_for_label(self, label: str) -> Optional[str]:
+        """Schema key a form label maps to, or None."""
+        return self._labels.get(normalize_label(label))
+
+    def map_fields(self, form_fields: List[Dict[str, Any]], min_confidence: float = 0.8) -> Dict[str, Any]:
+        """
+        Map, validate and normalize a form's fields.
+
+        When a label appears more than once, the reading with the higher
+        confidence is kept.
+
+        Args:
+            form_fields: Fields from DocumentAIProcessor.extract_form_fields
+            min_confidence: Value confidence below which a field is flagged
+
+        Returns:
+            Dict with values (key -> normalized value), confidence (key ->
+            value confidence), issues (field, problem and raw value for
+            each problem found) and unmapped (labels not in the schema)
+        """
+        raw: Dict[str, Dict[str, Any]] = {}
+        unmapped = []
+        for field in form_fields:
+            key = self.field_for_label(field["name"])
+            if key is None:
+                if field["name"]:
+                    unmapped.append(field["name"])
+            elif key not in raw or field["confidence"] > raw[key]["confidence"]:
+                raw[key] = field
+
+        values: Dict[str, Any] = {}
+        confidence: Dict[str, float] = {}
+        issues = []
+        for key, spec in self.fields.items():
+            field = raw.get(key)
+            if field is None:
+                if spec.get("required"):
+                    issues.append({"field": key, "problem": "missing", "value": None})
+                continue
+            value, problem = normalize_value(field["value"], spec, field.get("value_type", ""))
+            confidence[key] = round(float(field["confidence"]), 4)
+            if problem == "missing":
+                if spec.get("required"):
+                    issues.append({"field": key, "problem": problem, "value": None})
+                continue
+            values[key] = value
+            if problem:
+                issues.append({"field": key, "problem": problem, "value": field["value"]})
+            elif field["confidence"] < min_confidence:
+                issues.append({"field": key, "problem": "low confidence", "value": field["value"]})
+        return {"values": values, "confidence": confidence, "issues": issues, "unmapped": unmapped}
+
+
+class ProgramCatalog:
+    """Programs accepting applications, with their form schemas."""
+
+    def __init__(
+        self,
+        programs: List[Dict[str, Any]],
+        default_fields: Optional[Dict[str, Dict[str, Any]]] = None,
+        program_field: Optional[List[str]] = None
+    ):
+        """
+        Create a catalog.
+
+        Args:
+            programs: Program records, each optionally with 'fields'
+            default_fields: Fields shared by every program's form
+            program_field: Labels of the form field naming the program
+        """
+        self.schemas: Dict[str, ProgramSchema] = {}
+        self._names: Dict[str, str] = {}
+        for program in programs:
+            fields = dict(default_fields or {})
+            fields.update(program.get("fields", {}))
+            record = {key: value for key, value in program.items() if key != "fields"}
+            self.schemas[program["id"]] = ProgramSchema(record, fields)
+            for name in (program["id"], program.get("name", "")):
+                if name:
+                    self._names[normalize_label(name)] = program["id"]
+        self.program_labels = {normalize_label(label) for label in (program_field or ["program"])}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ProgramCatalog":
+        """
+        Load a catalog file (see the module docstring).
+
+        Args:
+            path: Path to the JSON catalog
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["programs"], data.get("default_fields"), data.get("program_field"))
+
+    def program_for(self, form_fields: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Work out which program a form applies to.
+
+        Args:
+            form_fields: Fields from DocumentAIProcessor.extract_form_fields
+
+        Returns:
+            Program ID named by the form's program field, or None
+        """
+        for field in form_fields:
+            if normalize_label(field["name"]) in self.program_labels:
+                program_id = self._names.get(normalize_label(field["value"]))
+                if program_id:
+                    return program_id
+        return None
+
+
+def applicant_id(values: Dict[str, Any], fallback: str) -> str:
+    """
+    Stable applicant ID for a form without a userId field.
+
+    Args:
+        values: Normalized form values
+        fallback: Used when the form has neither email nor name
+
+    Returns:
+        'applicant-' followed by a UUID derived from the email address, or
+        from full name and date of birth
+    """
+    if values.get("email"):
+        key = f"email:{values['email']}"
+    elif values.get("full_name"):
+        key = f"name:{normalize_label(str(values['full_name']))}:{values.get('date_of_birth', '')}"
+    else:
+        key = f"form:{fallback}"
+    return f"applicant-{uuid.uuid5(uuid.NAMESPACE_URL, key)}"
+
+
+def application_id(document_key: str) -> str:
+    """
+    Application ID of one submitted form.
+
+    Args:
+        document_key: Content digest of the form (see content_digest), or
+            another key unique to the submission
+
+    Returns:
+        UUID string derived from the key
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"application:{document_key}"))
+
+
+def content_digest(content: bytes, mime_type: str) -> str:
+    """Hex SHA-256 of a form's MIME type and content; equal to job_queue.content_job_id of its file."""
+    return hashlib.sha256(mime_type.encode("utf-8") + b"\0" + content).hexdigest()
+
+
+class ApplicationFormIngestor:
+    """Turns one admission form into an Application draft; usable as a job_queue processor."""
+
+    def __init__(
+        self,
+        processor,
+        catalog: ProgramCatalog,
+        program_id: Optional[str] = None,
+        min_confidence: float = 0.8
+    ):
+        """
+        Configure the ingestor.
+
+        Args:
+            processor: DocumentAIProcessor for a Form Parser processor
+            catalog: Programs and their form schemas
+            program_id: Program every form applies to (None to read it from the form)
+            min_confidence: Value confidence below which a field needs review
+        """
+        if program_id is not None and program_id not in catalog.schemas:
+            raise ValueError(f"program {program_id!r} is not in the catalog")
+        self.processor = processor
+        self.catalog = catalog
+        self.program_id = program_id
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def _count(self, **increments: int):
+        with self._lock:
+            for name, value in increments.items():
+                self.counts[name] = self.counts.get(name, 0) + value
+
+    def process_document(self, file_path: str, mime_type: str = "application/pdf") -> Dict[str, Any]:
+        """
+        Process one form into an Application draft.
+
+        Args:
+            file_path: Path to the scanned or digital form
+            mime_type: MIME type of the form
+
+        Returns:
+            Dict with application (DRAFT Application record), form (normalized
+            values), confidence, issues, unmapped, needs_review and source
+        """
+        with open(file_path, "rb") as f:
+            content = f.read()
+        document = self.processor.fetch_document(content, mime_type)
+        form_fields = self.processor.extract_form_fields(document)
+        return self.draft(form_fields, file_path, content_digest(content, mime_type))
+
+    def draft(
+        self,
+        form_fields: List[Dict[str, Any]],
+        source: str,
+        document_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the Application draft for extracted form fields.
+
+        Args:
+            form_fields: Fields from DocumentAIProcessor.extract_form_fields
+            source: Path of the form, recorded in the draft
+            document_key: Key of this submission for Application.id (default:
+                source); process_document passes the content digest
+
+        Returns:
+            Draft dict (see process_document)
+        """
+        program_id = self.program_id or self.catalog.program_for(form_fields)
+        if program_id is None:
+            self._count(forms=1, unknown_program=1)
+            return {
+                "application": None,
+                "form": {},
+                "confidence": {},
+                "issues": [{"field": "programId", "problem": "unknown program", "value": None}],
+                "unmapped": [field["name"] for field in form_fields],
+                "needs_review": True,
+                "source": source,
+            }
+
+        mapped = self.catalog.schemas[program_id].map_fields(form_fields, self.min_confidence)
+        values = mapped["values"]
+        user_id = values.pop(USER_ID, None) or applicant_id(values, source)
+        issues = mapped["issues"]
+        low_confidence = sum(1 for issue in issues if issue["problem"] == "low confidence")
+        invalid = len(issues) - low_confidence
+        self._count(
+            forms=1,
+            low_confidence_fields=low_confidence,
+            invalid_fields=invalid,
+            forms_needing_review=1 if issues else 0,
+        )
+        application = {
+            "id": application_id(document_key or source),
+            "userId": user_id,
+            "programId": program_id,
+            "status": "DRAFT",
+        }
+        if issues:
+            application["notes"] = "Needs review: " + "; ".join(
+                f"{issue['field']} ({issue['problem']})" for issue in issues
+            )
+        return {
+            "application": application,
+            "form": values,
+            "confidence": mapped["confidence"],
+            "issues": issues,
+            "unmapped": [
+                label for label in mapped["unmapped"]
+                if normalize_label(label) not in self.catalog.program_labels
+            ],
+            "needs_review": bool(issues),
+            "source": source,
+        }
+
+
+def ingest(
+    queue: JobQueue,
+    ingestor: ApplicationFormIngestor,
+    workers: int = 4,
+    batch_size: int = 100,
+    on_batch: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Drain the queue with several workers, reporting on each batch and the run.
+
+    Forms completed by an earlier, interrupted run stay done and are not
+    processed again; forms that fail are retried up to the queue's
+    max_attempts. The queue is drained in batches of about batch_size
+    completed forms (split evenly between the workers), each reported once
+    its workers have finished.
+
+    Args:
+        queue: Job queue holding the enqueued forms
+        ingestor: Form ingestor, used as each worker's processor
+        workers: Forms processed concurrently
+        batch_size: Completed forms per reported batch
+        on_batch: Called with each batch's report as soon as it finishes
+
+    Returns:
+        Dict with processed, elapsed_s, forms_per_minute, the ingestor's
+        counts (low_confidence_fields, invalid_fields, forms_needing_review,
+        unknown_program), batches (the same figures per batch, with its
+        batch number) and the queue's state counts
+    """
+    per_worker = max(1, -(-batch_size // workers))
+    batches: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    while True:
+        processed = [0] * workers
+        counts_before = dict(ingestor.counts)
+        batch_started = time.perf_counter()
+
+        def drain(slot: int):
+            processed[slot] = run_worker(queue, ingestor, max_jobs=per_worker)
+
+        threads = [threading.Thread(target=drain, args=(slot,)) for slot in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Workers only stop short of their share when the queue is empty
+        if sum(processed) == 0:
+            break
+        batch = {"batch": len(batches) + 1}
+        batch.update(_throughput(sum(processed), time.perf_counter() - batch_started))
+        for name in _REPORT_COUNTS:
+            batch[name] = ingestor.counts.get(name, 0) - counts_before.get(name, 0)
+        batches.append(batch)
+        if on_batch is not None:
+            on_batch(batch)
+
+    report: Dict[str, Any] = _throughput(
+        sum(batch["processed"] for batch in batches), time.perf_counter() - started
+    )
+    for name in _REPORT_COUNTS:
+        report[name] = ingestor.counts.get(name, 0)
+    report["batches"] = batches
+    report["queue"] = queue.stats()
+    return report
+
+
+def _throughput(processed: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "processed": processed,
+        "elapsed_s": round(elapsed, 2),
+        "forms_per_minute": round(processed / elapsed * 60, 1) if elapsed else 0.0,
+    }
+
+
+def export_drafts(queue: JobQueue, path: str, linker: Optional[ApplicantIndex] = None) -> int:
+    """
+    Write every completed Application draft to an NDJSON file.
+
+    The file is rewritten from the queue's results, so exporting again after
+    a resumed run yields every form exactly once.
+
+    Args:
+        queue: Job queue the forms were ingested through
+        path: Output NDJSON path
+        linker: Empty applicant index; when given, each draft is checked
+            against the drafts before it and gets a "possible_duplicates"
+            list (job_id, applicationId, source, score, match), and a
+            draft with a match needs review
+
+    Returns:
+        Number of drafts written
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    count = 0
+    linked: Dict[str, Tuple[str, str]] = {}
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in queue.results():
+            draft = record["result"]
+            draft["job_id"] = record["job_id"]
+            application = draft.get("application")
+            if linker is not None and application:
+                job_id = str(record["job_id"])
+                draft["possible_duplicates"] = [
+                    {
+                        "job_id": match["id"],
+                        "applicationId": linked[match["id"]][0],
+                        "source": linked[match["id"]][1],
+                        "score": match["score"],
+                        "match": match["match"],
+                    }
+                    for match in linker.add(job_id, draft["form"])
+                ]
+                linked[job_id] = (application["id"], draft["source"])
+                if any(match["match"] for match in draft["possible_duplicates"]):
+                    draft["needs_review"] = True
+            f.write(json.dumps(draft, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    os.replace(temp_path, path)
+    return count
+
+
+def main():
+    """Command-line interface: ingest a folder of admission forms into Application drafts."""
+    parser = argparse.ArgumentParser(
+        description="Ingest admission forms into Application drafts"
+    )
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", required=True, help="Form Parser processor ID")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--catalog", required=True, help="Program catalog JSON with field schemas")
+    parser.add_argument("--program-id", help="Program all forms apply to (default: read from each form)")
+    parser.add_argument("--queue-db", required=True, help="Job queue database; rerun with it to resume")
+    parser.add_argument("--output", required=True, help="NDJSON file for Application drafts")
+    parser.add_argument("--mime-type", default="application/pdf", help="MIME type of the forms")
+    parser.add_argument("--workers", type=int, default=4, help="Forms processed concurrently")
+    parser.add_argument("--batch-size", type=int, default=100, help="Forms per reported batch")
+    parser.add_argument("--min-confidence", type=float, default=0.8,
+                        help="Value confidence below which a field needs review")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before a form is dead-lettered")
+    parser.add_argument("--duplicate-threshold", type=float, default=0.85,
+                        help="Match probability from which two forms are flagged as the same applicant")
+    parser.add_argument("--no-duplicates", action="store_true", help="Skip duplicate applicant detection")
+    parser.add_argument("paths", nargs="*", help="Form files or directories (omit to resume)")
+    args = parser.parse_args()
+
+    from document_processor import DocumentAIProcessor
+
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    queue = JobQueue(args.queue_db, max_attempts=args.max_attempts)
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if os.path.isfile(os.path.join(path, name))
+            )
+        else:
+            files.append(path)
+    if files:
+        queue.enqueue_many(files, args.mime_type)
+
+    ingestor = ApplicationFormIngestor(
+        processor, ProgramCatalog.from_file(args.catalog), args.program_id, args.min_confidence
+    )
+
+    def print_batch(batch: Dict[str, Any]):
+        print(f"batch {batch['batch']}: {batch['processed']} forms, {batch['forms_per_minute']} forms/min, "
+              f"{batch['low_confidence_fields']} low-confidence and {batch['invalid_fields']} invalid fields",
+              file=sys.stderr)
+
+    report = ingest(queue, ingestor, args.workers, args.batch_size, print_batch)
+    linker = None if args.no_duplicates else ApplicantIndex(match_threshold=args.duplicate_threshold)
+    report["drafts_written"] = export_drafts(queue, args.output, linker)
+    report["dead_letters"] = queue.dead_letters()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
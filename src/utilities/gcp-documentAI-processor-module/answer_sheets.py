@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Scanned Answer Sheets to ExamSubmission Records
+
+Paper exams are scanned as one file per student or as one multi-page PDF for
+the whole class. This module processes the sheets concurrently through a
+Form Parser processor and maps what it reads to `ExamQuestion` IDs, writing
+one `ExamSubmission` JSON file per student (see modules/exams/types).
+
+Answers are mapped in two ways, driven by an answer-sheet template:
+
+- Form fields: a field labelled "Q3", "3." or "Question 3" is the answer to
+  the third question of the exam, unless the template maps the label to a
+  question ID explicitly.
+- Regions: the template can give a normalized box (and page) per question;
+  the text of the lines inside the box is the answer.
+
+The student is identified by a "Student ID" / "Roll No" style field, or by
+the file name when the sheet has none. Per-stage timings (read, ocr, map,
+write) are collected so slow stages show up in large runs.
+
+A class PDF is parsed once, and each sheet's pages are cut out of it locally
+(with pypdf, see pdf_pages.py), so every request uploads one sheet rather
+than the whole class.
+
+Exam file format (JSON):
+
+    {
+      "exam": {"id": "exam-1", ...},
+      "questions": [{"id": "q-1", "answer": "B", "points": 2, ...}, ...],
+      "template": {
+        "pages_per_sheet": 1,
+        "field_aliases": {"Roll Number": "userId", "Ans 1": "q-1"},
+        "regions": {"q-7": {"page": 1, "box": [0.1, 0.62, 0.9, 0.75]}}
+      }
+    }
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+
+from common import mime_type_for, percentile
+from pdf_pages import PdfPageSplitter, open_pdf_file
+from spatial_index import DocumentSpatialIndex
+
+_QUESTION_LABEL = re.compile(
+    r"^\s*(?:q(?:uestion)?|ans(?:wer)?)?\s*(?:no\.?|#)?\s*(\d{1,3})\s*[.):\-]?\s*$", re.IGNORECASE
+)
+_STUDENT_LABEL = re.compile(
+    r"student\s*(?:id|no|number)|roll\s*(?:no|number|#)|registration\s*(?:no|number)|"
+    r"enrol+ment\s*(?:no|number)|admission\s*(?:no|number)|user\s*id",
+    re.IGNORECASE
+)
+# Value of field_aliases that marks the student identifier field
+USER_ID = "userId"
+
+
+class StageMetrics:
+    """Thread-safe timing samples per pipeline stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        """Add one timing sample for a stage."""
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the recorded samples.
+
+        Returns:
+            Dict mapping each stage to count, total_s, mean_ms and p95_ms
+        """
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "total_s": round(sum(values), 3),
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            }
+            for stage, values in samples.items()
+        }
+
+
+class AnswerSheetTemplate:
+    """Maps what a Form Parser reads on an answer sheet to exam question IDs."""
+
+    def __init__(
+        self,
+        question_ids: List[str],
+        field_aliases: Optional[Dict[str, str]] = None,
+        regions: Optional[Dict[str, Dict[str, Any]]] = None,
+        pages_per_sheet: int = 1
+    ):
+        """
+        Create a template.
+
+        Args:
+            question_ids: ExamQuestion IDs in the order they are numbered on the sheet
+            field_aliases: Field label -> question ID (or USER_ID for the student field)
+            regions: Question ID -> {'page': 1-based page within the sheet,
+                'box': [x0, y0, x1, y1] normalized to the page size}
+            pages_per_sheet: Pages of a multi-page PDF that make up one student's sheet
+        """
+        self.question_ids = question_ids
+        self.field_aliases = {
+            self._normalize_label(label): target for label, target in (field_aliases or {}).items()
+        }
+        self.regions = regions or {}
+        self.pages_per_sheet = pages_per_sheet
+
+    @classmethod
+    def from_exam(cls, exam_data: Dict[str, Any]) -> "AnswerSheetTemplate":
+        """
+        Build a template from an exam file's questions and optional template section.
+
+        Args:
+            exam_data: Parsed exam file (see the module docstring)
+        """
+        template = exam_data.get("template", {})
+        return cls(
+            [question["id"] for question in exam_data["questions"]],
+            template.get("field_aliases"),
+            template.get("regions"),
+            template.get("pages_per_sheet", 1),
+        )
+
+    @staticmethod
+    def _normalize_label(label: str) -> str:
+        return " ".join(label.lower().replace(":", " ").split())
+
+    def question_for_label(self, label: str) -> Optional[str]:
+        """
+        Find the question a form field label refers to.
+
+        Args:
+            label: Form field name as read from the sheet
+
+        Returns:
+            Question ID, USER_ID for the student identifier field, or None
+        """
+        normalized = self._normalize_label(label)
+        if normalized in self.field_aliases:
+            return self.field_aliases[normalized]
+        if _STUDENT_LABEL.search(label):
+            return USER_ID
+        match = _QUESTION_LABEL.match(normalized)
+        if match:
+            number = int(match.group(1))
+            if 1 <= number <= len(self.question_ids):
+                return self.question_ids[number - 1]
+        return None
+
+    def map_fields(self, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Map extracted form fields to answers.
+
+        Args:
+            fields: Form fields from DocumentAIProcessor.extract_form_fields
+
+        Returns:
+            Dict with answers (question ID -> text), confidence (question ID
+            -> value confidence), user_id (or None) and unmapped field names
+        """
+        answers: Dict[str, str] = {}
+        confidence: Dict[str, float] = {}
+        user_id = None
+        unmapped = []
+        for field in fields:
+            target = self.question_for_label(field["name"])
+            if target == USER_ID:
+                user_id = field["value"] or user_id
+            elif target is None:
+                unmapped.append(field["name"])
+            elif target not in answers or field["confidence"] > confidence[target]:
+                answers[target] = field["value"]
+                confidence[target] = round(float(field["confidence"]), 4)
+        return {"answers": answers, "confidence": confidence, "user_id": user_id, "unmapped": unmapped}
+
+    def map_regions(self, document) -> Dict[str, str]:
+        """
+        Read the answers inside the template's regions.
+
+        Args:
+            document: DocumentAI document of one sheet
+
+        Returns:
+            Dict mapping question ID to the text of the lines inside its region
+        """
+        if not self.regions:
+            return {}
+        lines = DocumentSpatialIndex(document, "lines")
+        answers = {}
+        for question_id, region in self.regions.items():
+            page_number = region.get("page", 1)
+            if page_number > lines.page_count:
+                continue
+            answers[question_id] = lines.text_in(page_number, region["box"])
+        return answers
+
+
+class AnswerSheetPipeline:
+    """Processes answer sheets concurrently into ExamSubmission records."""
+
+    def __init__(
+        self,
+        processor,
+        exam: Dict[str, Any],
+        template: AnswerSheetTemplate,
+        workers: int = 8,
+        batch_size: int = 1
+    ):
+        """
+        Configure the pipeline.
+
+        Args:
+            processor: DocumentAIProcessor for a Form Parser processor
+            exam: Exam record (needs 'id')
+            template: Answer-sheet template for the exam
+            workers: Batches of sheets processed concurrently
+            batch_size: Sheets handed to a worker at a time
+        """
+        self.processor = processor
+        self.exam = exam
+        self.template = template
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.metrics = StageMetrics()
+        # Open multi-sheet PDFs of the current run, by path
+        self._splitters: Dict[str, PdfPageSplitter] = {}
+
+    def _timed(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        self.metrics.record(stage, now - started)
+        return now
+
+    def sheets(self, paths: List[str]) -> List[Tuple[str, Optional[List[int]], str]]:
+        """
+        List the sheets in the input files.
+
+        Args:
+            paths: Scanned sheet files; PDFs with more pages than one sheet
+                are split every pages_per_sheet pages
+
+        Returns:
+            (file_path, 1-based pages or None for the whole file, sheet name) tuples
+        """
+        from local_extract import pdf_page_count
+
+        sheets = []
+        per_sheet = self.template.pages_per_sheet
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            pages = None
+            splitter = None
+            if path.lower().endswith(".pdf"):
+                splitter = open_pdf_file(path)
+                if splitter is not None:
+                    pages = len(splitter)
+                else:
+                    with open(path, "rb") as f:
+                        pages = pdf_page_count(f.read())
+            if not pages or pages <= per_sheet:
+                if splitter is not None:
+                    splitter.close()
+                sheets.append((path, None, name))
+                continue
+            if splitter is not None:
+                self._splitters[path] = splitter
+            for first in range(1, pages + 1, per_sheet):
+                window = list(range(first, min(first + per_sheet, pages + 1)))
+                sheets.append((path, window, f"{name}-p{first}"))
+        return sheets
+
+    def read_sheet(self, file_path: str, pages: Optional[List[int]]) -> Tuple[bytes, str, Optional[List[int]]]:
+        """
+        Read the content to upload for one sheet.
+
+        Args:
+            file_path: Scanned file containing the sheet
+            pages: Pages of the file that make up the sheet (None for all)
+
+        Returns:
+            (content, mime_type, pages to select) where content holds only the
+            sheet's pages when the file was split locally (pages to select is
+            then None), or the whole file otherwise
+        """
+        splitter = self._splitters.get(file_path) if pages else None
+        if splitter is not None:
+            return splitter.extract(pages), "application/pdf", None
+        with open(file_path, "rb") as f:
+            return f.read(), mime_type_for(file_path), pages
+
+    def process_sheet(self, file_path: str, pages: Optional[List[int]], name: str) -> Dict[str, Any]:
+        """
+        Process one sheet into a submission.
+
+        Args:
+            file_path: Scanned file containing the sheet
+            pages: Pages of the file that make up the sheet (None for all)
+            name: Sheet name, used as the userId when no student field is found
+
+        Returns:
+            Dict with submission (ExamSubmission fields), source, confidence and unmapped
+        """
+        started = time.perf_counter()
+        content, mime_type, select = self.read_sheet(file_path, pages)
+        started = self._timed("read", started)
+
+        document = self.processor.fetch_document(content, mime_type, pages=select)
+        started = self._timed("ocr", started)
+
+        mapped = self.template.map_fields(self.processor.extract_form_fields(document))
+        for question_id, text in self.template.map_regions(document).items():
+            if text or question_id not in mapped["answers"]:
+                mapped["answers"][question_id] = text
+        self._timed("map", started)
+
+        return {
+            "submission": self.submission(mapped["user_id"] or name, mapped["answers"]),
+            "source": {"file_path": file_path, "pages": pages},
+            "confidence": mapped["confidence"],
+            "unmapped": mapped["unmapped"],
+            "user_id_found": mapped["user_id"] is not None,
+        }
+
+    def submission(self, user_id: str, answers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Build the ExamSubmission record for a sheet.
+
+        Args:
+            user_id: Student the sheet belongs to
+            answers: Question ID -> answer text
+
+        Returns:
+            ExamSubmission dict with a stable ID per exam and student
+        """
+        return {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"exam:{self.exam['id']}:user:{user_id}")),
+            "examId": self.exam["id"],
+            "userId": user_id,
+            "answers": {
+                question_id: answers[question_id]
+                for question_id in self.template.question_ids if question_id in answers
+            },
+            "submittedAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        }
+
+    def process_batch(self, sheets: List[Tuple[str, Optional[List[int]], str]]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of sheets in one worker.
+
+        Args:
+            sheets: (file_path, pages, name) tuples from sheets()
+
+        Returns:
+            One process_sheet result, or {'source', 'error'}, per sheet
+        """
+        results = []
+        for path, pages, name in sheets:
+            try:
+                results.append(self.process_sheet(path, pages, name))
+            except Exception as e:
+                results.append(failed_result(path, pages, e))
+        return results
+
+    def run(self, paths: List[str], output_dir: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process all sheets, yielding results in sheet order as batches complete.
+
+        Args:
+            paths: Scanned sheet files
+            output_dir: Directory for one <userId>.json ExamSubmission per
+                student (nothing written if None)
+
+        Yields:
+            process_sheet results, or {'source', 'error'} for sheets that failed;
+            a later sheet (in input order) for an already seen userId has
+            duplicate_user_id set and is not written
+        """
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        try:
+            yield from self._run(self.sheets(paths), output_dir)
+        finally:
+            for splitter in self._splitters.values():
+                splitter.close()
+            self._splitters.clear()
+
+    def _run(self, sheets, output_dir: Optional[str]) -> Iterator[Dict[str, Any]]:
+        batches = [sheets[first:first + self.batch_size] for first in range(0, len(sheets), self.batch_size)]
+        finished: Dict[int, List[Dict[str, Any]]] = {}
+        next_batch = 0
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.process_batch, batch): index for index, batch in enumerate(batches)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    finished[index] = future.result()
+                except Exception as e:
+                    finished[index] = [failed_result(path, pages, e) for path, pages, _ in batches[index]]
+                # Release batches in sheet order, so which sheet wins a
+                # duplicate userId does not depend on thread timing
+                while next_batch in finished:
+                    for result in finished.pop(next_batch):
+                        yield self._settle(result, output_dir, seen)
+                    next_batch += 1
+
+    def _settle(self, result: Dict[str, Any], output_dir: Optional[str], seen: set) -> Dict[str, Any]:
+        """Flag a repeated userId, or write the submission of the student's first sheet."""
+        if "error" in result:
+            return result
+        user_id = result["submission"]["userId"]
+        if user_id in seen:
+            # Keep the first sheet; a second one needs a human look
+            result["duplicate_user_id"] = True
+            return result
+        seen.add(user_id)
+        if output_dir:
+            started = time.perf_counter()
+            _write_json(os.path.join(output_dir, f"{_safe_name(user_id)}.json"), result["submission"])
+            self._timed("write", started)
+        return result
+
+
+def failed_result(file_path: str, pages: Optional[List[int]], error: Exception) -> Dict[str, Any]:
+    """Result reported for a sheet that could not be processed."""
+    return {"source": {"file_path": file_path, "pages": pages}, "error": f"{type(error).__name__}: {error}"}
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", value) or "unknown"
+
+
+def _write_json(path: str, data: Any):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def run_to_directory(pipeline: AnswerSheetPipeline, paths: List[str], output_dir: str) -> Dict[str, Any]:
+    """
+    Run a pipeline over files and directories, writing submissions and a manifest.
+
+    Args:
+        pipeline: AnswerSheetPipeline (or subclass) to run
+        paths: Sheet files, multi-page PDFs or directories of sheets
+        output_dir: Directory for ExamSubmission files and manifest.json
+
+    Returns:
+        Run summary: sheets, failed, elapsed_s, sheets_per_minute and stages
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if os.path.isfile(os.path.join(path, name))
+            )
+        else:
+            files.append(path)
+
+    started = time.perf_counter()
+    manifest = []
+    for result in pipeline.run(files, output_dir):
+        manifest.append({key: value for key, value in result.items() if key != "submission"})
+        if "error" in result:
+            print(f"FAILED {result['source']['file_path']}: {result['error']}", file=sys.stderr)
+        else:
+            manifest[-1]["userId"] = result["submission"]["userId"]
+            manifest[-1]["answered"] = len(result["submission"]["answers"])
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "sheets": len(manifest),
+        "failed": sum(1 for entry in manifest if "error" in entry),
+        "elapsed_s": round(elapsed, 2),
+        "sheets_per_minute": round(len(manifest) / elapsed * 60, 1) if elapsed else 0.0,
+        "stages": pipeline.metrics.summary(),
+    }
+    _write_json(os.path.join(output_dir, "manifest.json"), {"summary": summary, "sheets": manifest})
+    return summary
+
+
+def main():
+    """Command-line interface: turn a folder or PDF of answer sheets into ExamSubmission files."""
+    parser = argparse.ArgumentParser(
+        description="Process scanned answer sheets into ExamSubmission JSON"
+    )
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", required=True, help="Form Parser processor ID")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--exam", required=True, help="Exam JSON file with exam, questions and template")
+    parser.add_argument("--output-dir", required=True, help="Directory for ExamSubmission files")
+    parser.add_argument("--workers", type=int, default=8, help="Sheets processed concurrently")
+    parser.add_argument("paths", nargs="+", help="Sheet files, multi-page PDFs or directories")
+    args = parser.parse_args()
+
+    from document_processor import DocumentAIProcessor
+
+    with open(args.exam, "r", encoding="utf-8") as f:
+        exam_data = json.load(f)
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    pipeline = AnswerSheetPipeline(
+        processor, exam_data["exam"], AnswerSheetTemplate.from_exam(exam_data), args.workers
+    )
+
+    summary = run_to_directory(pipeline, args.paths, args.output_dir)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
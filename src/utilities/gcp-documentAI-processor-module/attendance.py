@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Paper Attendance Register Digitization
+
+Many classrooms still keep paper roll sheets next to QR, biometric and facial
+attendance. This module reads scanned register pages with a Form Parser
+processor and turns them into `Attendance` rows (see
+modules/attendance/types): one row per student and date, with status
+PRESENT, ABSENT, LATE or EXCUSED.
+
+A register is a student-by-date grid. Its table header holds the dates (for
+example "02/09" or "Mon 2/9"), and each body row holds a student's name or
+student number followed by one mark per date. Students are joined to the
+course roster by student number, then by name, then by the closest name
+spelling, so that every row gets a `userId`. A table that continues on the
+next page without a header reuses the columns of the table before it.
+
+Registers are processed through the durable job queue (job_queue.py), which
+is the run's checkpoint: an interrupted semester run resumes where it
+stopped, and progress is logged while workers drain the queue. Rows are then
+batch-inserted into an SQLite attendance table. Row IDs are derived from
+user, course and date, so rerunning a run or rescanning a register updates
+rows instead of duplicating them.
+
+Roster file format (CSV with a header row, or a JSON list of objects):
+
+    userId,name,studentNumber,courseId
+    u-1042,Ada Lovelace,S1042,course-math-7a
+
+studentNumber and courseId are optional. Without courseId, a roster entry
+matches the student in every course.
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from common import normalize_name, parse_date
+from grading import similarity_to_key
+from job_queue import JobQueue, run_worker
+from table_extract import ExtractedTable, extract_tables
+from text_anchor import raw_message
+
+STATUSES = ("PRESENT", "ABSENT", "LATE", "EXCUSED")
+
+# Register marks (lowercase) and the statuses they record
+DEFAULT_MARKS = {
+    **dict.fromkeys(["p", "/", "\\", "✓", "✔", "present"], "PRESENT"),
+    **dict.fromkeys(["a", "o", "0", "n", "x", "✗", "✘", "abs", "absent"], "ABSENT"),
+    **dict.fromkeys(["l", "t", "late"], "LATE"),
+    **dict.fromkeys(["e", "ex", "exc", "excused"], "EXCUSED"),
+}
+
+_NAME_HEADERS = {"name", "student", "students", "pupil", "learner", "student name", "full name"}
+_NUMBER_HEADERS = {"id", "student id", "student number", "student no", "roll no", "roll number", "number"}
+_PARTIAL_DATE = re.compile(r"(\d{1,2})\s*[/.\-]\s*(\d{1,2})(?:\s*[/.\-]\s*(\d{2,4}))?")
+
+
+def _normalize_header(text: str) -> str:
+    return " ".join(re.sub(r"[^\w ]+", " ", text.lower()).split())
+
+
+def header_date(text: str, semester_start: date, day_first: bool = True) -> Optional[date]:
+    """
+    Read the date of a register column header.
+
+    Args:
+        text: Header cell text, e.g. "02/09", "Mon 2.9" or "2025-09-02"
+        semester_start: First day of the semester; a header without a year
+            gets the year that places it on or after this date
+        day_first: Read d/m rather than m/d
+
+    Returns:
+        The date, or None if the header is not a date
+    """
+    text = text.strip()
+    if not text:
+        return None
+    full = parse_date(text, day_first)
+    if full:
+        return datetime.strptime(full, "%Y-%m-%d").date()
+
+    match = _PARTIAL_DATE.search(text)
+    if not match:
+        return None
+    first, second = int(match.group(1)), int(match.group(2))
+    day, month = (first, second) if day_first else (second, first)
+    years = [semester_start.year, semester_start.year + 1]
+    if match.group(3):
+        year = int(match.group(3))
+        years = [year + 2000 if year < 100 else year]
+    for year in years:
+        try:
+            found = date(year, month, day)
+        except ValueError:
+            # 29/02 only exists in leap years; try the next candidate year
+            continue
+        # A week of slack for registers that start before the official first day
+        if found >= semester_start - timedelta(days=7) or len(years) == 1:
+            return found
+    return None
+
+
+class Roster:
+    """Students of one or more courses, joined to register rows by number or name."""
+
+    def __init__(self, students: List[Dict[str, Any]], min_similarity: float = 0.8, min_margin: float = 0.05):
+        """
+        Index roster entries.
+
+        Args:
+            students: Dicts with userId and name, optionally studentNumber and courseId
+            min_similarity: Lowest name edit similarity (1 - edits / longer
+                length) accepted for a spelling match
+            min_margin: How much closer the best name must be than the next
+                student's name for a spelling match
+        """
+        self.students = students
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self._by_number: Dict[Tuple[str, str], str] = {}
+        self._by_name: Dict[Tuple[str, str], List[str]] = {}
+        # Per course: userIds with their names as sorted parts and as written,
+        # for spelling matches
+        self._names: Dict[str, Tuple[List[str], List[str], List[str]]] = {}
+        for student in students:
+            user_id = str(student["userId"])
+            course_id = str(student.get("courseId") or "")
+            number = str(student.get("studentNumber") or "").strip().lower()
+            if number:
+                self._by_number[(course_id, number)] = user_id
+            parts = normalize_name(student.get("name"))
+            if parts:
+                key = " ".join(sorted(parts))
+                self._by_name.setdefault((course_id, key), []).append(user_id)
+                user_ids, sorted_keys, written_keys = self._names.setdefault(course_id, ([], [], []))
+                user_ids.append(user_id)
+                sorted_keys.append(key)
+                written_keys.append(" ".join(parts))
+
+    @classmethod
+    def from_file(cls, path: str, min_similarity: float = 0.8, min_margin: float = 0.05) -> "Roster":
+        """
+        Load a roster from a CSV or JSON file.
+
+        Args:
+            path: Roster file (.csv with a header row, otherwise JSON)
+            min_similarity: Lowest name similarity accepted for a spelling match
+            min_margin: Lead over the next closest name needed for a spelling match
+        """
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".csv"):
+                students = list(csv.DictReader(f))
+            else:
+                students = json.load(f)
+        return cls(students, min_similarity, min_margin)
+
+    def find(self, course_id: str, name: str = "", number: str = "") -> Optional[str]:
+        """
+        Find the userId of a register row.
+
+        Args:
+            course_id: Course of the register
+            name: Student name as written in the register
+            number: Student number as written in the register
+
+        Returns:
+            The userId, or None if no unique student matches
+        """
+        courses = (course_id, "")
+        number = number.strip().lower()
+        if number:
+            for course in courses:
+                user_id = self._by_number.get((course, number))
+                if user_id:
+                    return user_id
+
+        parts = normalize_name(name)
+        if not parts:
+            return None
+        key = " ".join(sorted(parts))
+        for course in courses:
+            user_ids = self._by_name.get((course, key), [])
+            if len(user_ids) == 1:
+                return user_ids[0]
+            if len(user_ids) > 1:
+                return None
+
+        # Closest spelling by edit distance, so one misread letter ("Garcla",
+        # "Turnig") still matches, unless another student is about as close.
+        # Sorted parts allow any name order, but a misread first letter can
+        # reorder them, so names as written (and surname first) are tried too.
+        cutoff = self.min_similarity - self.min_margin
+        scores: Dict[str, float] = {}
+        for course in courses:
+            user_ids, sorted_keys, written_keys = self._names.get(course, ([], [], []))
+            if not user_ids:
+                continue
+            best = np.maximum.reduce([
+                similarity_to_key(key, sorted_keys, cutoff),
+                similarity_to_key(" ".join(parts), written_keys, cutoff),
+                similarity_to_key(" ".join(parts[1:] + parts[:1]), written_keys, cutoff),
+            ])
+            for user_id, score in zip(user_ids, best):
+                scores[user_id] = max(scores.get(user_id, 0.0), float(score))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < self.min_similarity:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < self.min_margin:
+            return None
+        return ranked[0][0]
+
+
+class RegisterReader:
+    """Reads scanned attendance registers into Attendance rows."""
+
+    def __init__(
+        self,
+        processor,
+        roster: Roster,
+        semester_start: date,
+        course_id: Optional[str] = None,
+        day_first: bool = True,
+        marks: Optional[Dict[str, str]] = None,
+        blank_status: Optional[str] = None
+    ):
+        """
+        Initialize the reader.
+
+        Args:
+            processor: DocumentAIProcessor for a Form Parser processor
+            roster: Roster the register rows are joined to
+            semester_start: First day of the semester (dates without a year fall after it)
+            course_id: Course of every register (default: the register's directory name)
+            day_first: Read date headers as d/m rather than m/d
+            marks: Register marks mapped to statuses (default: DEFAULT_MARKS)
+            blank_status: Status of an empty cell (default: no row is created)
+        """
+        marks = DEFAULT_MARKS if marks is None else marks
+        invalid = {status for status in list(marks.values()) + [blank_status] if status} - set(STATUSES)
+        if invalid:
+            raise ValueError(f"Unknown attendance status: {', '.join(sorted(invalid))}")
+        self.processor = processor
+        self.roster = roster
+        self.semester_start = semester_start
+        self.course_id = course_id
+        self.day_first = day_first
+        self.marks = {mark.lower(): status for mark, status in marks.items()}
+        self.blank_status = blank_status
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, **increments: int):
+        with self._lock:
+            for name, value in increments.items():
+                self.counts[name] = self.counts.get(name, 0) + value
+
+    def course_for(self, file_path: str) -> str:
+        """Course ID of a register: the configured one, else its directory name."""
+        return self.course_id or os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+
+    def process_document(self, file_path: str, mime_type: str = "application/pdf") -> Dict[str, Any]:
+        """
+        Read one register file (job_queue processor interface).
+
+        Args:
+            file_path: Scanned register
+            mime_type: MIME type of the file
+
+        Returns:
+            Dict with rows (Attendance dicts with ISO dates), issues, pages and tables
+        """
+        with open(file_path, "rb") as f:
+            content = f.read()
+        document = self.processor.fetch_document(content, mime_type)
+        result = self.read(extract_tables(document), self.course_for(file_path), os.path.basename(file_path))
+        result["pages"] = len(raw_message(document).pages)
+        return result
+
+    def _columns(self, header: List[str]) -> Optional[Dict[str, Any]]:
+        """Locate the name, number and date columns of a header row."""
+        names = [_normalize_header(cell) for cell in header]
+        dates = {}
+        for index, cell in enumerate(header):
+            if names[index] in _NAME_HEADERS or names[index] in _NUMBER_HEADERS:
+                continue
+            day = header_date(cell, self.semester_start, self.day_first)
+            if day:
+                dates[index] = day.isoformat()
+        if not dates:
+            return None
+        name_column = next((i for i, name in enumerate(names) if name in _NAME_HEADERS), None)
+        number_column = next((i for i, name in enumerate(names) if name in _NUMBER_HEADERS), None)
+        if name_column is None and number_column is None:
+            # Registers often leave the name column unlabeled: use the first non-date column
+            name_column = next((i for i in range(len(header)) if i not in dates), None)
+        return {"name": name_column, "number": number_column, "dates": dates, "width": len(header)}
+
+    def read(self, tables: List[ExtractedTable], course_id: str, source: str) -> Dict[str, Any]:
+        """
+        Turn register tables into Attendance rows.
+
+        Args:
+            tables: Tables of the register (table_extract.extract_tables)
+            course_id: Course of the register
+            source: Register name used in row notes and issues
+
+        Returns:
+            Dict with rows, issues and tables (the number of tables read)
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        issues: List[str] = []
+        unmatched = unknown_marks = blanks = 0
+        columns = None
+        for table in tables:
+            header = table.header if table.has_header else []
+            body = table.cells.tolist()
+            page = table.page_start
+            table_columns = self._columns(header) if header else None
+            if not header and body:
+                # A header read as the first body row, or a continuation of the previous table
+                table_columns = self._columns(body[0])
+                if table_columns:
+                    body = body[1:]
+                elif columns is not None and len(body[0]) == columns["width"]:
+                    table_columns = columns
+            if table_columns is None:
+                issues.append(f"{source} p{page}: table without date columns skipped")
+                continue
+            columns = table_columns
+
+            for cells in body:
+                name = cells[columns["name"]] if columns["name"] is not None and columns["name"] < len(cells) else ""
+                number = cells[columns["number"]] if columns["number"] is not None and columns["number"] < len(cells) else ""
+                if not name and not number:
+                    continue
+                user_id = self.roster.find(course_id, name, number)
+                if user_id is None:
+                    unmatched += 1
+                    issues.append(f"{source} p{page}: no roster match for {name or number!r}")
+                    continue
+                for index, day in columns["dates"].items():
+                    mark = cells[index].strip().lower() if index < len(cells) else ""
+                    status = self.marks.get(mark) if mark else self.blank_status
+                    if status is None:
+                        if mark:
+                            unknown_marks += 1
+                            issues.append(f"{source} p{page}: unknown mark {mark!r} for {name or number!r} on {day}")
+                        else:
+                            blanks += 1
+                        continue
+                    row_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"attendance:{user_id}:{course_id}:{day}"))
+                    rows[row_id] = {
+                        "id": row_id,
+                        "userId": user_id,
+                        "courseId": course_id,
+                        "date": day,
+                        "status": status,
+                        "notes": f"Paper register {source} p{page}",
+                    }
+        self._count(rows=len(rows), unmatched_students=unmatched, unknown_marks=unknown_marks, blank_cells=blanks)
+        return {"rows": list(rows.values()), "issues": issues, "tables": len(tables)}
+
+
+class AttendanceStore:
+    """SQLite table of Attendance rows with idempotent batch inserts."""
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the attendance database.
+
+        Args:
+            db_path: SQLite database file
+        """
+        self.conn = sqlite3.connect(db_path)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS attendance ("
+                "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, course_id TEXT NOT NULL, "
+                "date TEXT NOT NULL, status TEXT NOT NULL, notes TEXT)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS attendance_course_date_idx ON attendance (course_id, date)"
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def insert_many(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert or update Attendance rows in one transaction.
+
+        Args:
+            rows: Attendance dicts (id, userId, courseId, date, status, notes)
+
+        Returns:
+            Number of rows written
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO attendance (id, user_id, course_id, date, status, notes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (row["id"], row["userId"], row["courseId"], row["date"], row["status"], row.get("notes"))
+                    for row in rows
+                ]
+            )
+        return len(rows)
+
+    def count(self) -> int:
+        """Number of stored rows."""
+        return self.conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+
+
+def sync_store(queue: JobQueue, store: AttendanceStore, batch_size: int = 5000) -> int:
+    """
+    Batch-insert the rows of every completed register into the store.
+
+    Registers are read from the queue's results, so a resumed run also
+    inserts the rows of registers finished before an interruption.
+
+    Args:
+        queue: Job queue the registers were processed through
+        store: Attendance store
+        batch_size: Rows per insert transaction
+
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    batch: List[Dict[str, Any]] = []
+    for record in queue.results():
+        batch.extend(record["result"].get("rows", ()))
+        if len(batch) >= batch_size:
+            written += store.insert_many(batch)
+            batch = []
+    if batch:
+        written += store.insert_many(batch)
+    return written
+
+
+def digitize(
+    queue: JobQueue,
+    reader: RegisterReader,
+    workers: int = 4,
+    progress_interval: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Drain the queue of registers with several workers, logging progress.
+
+    Args:
+        queue: Job queue holding the enqueued registers
+        reader: Register reader, used as each worker's processor
+        workers: Registers processed concurrently
+        progress_interval: Seconds between progress lines on stderr (0 disables them)
+
+    Returns:
+        Dict with processed, elapsed_s, registers_per_minute, the reader's
+        counts (rows, unmatched_students, unknown_marks, blank_cells) and the
+        queue's state counts
+    """
+    processed = [0] * workers
+    started = time.perf_counter()
+    finished = threading.Event()
+
+    def drain(slot: int):
+        processed[slot] = run_worker(queue, reader)
+
+    def report_progress():
+        while not finished.wait(progress_interval):
+            stats = queue.stats()
+            total = sum(stats.values())
+            elapsed = time.perf_counter() - started
+            print(
+                f"[{elapsed:.0f}s] registers done {stats.get('done', 0)}/{total}, "
+                f"dead {stats.get('dead', 0)}, rows read {reader.counts.get('rows', 0)}",
+                file=sys.stderr
+            )
+
+    threads = [threading.Thread(target=drain, args=(slot,)) for slot in range(workers)]
+    if progress_interval > 0:
+        threading.Thread(target=report_progress, daemon=True).start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    finished.set()
+    elapsed = time.perf_counter() - started
+
+    total = sum(processed)
+    report: Dict[str, Any] = {
+        "processed": total,
+        "elapsed_s": round(elapsed, 2),
+        "registers_per_minute": round(total / elapsed * 60, 1) if elapsed else 0.0,
+    }
+    for name in ("rows", "unmatched_students", "unknown_marks", "blank_cells"):
+        report[name] = reader.counts.get(name, 0)
+    report["queue"] = queue.stats()
+    return report
+
+
+def main():
+    """Command-line interface: digitize a semester of paper attendance registers."""
+    parser = argparse.ArgumentParser(
+        description="Digitize scanned paper attendance registers into Attendance rows"
+    )
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", required=True, help="Form Parser processor ID")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--roster", required=True, help="Roster CSV or JSON (userId, name, studentNumber, courseId)")
+    parser.add_argument("--semester-start", required=True, help="First day of the semester (YYYY-MM-DD)")
+    parser.add_argument("--course-id", help="Course of every register (default: each register's directory name)")
+    parser.add_argument("--month-first", action="store_true", help="Date headers are m/d rather than d/m")
+    parser.add_argument("--marks", help="JSON file mapping register marks to statuses (default: built-in marks)")
+    parser.add_argument("--blank-status", choices=STATUSES, help="Status of an empty cell (default: no row)")
+    parser.add_argument("--queue-db", required=True, help="Job queue database; rerun with it to resume")
+    parser.add_argument("--attendance-db", required=True, help="SQLite database the Attendance rows are inserted into")
+    parser.add_argument("--mime-type", default="application/pdf", help="MIME type of the registers")
+    parser.add_argument("--workers", type=int, default=4, help="Registers processed concurrently")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before a register is dead-lettered")
+    parser.add_argument("--progress-interval", type=float, default=30.0, help="Seconds between progress lines")
+    parser.add_argument("paths", nargs="*", help="Register files or directories (omit to resume)")
+    args = parser.parse_args()
+
+    from document_processor import DocumentAIProcessor
+
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    queue = JobQueue(args.queue_db, max_attempts=args.max_attempts)
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+    if files:
+        queue.enqueue_many(sorted(files), args.mime_type)
+
+    marks = None
+    if args.marks:
+        with open(args.marks, "r", encoding="utf-8") as f:
+            marks = json.load(f)
+
+    reader = RegisterReader(
+        processor,
+        Roster.from_file(args.roster),
+        datetime.strptime(args.semester_start, "%Y-%m-%d").date(),
+        course_id=args.course_id,
+        day_first=not args.month_first,
+        marks=marks,
+        blank_status=args.blank_status
+    )
+    report = digitize(queue, reader, args.workers, args.progress_interval)
+    store = AttendanceStore(args.attendance_db)
+    report["rows_inserted"] = sync_store(queue, store)
+    report["rows_stored"] = store.count()
+    store.close()
+    report["dead_letters"] = queue.dead_letters()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
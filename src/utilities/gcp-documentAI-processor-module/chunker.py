@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Token-Aware Chunking for LLM Calls
+
+This module turns the text returned by process_document into overlapping,
+section-aware chunks that fit a token budget, ready to be sent to the LLM
+service for test generation and doubt solving.
+
+Chunks never cross a section heading, prefer paragraph and sentence
+boundaries, and carry a small overlap so context is not cut mid-thought.
+Each chunk has a stable ID derived from the document hash and its text, and
+chunk lists are cached on disk by document content hash, so asking about the
+same material again reuses the chunks without re-processing the document.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from page_index import PageOffsetIndex
+
+_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_HEADING = re.compile(r"^(#{1,6}\s+\S.*|[A-Z][A-Z0-9 ,:&'-]{3,80})$")
+# "Chapter 3", "Unit IV: Cells", "Topic: Cell Division" - a number or a title
+# after the keyword, so prose like "Topic sentences should..." is not a heading
+_KEYWORD_HEADING = re.compile(
+    r"^(?i:chapter|unit|section|lecture|module|topic)\b[.:]?\s+"
+    r"(?:(?:\d+(?:\.\d+)*|[IVXLC]+|[A-Z])(?!\w)[.:)-]?(?:\s+\S.*)?"
+    r"|[A-Z][\w'-]*(?:\s+(?:[A-Z0-9&][\w'&-]*|of|and|the|in|on|to|for|a|an))*)$"
+)
+_KEYWORD_HEADING_WORDS = 10
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a text.
+
+    Counts words and punctuation marks and adds a third for sub-word splits,
+    which tracks OpenAI and Gemini tokenizers closely enough for budgeting.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return (len(_TOKEN.findall(text)) * 4 + 2) // 3
+
+
+def _is_heading(line: str, next_line: str = "") -> bool:
+    line = line.strip()
+    if not line or len(line) > 100 or line.endswith((".", ",", ";")):
+        return False
+    if _HEADING.match(line):
+        return True
+    # A keyword line is a heading only if it is short and the text does not
+    # run on into the next line, as wrapped OCR prose does
+    next_line = next_line.strip()
+    return bool(_KEYWORD_HEADING.match(line)) and len(line.split()) <= _KEYWORD_HEADING_WORDS \
+        and not next_line[:1].islower()
+
+
+def split_sections(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Split text into sections at heading lines.
+
+    Args:
+        text: Document text
+
+    Returns:
+        (heading, start_index, end_index) tuples covering the text; the
+        heading is '' for text before the first heading
+    """
+    sections = []
+    heading, start, position = "", 0, 0
+    lines = text.splitlines(keepends=True)
+    for number, line in enumerate(lines):
+        next_line = lines[number + 1] if number + 1 < len(lines) else ""
+        if _is_heading(line, next_line):
+            if position > start:
+                sections.append((heading, start, position))
+                start = position
+            heading = line.strip()
+        position += len(line)
+    if position > start:
+        sections.append((heading, start, position))
+    return sections
+
+
+def _units(text: str, start: int, end: int, max_tokens: int, count) -> List[Tuple[int, int, int]]:
+    """Split text[start:end] into (start, end, tokens) sentence units that each fit max_tokens."""
+    units = []
+    for paragraph in _spans(text, start, end, _PARAGRAPH_BREAK):
+        # Sentences are the packing unit, so overlaps can be a sentence or two
+        for sentence in _spans(text, paragraph[0], paragraph[1], _SENTENCE_END):
+            tokens = count(text[sentence[0]:sentence[1]])
+            if tokens <= max_tokens:
+                units.append((sentence[0], sentence[1], tokens))
+                continue
+            # A single overlong sentence: cut it at word boundaries
+            words = [(m.start() + sentence[0], m.end() + sentence[0])
+                     for m in re.finditer(r"\S+", text[sentence[0]:sentence[1]])]
+            piece_start, piece_tokens = words[0][0], 0
+            for word_start, word_end in words:
+                word_tokens = count(text[word_start:word_end])
+                if piece_tokens and piece_tokens + word_tokens > max_tokens:
+                    units.append((piece_start, word_start, piece_tokens))
+                    piece_start, piece_tokens = word_start, 0
+                piece_tokens += word_tokens
+            units.append((piece_start, sentence[1], piece_tokens))
+    return units
+
+
+def _spans(text: str, start: int, end: int, separator) -> List[Tuple[int, int]]:
+    """Non-blank spans of text[start:end] between separator matches."""
+    spans, position = [], start
+    for match in separator.finditer(text, start, end):
+        if text[position:match.start()].strip():
+            spans.append((position, match.start()))
+        position = match.end()
+    if text[position:end].strip():
+        spans.append((position, end))
+    return spans
+
+
+def chunk_text(
+    text: str,
+    doc_hash: str,
+    max_tokens: int = 800,
+    overlap_tokens: int = 80,
+    page_offsets: Optional[List[Dict[str, int]]] = None,
+    token_counter: Callable[[str], int] = estimate_tokens
+) -> List[Dict[str, Any]]:
+    """
+    Split text into overlapping chunks under a token budget.
+
+    Args:
+        text: Document text
+        doc_hash: Content hash of the source document, used in chunk IDs
+        max_tokens: Token budget per chunk
+        overlap_tokens: Tokens of trailing context repeated at the start of the next chunk
+        page_offsets: Page spans from a process_document result, to tag chunks with pages
+        token_counter: Function counting tokens (e.g. a tiktoken encoder's length)
+
+    Returns:
+        List of chunks with chunk_id, index, section, start_index, end_index,
+        tokens, pages and text
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    page_index = None
+    if page_offsets:
+        page_index = PageOffsetIndex(text, [
+            (span["start_index"], span["end_index"], span["page_number"])
+            for span in page_offsets
+        ])
+
+    chunks: List[Dict[str, Any]] = []
+
+    def emit(section: str, units: List[Tuple[int, int, int]]):
+        start, end = units[0][0], units[-1][1]
+        chunk_text_ = text[start:end]
+        digest = hashlib.sha256(f"{doc_hash}\0{start}\0".encode("utf-8") + chunk_text_.encode("utf-8"))
+        chunks.append({
+            "chunk_id": digest.hexdigest()[:20],
+            "index": len(chunks),
+            "section": section,
+            "start_index": start,
+            "end_index": end,
+            "tokens": sum(tokens for _, _, tokens in units),
+            "pages": page_index.pages_for_span(start, end) if page_index else [],
+            "text": chunk_text_,
+        })
+
+    for section, section_start, section_end in split_sections(text):
+        current: List[Tuple[int, int, int]] = []
+        current_tokens = 0
+        for unit in _units(text, section_start, section_end, max_tokens, token_counter):
+            if current and current_tokens + unit[2] > max_tokens:
+                emit(section, current)
+                # Keep trailing units as overlap, as long as they leave room for the new unit
+                overlap: List[Tuple[int, int, int]] = []
+                overlap_total = 0
+                for previous in reversed(current):
+                    if overlap_total + previous[2] > overlap_tokens or \
+                            overlap_total + previous[2] + unit[2] > max_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_total += previous[2]
+                current, current_tokens = overlap, overlap_total
+            current.append(unit)
+            current_tokens += unit[2]
+        if current:
+            emit(section, current)
+    return chunks
+
+
+def select_chunks(
+    chunks: List[Dict[str, Any]],
+    query: str,
+    max_tokens: int = 3000
+) -> List[Dict[str, Any]]:
+    """
+    Pick the chunks most relevant to a question, within a token budget.
+
+    Chunks are scored by how many distinct query words they contain and
+    returned in document order, so a doubt about one topic sends only the
+    relevant parts of the material instead of the whole document.
+
+    Args:
+        chunks: Chunks from chunk_text
+        query: The student's question or the test topic
+        max_tokens: Total token budget for the selected chunks
+
+    Returns:
+        Selected chunks in document order
+    """
+    terms = {word.lower() for word in re.findall(r"\w{3,}", query)}
+    scored = []
+    for chunk in chunks:
+        words = set(re.findall(r"\w{3,}", chunk["text"].lower()))
+        scored.append((len(terms & words), -chunk["index"], chunk))
+    scored.sort(reverse=True, key=lambda item: item[:2])
+
+    selected, total = [], 0
+    for score, _, chunk in scored:
+        if score == 0 and selected:
+            break
+        if total + chunk["tokens"] > max_tokens:
+            continue
+        selected.append(chunk)
+        total += chunk["tokens"]
+    return sorted(selected, key=lambda chunk: chunk["index"])
+
+
+class ChunkCache:
+    """On-disk cache of chunk lists, keyed by document content hash and chunking settings."""
+
+    def __init__(self, cache_dir: str):
+        """
+        Open a chunk cache directory.
+
+        Args:
+            cache_dir: Directory for cached chunk files (created if missing)
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, doc_hash: str, max_tokens: int, overlap_tokens: int) -> str:
+        return os.path.join(self.cache_dir, f"{doc_hash}-{max_tokens}-{overlap_tokens}.json")
+
+    def get(self, doc_hash: str, max_tokens: int, overlap_tokens: int) -> Optional[List[Dict[str, Any]]]:
+        """Return cached chunks, or None if the document has not been chunked with these settings."""
+        path = self._path(doc_hash, max_tokens, overlap_tokens)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, doc_hash: str, max_tokens: int, overlap_tokens: int, chunks: List[Dict[str, Any]]):
+        """Store chunks atomically."""
+        path = self._path(doc_hash, max_tokens, overlap_tokens)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(chunks, f)
+        os.replace(temp_path, path)
+
+
+def chunk_document(
+    processor,
+    file_path: str,
+    mime_type: str = "application/pdf",
+    cache: Optional[ChunkCache] = None,
+    max_tokens: int = 800,
+    overlap_tokens: int = 80
+) -> List[Dict[str, Any]]:
+    """
+    Process a document and chunk its text, reusing cached chunks when possible.
+
+    Args:
+        processor: DocumentAIProcessor (only called on a cache miss)
+        file_path: Path to the document file
+        mime_type: MIME type of the document
+        cache: Chunk cache (no caching if None)
+        max_tokens: Token budget per chunk
+        overlap_tokens: Overlap between consecutive chunks
+
+    Returns:
+        List of chunks (see chunk_text)
+    """
+    from job_queue import content_job_id
+
+    doc_hash = content_job_id(file_path, mime_type)
+    if cache is not None:
+        cached = cache.get(doc_hash, max_tokens, overlap_tokens)
+        if cached is not None:
+            return cached
+
+    result = processor.process_document(file_path=file_path, mime_type=mime_type)
+    chunks = chunk_text(
+        result["text"], doc_hash, max_tokens, overlap_tokens,
+        page_offsets=result.get("page_offsets")
+    )
+    if cache is not None:
+        cache.put(doc_hash, max_tokens, overlap_tokens, chunks)
+    return chunks
+
+
+def main():
+    """Command-line interface: chunk a document and print the chunks as JSON."""
+    parser = argparse.ArgumentParser(
+        description="Chunk a processed document for LLM calls"
+    )
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", required=True, help="Document AI processor ID")
+    parser.add_argument("--file-path", required=True, help="Path to document file")
+    parser.add_argument("--mime-type", default="application/pdf", help="Document MIME type")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--cache-dir", default=".chunk_cache", help="Directory for cached chunks")
+    parser.add_argument("--max-tokens", type=int, default=800, help="Token budget per chunk")
+    parser.add_argument("--overlap-tokens", type=int, default=80, help="Overlap between chunks")
+    parser.add_argument("--query", help="Only output the chunks relevant to this question")
+    parser.add_argument("--query-tokens", type=int, default=3000, help="Token budget for --query")
+    args = parser.parse_args()
+
+    from document_processor import DocumentAIProcessor
+
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    chunks = chunk_document(
+        processor, args.file_path, args.mime_type, ChunkCache(args.cache_dir),
+        args.max_tokens, args.overlap_tokens
+    )
+    if args.query:
+        chunks = select_chunks(chunks, args.query, args.query_tokens)
+
+    # Same markers as process_document_sample.py, for the Node.js integration
+    print("RESULT_JSON_START")
+    print(json.dumps(chunks))
+    print("RESULT_JSON_END")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared Helpers
+
+Small functions used by several pipeline modules, kept here so that modules
+do not import each other just to reach a helper.
+"""
+
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Optional, List
+
+_NON_LETTER = re.compile(r"[^a-z ]+")
+# Unambiguous formats; d/m/Y and m/d/Y are tried first in the configured order
+_DATE_FORMATS = (
+    "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d.%m.%Y",
+    "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y",
+)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        samples: Sample values
+        fraction: Percentile as a fraction (e.g. 0.99)
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def mime_type_for(file_path: str) -> str:
+    """
+    MIME type of a scanned file, from its extension.
+
+    Args:
+        file_path: Path of the file
+
+    Returns:
+        MIME type Document AI accepts; unknown extensions are treated as PDF
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    return {
+        ".pdf": "application/pdf",
+        ".png": "image/png",
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+        ".tif": "image/tiff",
+        ".tiff": "image/tiff",
+        ".gif": "image/gif",
+    }.get(extension, "application/pdf")
+
+
+def parse_date(text: str, day_first: bool = True) -> Optional[str]:
+    """
+    Parse a handwritten or typed date.
+
+    Args:
+        text: Date text, e.g. '03/04/2007' or '3 April 2007'
+        day_first: Read ambiguous numeric dates as day/month
+
+    Returns:
+        ISO date (YYYY-MM-DD), or None if the text is not a date
+    """
+    cleaned = " ".join(text.replace(",", " ").split())
+    numeric = ("%d/%m/%Y", "%m/%d/%Y") if day_first else ("%m/%d/%Y", "%d/%m/%Y")
+    for fmt in numeric + _DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_name(name: Optional[str]) -> List[str]:
+    """
+    Split a name into lowercase ASCII parts.
+
+    Args:
+        name: Full name as written on the form
+
+    Returns:
+        Name parts with accents and punctuation removed
+    """
+    if not name:
+        return []
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return _NON_LETTER.sub(" ", ascii_name.lower().replace("-", " ")).split()
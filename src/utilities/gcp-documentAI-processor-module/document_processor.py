@@ -16,11 +16,33 @@ Dependencies:
 """
 
 import os
+import re
+import time
 import argparse
-from typing import Optional, Dict, Any, List
+import tempfile
+import tracemalloc
+from typing import Optional, Dict, Any, List, Iterator, Sequence
 
 from google.cloud import documentai_v1 as documentai
 from google.api_core.client_options import ClientOptions
+from google.api_core.exceptions import InvalidArgument
+
+from result_model import EntityTable
+from page_index import PageOffsetIndex
+from text_anchor import TextAnchorResolver
+from table_extract import extract_tables
+from pdf_pages import PdfPageSplitter, open_pdf_file, open_pdf_pages, synthetic_pdf
+
+# Fields requested in page-window mode; leaves out rendered page images,
+# tokens and symbols, which dominate the size of large responses
+PAGE_WINDOW_FIELDS = [
+    "text",
+    "mime_type",
+    "entities",
+    "pages.page_number",
+    "pages.dimension",
+    "pages.layout",
+]
 
 class DocumentAIProcessor:
     """Class for interacting with Google Cloud Document AI processor."""
@@ -30,7 +52,8 @@ class DocumentAIProcessor:
         project_id: str,
         location: str,
         processor_id: str,
-        credentials_path: Optional[str] = None
+        credentials_path: Optional[str] = None,
+        client=None
     ):
         """
         Initialize the Document AI processor client.
@@ -40,6 +63,7 @@ class DocumentAIProcessor:
             location: Location of the processor (e.g., 'us', 'eu')
             processor_id: Document AI processor ID
             credentials_path: Path to service account credentials JSON file
+            client: DocumentProcessorServiceClient to use instead of creating one
         """
         self.project_id = project_id
         self.location = location
@@ -50,15 +74,17 @@ class DocumentAIProcessor:
             os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
         
         # Initialize Document AI client
-        client_options = ClientOptions(
-            api_endpoint=f"{location}-documentai.googleapis.com"
-        )
-        self.client = documentai.DocumentProcessorServiceClient(
-            client_options=client_options
-        )
+        if client is None:
+            client_options = ClientOptions(
+                api_endpoint=f"{location}-documentai.googleapis.com"
+            )
+            client = documentai.DocumentProcessorServiceClient(
+                client_options=client_options
+            )
+        self.client = client
         
         # Processor name (full resource path)
-        self.processor_name = self.client.processor_path(
+        self.processor_name = documentai.DocumentProcessorServiceClient.processor_path(
             project_id, location, processor_id
         )
     
@@ -89,42 +115,252 @@ class DocumentAIProcessor:
             return "\n".join(summaries)
             
         # If no explicit summary entity, check page-level properties
+        resolver = None
         for page in document.pages:
             for block in page.blocks:
                 if hasattr(block, 'block_type') and 'summary' in str(block.block_type).lower():
-                    return block.layout.text_anchor.content
+                    # Block text lives in document.text; content is usually empty
+                    resolver = resolver or TextAnchorResolver(document)
+                    return resolver.layout_text(block.layout)
                     
         return None
     
-    def extract_entities(self, document) -> List[Dict[str, Any]]:
+    def extract_entities(
+        self,
+        document,
+        page_index: Optional[PageOffsetIndex] = None
+    ) -> EntityTable:
         """
         Extract entities from document.
         
         Args:
             document: DocumentAI document object
+            page_index: Offset index used to find each entity's page
+                (built from the document if omitted)
             
         Returns:
-            List of entity dictionaries
+            EntityTable of entities, usable as a list of entity dictionaries
         """
-        entities = []
+        if page_index is None:
+            page_index = PageOffsetIndex.from_document(document)
+        entities = EntityTable()
         
         for entity in document.entities:
             # Skip summary entities as they're handled separately
             if 'summary' in entity.type_.lower():
                 continue
-                
-            entities.append({
-                "type": entity.type_,
-                "mention_text": entity.mention_text,
-                "confidence": entity.confidence
-            })
+            
+            segments = entity.text_anchor.text_segments
+            start = int(segments[0].start_index) if segments else -1
+            page = page_index.page_for_offset(start) if segments else None
+            if page is None and entity.page_anchor.page_refs:
+                page = int(entity.page_anchor.page_refs[0].page) + 1
+            entities.append(
+                entity.type_,
+                entity.mention_text,
+                entity.confidence,
+                start,
+                int(segments[-1].end_index) if segments else -1,
+                page if page is not None else -1
+            )
             
         return entities
     
+    def extract_form_fields(self, document) -> List[Dict[str, Any]]:
+        """
+        Extract form fields (key/value pairs) from document.
+
+        Args:
+            document: DocumentAI document object from a Form Parser processor
+
+        Returns:
+            List of field dictionaries with name, value, name_confidence,
+            confidence, value_type (e.g. 'filled_checkbox') and page
+        """
+        resolver = TextAnchorResolver(document)
+        fields = []
+        for index, page in enumerate(document.pages):
+            page_number = page.page_number or index + 1
+            for field in page.form_fields:
+                fields.append({
+                    "name": resolver.layout_text(field.field_name).strip(),
+                    "value": resolver.layout_text(field.field_value).strip(),
+                    "name_confidence": field.field_name.confidence,
+                    "confidence": field.field_value.confidence,
+                    "value_type": field.value_type,
+                    "page": page_number,
+                })
+        return fields
+
+    def fetch_document(
+        self,
+        content: bytes,
+        mime_type: str = "application/pdf",
+        pages: Optional[Sequence[int]] = None,
+        fields: Optional[Sequence[str]] = None,
+        splitter: Optional[PdfPageSplitter] = None
+    ):
+        """
+        Send document content to Document AI and return the raw Document.
+        
+        When only some pages of a PDF are wanted, those pages are cut out
+        locally and uploaded on their own; the returned pages keep their
+        original page numbers. Without pypdf the whole file is uploaded with
+        a page selector instead.
+        
+        Args:
+            content: Raw bytes of the document
+            mime_type: MIME type of the document (default: 'application/pdf')
+            pages: 1-based page numbers to process (default: all pages)
+            fields: Document fields to return, as field mask paths (default: all)
+            splitter: Already opened copy of content, for callers that
+                request many page subsets of the same file; content is
+                not read when splitter and pages are given
+            
+        Returns:
+            DocumentAI Document object
+        """
+        pages = list(pages) if pages else None
+        if pages and splitter is None:
+            splitter = open_pdf_pages(content, mime_type)
+        if pages and splitter is not None:
+            content = splitter.extract(pages)
+        
+        raw_document = documentai.RawDocument(
+            content=content, mime_type=mime_type
+        )
+        
+        request = documentai.ProcessRequest(
+            name=self.processor_name,
+            raw_document=raw_document
+        )
+        if pages and splitter is None:
+            request.process_options = documentai.ProcessOptions(
+                individual_page_selector=documentai.ProcessOptions.IndividualPageSelector(
+                    pages=pages
+                )
+            )
+        if fields:
+            request.field_mask = {"paths": list(fields)}
+        
+        response = self.client.process_document(request=request)
+        document = response.document
+        if pages and splitter is not None:
+            for page, page_number in zip(document.pages, pages):
+                page.page_number = page_number
+        return document
+    
+    def extract_page_results(self, document, compact_entities: bool = False) -> List[Dict[str, Any]]:
+        """
+        Split a document into per-page results.
+        
+        Args:
+            document: DocumentAI document object
+            compact_entities: Return each page's entities as an EntityTable
+                instead of a list of dicts
+            
+        Returns:
+            List of page dictionaries with page_number, text and entities
+        """
+        page_entities: Dict[int, EntityTable] = {}
+        for entity in document.entities:
+            if 'summary' in entity.type_.lower():
+                continue
+            page_refs = entity.page_anchor.page_refs
+            index = int(page_refs[0].page) if page_refs else 0
+            segments = entity.text_anchor.text_segments
+            page_number = document.pages[index].page_number if index < len(document.pages) else 0
+            page_entities.setdefault(index, EntityTable()).append(
+                entity.type_,
+                entity.mention_text,
+                entity.confidence,
+                int(segments[0].start_index) if segments else -1,
+                int(segments[-1].end_index) if segments else -1,
+                page_number or index + 1
+            )
+        
+        page_texts = TextAnchorResolver(document).page_texts()
+        results = []
+        for index, page in enumerate(document.pages):
+            entities = page_entities.get(index, EntityTable())
+            results.append({
+                "page_number": page.page_number or index + 1,
+                "text": page_texts[index],
+                "entities": entities if compact_entities else entities.to_list(),
+            })
+        return results
+    
+    def process_document_pages(
+        self,
+        file_path: str,
+        mime_type: str = "application/pdf",
+        window_size: int = 10,
+        compact_entities: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Process a large document a window of pages at a time.
+        
+        Each window is requested separately and its Document is released
+        before the next one is fetched. PDF windows are read from the file
+        and split out locally one at a time, so each request uploads only its
+        own pages and neither the file nor its parsed pages stay in memory:
+        peak memory depends on the window size rather than on the page
+        count. Other documents, and PDFs when pypdf is missing, are read
+        whole and sent with a page selector.
+        
+        Args:
+            file_path: Path to the document file
+            mime_type: MIME type of the document (default: 'application/pdf')
+            window_size: Number of pages requested per call
+            compact_entities: Yield each page's entities as an EntityTable
+                instead of a list of dicts
+            
+        Yields:
+            Per-page dictionaries with page_number, text and entities
+        """
+        splitter = open_pdf_file(file_path, mime_type)
+        if splitter is not None:
+            with splitter:
+                for first_page in range(1, len(splitter) + 1, window_size):
+                    window = range(first_page, min(first_page + window_size, len(splitter) + 1))
+                    document = self.fetch_document(
+                        b"", mime_type, pages=window, fields=PAGE_WINDOW_FIELDS, splitter=splitter
+                    )
+                    page_results = self.extract_page_results(document, compact_entities)
+                    del document
+                    yield from page_results
+            return
+        
+        with open(file_path, "rb") as f:
+            document_content = f.read()
+        first_page = 1
+        while True:
+            window = range(first_page, first_page + window_size)
+            try:
+                document = self.fetch_document(
+                    document_content, mime_type, pages=window, fields=PAGE_WINDOW_FIELDS
+                )
+            except InvalidArgument:
+                # Asked for pages past the end of a document whose page count
+                # is an exact multiple of the window size
+                if first_page == 1:
+                    raise
+                return
+            
+            page_results = self.extract_page_results(document, compact_entities)
+            del document
+            yield from page_results
+            if len(page_results) < window_size:
+                return
+            first_page += window_size
+    
     def process_document(
         self, 
         file_path: str, 
-        mime_type: str = "application/pdf"
+        mime_type: str = "application/pdf",
+        include_layout: bool = False,
+        include_tables: bool = False,
+        compact_entities: bool = False
     ) -> Dict[str, Any]:
         """
         Process a document using Document AI.
@@ -132,6 +368,10 @@ class DocumentAIProcessor:
         Args:
             file_path: Path to the document file
             mime_type: MIME type of the document (default: 'application/pdf')
+            include_layout: Add per-page block, paragraph and line text under 'layout'
+            include_tables: Add the document's tables under 'tables' (see table_extract.py)
+            compact_entities: Return entities as a columnar EntityTable (see
+                result_model.py) instead of a list of dicts
             
         Returns:
             Dict containing the processed document information
@@ -140,52 +380,208 @@ class DocumentAIProcessor:
         with open(file_path, "rb") as f:
             document_content = f.read()
         
-        # Create the document object
-        raw_document = documentai.RawDocument(
-            content=document_content, mime_type=mime_type
-        )
-        
-        # Configure the process request
-        request = documentai.ProcessRequest(
-            name=self.processor_name,
-            raw_document=raw_document
+        return self.process_content(
+            document_content, mime_type, include_layout, include_tables, compact_entities
         )
+    
+    def process_content(
+        self,
+        content: bytes,
+        mime_type: str = "application/pdf",
+        include_layout: bool = False,
+        include_tables: bool = False,
+        compact_entities: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Process in-memory document content using Document AI.
         
+        Args:
+            content: Raw bytes of the document
+            mime_type: MIME type of the document (default: 'application/pdf')
+            include_layout: Add per-page block, paragraph and line text under 'layout'
+            include_tables: Add the document's tables (pages, header, column_types
+                and rows of cell text) under 'tables'
+            compact_entities: Return entities as a columnar EntityTable, which
+                needs result_model.json_default to serialize, instead of a
+                list of dicts
+            
+        Returns:
+            Dict containing the processed document information
+        """
         # Process the document
-        response = self.client.process_document(request=request)
-        document = response.document
+        document = self.fetch_document(content, mime_type)
         
         # Extract summary if available (for NotesSummarizer processor)
         summary = self.extract_summary(document)
         
+        # Index page text offsets once for entity and sentence lookups
+        page_index = PageOffsetIndex.from_document(document)
+        
+        entities = self.extract_entities(document, page_index)
+        
         # Create base result
         result = {
             "text": document.text,
             "pages": len(document.pages),
-            "entities": self.extract_entities(document),
+            "page_offsets": page_index.to_list(),
+            "entities": entities if compact_entities else entities.to_list(),
             "mime_type": document.mime_type,
         }
         
         # Add summary if found
         if summary:
             result["summary"] = summary
+            result["summary_sentences"] = page_index.locate_sentences(summary)
+        
+        if include_layout:
+            result["layout"] = TextAnchorResolver(document).resolve_layouts()
+        
+        if include_tables:
+            result["tables"] = [table.to_dict() for table in extract_tables(document)]
             
         return result
 
+class EchoClient:
+    """
+    Stand-in Document AI client for benchmarks and tests.
+    
+    Understands PDFs built by pdf_pages.synthetic_pdf: each uploaded page is
+    recognised by its "Page N" marker and answered with synthetic text, one
+    token per word unless the field mask leaves tokens out. Counts the
+    requests and bytes it received.
+    """
+    
+    def __init__(self, words_per_page: int = 250):
+        self.words_per_page = words_per_page
+        self.requests = 0
+        self.uploaded_bytes = 0
+        self.uploaded_pages: List[List[int]] = []
+    
+    def process_document(self, request):
+        content = request.raw_document.content
+        uploaded = [int(n) for n in re.findall(rb"\(Page (\d+)\) Tj", content)]
+        self.requests += 1
+        self.uploaded_bytes += len(content)
+        self.uploaded_pages.append(uploaded)
+        
+        selector = list(request.process_options.individual_page_selector.pages)
+        selected = [uploaded[i - 1] for i in selector] if selector else uploaded
+        paths = list(request.field_mask.paths)
+        with_tokens = not paths or "pages.tokens" in paths
+        
+        def layout(start: int, end: int):
+            segment = documentai.Document.TextAnchor.TextSegment(start_index=start, end_index=end)
+            return documentai.Document.Page.Layout(
+                text_anchor=documentai.Document.TextAnchor(text_segments=[segment])
+            )
+        
+        parts: List[str] = []
+        pages = []
+        offset = 0
+        for position, page_number in enumerate(selected, 1):
+            words = [f"Page {page_number}"] + [f"word{i}" for i in range(self.words_per_page)]
+            page_text = " ".join(words) + "\n"
+            tokens = []
+            if with_tokens:
+                start = offset
+                for word in words:
+                    tokens.append(documentai.Document.Page.Token(layout=layout(start, start + len(word))))
+                    start += len(word) + 1
+            pages.append(documentai.Document.Page(
+                # Like the service, number pages by their position in the upload
+                page_number=selector[position - 1] if selector else position,
+                layout=layout(offset, offset + len(page_text)),
+                tokens=tokens
+            ))
+            parts.append(page_text)
+            offset += len(page_text)
+        document = documentai.Document(
+            text="".join(parts), mime_type=request.raw_document.mime_type, pages=pages
+        )
+        return documentai.ProcessResponse(document=document)
+
+
+def benchmark_page_windows(
+    page_count: int = 100,
+    window_size: int = 10,
+    modes: Sequence[str] = ("whole document", "page windows")
+) -> List[Dict[str, Any]]:
+    """
+    Compare whole-document and page-window processing of a synthetic PDF.
+    
+    Both runs use EchoClient, so the figures cover this module's own work:
+    bytes uploaded, requests made and peak Python heap traced by tracemalloc.
+    Protobuf messages allocated outside the Python allocator are not counted,
+    so the traced peak understates both modes.
+    
+    Args:
+        page_count: Pages in the synthetic PDF
+        window_size: Pages per request in page-window mode
+        modes: Modes to run
+        
+    Returns:
+        One dict per mode with mode, requests, uploaded_bytes, peak_bytes and elapsed_s
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.pdf")
+        with open(path, "wb") as f:
+            f.write(synthetic_pdf(page_count))
+        
+        for mode in modes:
+            client = EchoClient()
+            processor = DocumentAIProcessor("benchmark", "us", "echo", client=client)
+            tracemalloc.start()
+            started = time.perf_counter()
+            if mode == "whole document":
+                processor.process_document(path)
+            else:
+                for _ in processor.process_document_pages(path, window_size=window_size):
+                    pass
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append({
+                "mode": mode,
+                "requests": client.requests,
+                "uploaded_bytes": client.uploaded_bytes,
+                "peak_bytes": peak,
+                "elapsed_s": elapsed,
+            })
+    return results
+
+
 def main():
     """Command-line interface for the Document AI processor."""
     parser = argparse.ArgumentParser(
         description="Process documents using Google Cloud Document AI"
     )
-    parser.add_argument("--project-id", required=True, help="GCP Project ID")
-    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
-    parser.add_argument("--processor-id", required=True, help="Document AI processor ID")
-    parser.add_argument("--file-path", required=True, help="Path to document file")
+    parser.add_argument("--project-id", help="GCP Project ID")
+    parser.add_argument("--location", help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", help="Document AI processor ID")
+    parser.add_argument("--file-path", help="Path to document file")
     parser.add_argument("--mime-type", default="application/pdf", help="Document MIME type")
     parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--page-window", type=int, help="Process large documents this many pages at a time")
+    parser.add_argument("--benchmark", type=int, metavar="PAGES",
+                        help="Compare whole-document and page-window memory on a synthetic "
+                             "PDF with a local stand-in client")
     
     args = parser.parse_args()
     
+    if args.benchmark:
+        window_size = args.page_window or 10
+        print(f"{args.benchmark}-page synthetic PDF, {window_size}-page windows:")
+        for result in benchmark_page_windows(args.benchmark, window_size):
+            print(f"{result['mode']:>15}: {result['requests']:>4} requests, "
+                  f"{result['uploaded_bytes'] / 1024:>8.0f} KiB uploaded, "
+                  f"peak {result['peak_bytes'] / (1024 * 1024):>6.1f} MiB traced, "
+                  f"{result['elapsed_s']:.2f}s")
+        return
+    if not (args.project_id and args.location and args.processor_id and args.file_path):
+        parser.error("--project-id, --location, --processor-id and --file-path are required "
+                     "unless --benchmark is given")
+    
     processor = DocumentAIProcessor(
         project_id=args.project_id,
         location=args.location,
@@ -193,6 +589,17 @@ def main():
         credentials_path=args.credentials
     )
     
+    if args.page_window:
+        print("Document Processing Results (page windows):")
+        for page in processor.process_document_pages(
+            file_path=args.file_path,
+            mime_type=args.mime_type,
+            window_size=args.page_window
+        ):
+            print(f"Page {page['page_number']}: {len(page['text'])} chars, "
+                  f"{len(page['entities'])} entities")
+        return
+    
     result = processor.process_document(
         file_path=args.file_path,
         mime_type=args.mime_type
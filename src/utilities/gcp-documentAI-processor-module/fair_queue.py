@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-Tenant Fair Queueing for a Shared Worker Pool
+
+This module puts weighted fair queueing in front of the processor workers so
+that one school bulk-uploading thousands of forms cannot starve the other
+schools' interactive requests.
+
+Requests are queued per tenant (school ID) and dispatched by deficit round
+robin (DRR): each tenant earns `quantum * weight` credit per round and may
+dispatch work while its credit covers the cost of its next request. A tenant
+can also be capped to a maximum number of requests in flight.
+
+Running the module directly simulates a noisy tenant against quiet ones and
+prints per-tenant latency percentiles with and without the noisy load.
+"""
+
+import sys
+import time
+import heapq
+import random
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple, Callable, Deque
+
+from common import percentile
+
+
+class _TenantState:
+    """Queue, DRR credit and metrics for one tenant."""
+
+    __slots__ = (
+        "weight", "max_concurrency", "queue", "deficit", "credited",
+        "in_flight", "completed", "wait_times", "latencies"
+    )
+
+    def __init__(self, weight: float, max_concurrency: Optional[int], samples: int):
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.queue: Deque[Tuple[Any, float, float]] = deque()
+        self.deficit = 0.0
+        self.credited = False
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_times: Deque[float] = deque(maxlen=samples)
+        self.latencies: Deque[float] = deque(maxlen=samples)
+
+    def saturated(self) -> bool:
+        return self.max_concurrency is not None and self.in_flight >= self.max_concurrency
+
+
+class Ticket:
+    """Handle for a dispatched request, passed back to FairQueue.task_done()."""
+
+    __slots__ = ("tenant_id", "item", "enqueued_at", "dispatched_at")
+
+    def __init__(self, tenant_id: str, item: Any, enqueued_at: float, dispatched_at: float):
+        self.tenant_id = tenant_id
+        self.item = item
+        self.enqueued_at = enqueued_at
+        self.dispatched_at = dispatched_at
+
+
+class FairQueue:
+    """Thread-safe deficit round robin queue keyed by tenant ID."""
+
+    def __init__(
+        self,
+        quantum: float = 1.0,
+        default_weight: float = 1.0,
+        default_max_concurrency: Optional[int] = None,
+        latency_samples: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Create an empty fair queue.
+
+        Args:
+            quantum: Credit a weight-1 tenant earns per round
+            default_weight: Weight for tenants that were not configured
+            default_max_concurrency: In-flight cap for tenants that were not configured
+            latency_samples: Number of recent latencies kept per tenant
+            clock: Time source (injectable for simulations)
+        """
+        self.quantum = quantum
+        self.default_weight = default_weight
+        self.default_max_concurrency = default_max_concurrency
+        self.latency_samples = latency_samples
+        self.clock = clock
+
+        self._tenants: Dict[str, _TenantState] = {}
+        self._active: Deque[str] = deque()
+        self._cond = threading.Condition()
+
+    def _tenant(self, tenant_id: str) -> _TenantState:
+        state = self._tenants.get(tenant_id)
+        if state is None:
+            state = _TenantState(
+                self.default_weight, self.default_max_concurrency, self.latency_samples
+            )
+            self._tenants[tenant_id] = state
+        return state
+
+    def configure_tenant(
+        self,
+        tenant_id: str,
+        weight: float = 1.0,
+        max_concurrency: Optional[int] = None
+    ):
+        """
+        Set a tenant's weight and concurrency cap.
+
+        Args:
+            tenant_id: Tenant (school) ID
+            weight: Relative share of the worker pool
+            max_concurrency: Maximum requests in flight (None for no cap)
+        """
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._cond:
+            state = self._tenant(tenant_id)
+            state.weight = weight
+            state.max_concurrency = max_concurrency
+            self._cond.notify_all()
+
+    def put(self, tenant_id: str, item: Any, cost: float = 1.0):
+        """
+        Queue a request for a tenant.
+
+        Args:
+            tenant_id: Tenant (school) ID
+            item: The request payload
+            cost: Relative cost of the request (e.g. page count)
+        """
+        with self._cond:
+            state = self._tenant(tenant_id)
+            if not state.queue:
+                self._active.append(tenant_id)
+            state.queue.append((item, cost, self.clock()))
+            self._cond.notify()
+
+    def _select(self) -> Optional[Ticket]:
+        """Pick the next request by DRR, or None if every queued tenant is saturated."""
+        if not any(not self._tenants[t].saturated() for t in self._active):
+            return None
+        while True:
+            tenant_id = self._active[0]
+            state = self._tenants[tenant_id]
+            if state.saturated():
+                self._active.rotate(-1)
+                continue
+            if not state.credited:
+                state.deficit += self.quantum * state.weight
+                state.credited = True
+            item, cost, enqueued_at = state.queue[0]
+            if state.deficit < cost:
+                # Turn over; keep the credit for the next round
+                state.credited = False
+                self._active.rotate(-1)
+                continue
+            state.queue.popleft()
+            state.deficit -= cost
+            state.in_flight += 1
+            if not state.queue:
+                state.deficit = 0.0
+                state.credited = False
+                self._active.popleft()
+            return Ticket(tenant_id, item, enqueued_at, self.clock())
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Optional[Ticket]:
+        """
+        Take the next request to dispatch.
+
+        Args:
+            block: Wait for a request if none is dispatchable
+            timeout: Maximum seconds to wait when blocking
+
+        Returns:
+            A Ticket, or None if nothing became dispatchable in time
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while True:
+                ticket = self._select() if self._active else None
+                if ticket is not None or not block:
+                    return ticket
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def task_done(self, ticket: Ticket):
+        """
+        Release a tenant's concurrency slot and record the request's latency.
+
+        Args:
+            ticket: Ticket returned by get()
+        """
+        now = self.clock()
+        with self._cond:
+            state = self._tenants[ticket.tenant_id]
+            state.in_flight -= 1
+            state.completed += 1
+            state.wait_times.append(ticket.dispatched_at - ticket.enqueued_at)
+            state.latencies.append(now - ticket.enqueued_at)
+            self._cond.notify_all()
+
+    def depth(self, tenant_id: Optional[str] = None) -> int:
+        """
+        Number of queued (not yet dispatched) requests.
+
+        Args:
+            tenant_id: Tenant to count, or None for all tenants
+        """
+        with self._cond:
+            if tenant_id is not None:
+                state = self._tenants.get(tenant_id)
+                return len(state.queue) if state else 0
+            return sum(len(state.queue) for state in self._tenants.values())
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Report per-tenant queue depth and latency.
+
+        Returns:
+            Dict mapping tenant ID to depth, in_flight, completed, weight,
+            max_concurrency and p50/p99 queue wait and end-to-end latency
+        """
+        with self._cond:
+            report = {}
+            for tenant_id, state in self._tenants.items():
+                waits = list(state.wait_times)
+                latencies = list(state.latencies)
+                report[tenant_id] = {
+                    "depth": len(state.queue),
+                    "in_flight": state.in_flight,
+                    "completed": state.completed,
+                    "weight": state.weight,
+                    "max_concurrency": state.max_concurrency,
+                    "wait_p50": percentile(waits, 0.50),
+                    "wait_p99": percentile(waits, 0.99),
+                    "latency_p50": percentile(latencies, 0.50),
+                    "latency_p99": percentile(latencies, 0.99),
+                }
+            return report
+
+
+class FairWorkerPool:
+    """Pool of worker threads that process documents in fair-queue order."""
+
+    def __init__(self, processor, workers: int = 4, queue: Optional[FairQueue] = None):
+        """
+        Start the worker threads.
+
+        Args:
+            processor: Object with a process_document(file_path, mime_type) method
+            workers: Number of worker threads
+            queue: Fair queue to dispatch from (a default FairQueue if omitted)
+        """
+        self.processor = processor
+        self.queue = queue or FairQueue()
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"fair-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        tenant_id: str,
+        file_path: str,
+        mime_type: str = "application/pdf",
+        cost: float = 1.0
+    ) -> Future:
+        """
+        Queue a document for a tenant.
+
+        Args:
+            tenant_id: Tenant (school) ID
+            file_path: Path to the document file
+            mime_type: MIME type of the document
+            cost: Relative cost of the request (e.g. page count)
+
+        Returns:
+            Future resolving to the process_document result
+        """
+        if self._stopping:
+            raise RuntimeError("cannot submit to a pool that is shutting down")
+        future: Future = Future()
+        self.queue.put(tenant_id, (future, file_path, mime_type), cost)
+        return future
+
+    def _run(self):
+        while True:
+            ticket = self.queue.get(timeout=0.5)
+            if ticket is None:
+                if self._stopping and self.queue.depth() == 0:
+                    return
+                continue
+            future, file_path, mime_type = ticket.item
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(self.processor.process_document(
+                            file_path=file_path, mime_type=mime_type
+                        ))
+                    except Exception as e:
+                        future.set_exception(e)
+            finally:
+                self.queue.task_done(ticket)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting work and let the workers drain the queue.
+
+        Args:
+            wait: Block until all queued documents have been processed
+        """
+        self._stopping = True
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+def simulate(
+    tenants: Dict[str, Dict[str, float]],
+    workers: int = 8,
+    duration: float = 600.0,
+    seed: int = 7
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Discrete-event simulation of tenants sharing a worker pool through a FairQueue.
+
+    Each tenant is described by a dict with 'rate' (Poisson arrivals per
+    second) or 'burst' (requests all arriving at t=0), 'service' (mean
+    service seconds, exponentially distributed) and optional 'weight' and
+    'max_concurrency'.
+
+    Args:
+        tenants: Tenant ID to workload description
+        workers: Number of workers in the pool
+        duration: Simulated seconds of arrivals
+        seed: Random seed
+
+    Returns:
+        FairQueue.metrics() at the end of the simulation
+    """
+    rng = random.Random(seed)
+    now = [0.0]
+    queue = FairQueue(clock=lambda: now[0])
+    events: List[Tuple[float, int, str, Any]] = []
+    sequence = 0
+
+    for tenant_id, spec in tenants.items():
+        queue.configure_tenant(
+            tenant_id,
+            weight=spec.get("weight", 1.0),
+            max_concurrency=spec.get("max_concurrency")
+        )
+        if "burst" in spec:
+            arrivals = [0.0] * int(spec["burst"])
+        else:
+            arrivals, t = [], rng.expovariate(spec["rate"])
+            while t < duration:
+                arrivals.append(t)
+                t += rng.expovariate(spec["rate"])
+        for t in arrivals:
+            heapq.heappush(events, (t, sequence, "arrive", tenant_id))
+            sequence += 1
+
+    idle = workers
+    while events:
+        now[0], _, kind, payload = heapq.heappop(events)
+        if kind == "arrive":
+            queue.put(payload, payload)
+        else:
+            queue.task_done(payload)
+            idle += 1
+        while idle:
+            ticket = queue.get(block=False)
+            if ticket is None:
+                break
+            idle -= 1
+            service = rng.expovariate(1.0 / tenants[ticket.tenant_id]["service"])
+            heapq.heappush(events, (now[0] + service, sequence, "done", ticket))
+            sequence += 1
+
+    return queue.metrics()
+
+
+def main():
+    """Run the noisy-tenant simulation and print per-tenant latency."""
+    parser = argparse.ArgumentParser(
+        description="Simulate fair queueing of tenants sharing a worker pool"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Worker pool size")
+    parser.add_argument("--quiet-tenants", type=int, default=5, help="Number of interactive tenants")
+    parser.add_argument("--noisy-burst", type=int, default=10000, help="Documents bulk-uploaded by the noisy tenant")
+    parser.add_argument("--noisy-cap", type=int, default=None, help="Concurrency cap for the noisy tenant")
+    parser.add_argument("--duration", type=float, default=600.0, help="Simulated seconds")
+    args = parser.parse_args()
+
+    quiet = {
+        f"school-{i}": {"rate": 0.5, "service": 1.0}
+        for i in range(args.quiet_tenants)
+    }
+    noisy = dict(quiet)
+    noisy["noisy-school"] = {
+        "burst": args.noisy_burst, "service": 1.0, "max_concurrency": args.noisy_cap
+    }
+
+    baseline = simulate(quiet, workers=args.workers, duration=args.duration)
+    loaded = simulate(noisy, workers=args.workers, duration=args.duration)
+
+    print(f"{'tenant':<14} {'p99 alone (s)':>14} {'p99 w/ noisy (s)':>17} {'completed':>10}")
+    for tenant_id in sorted(loaded):
+        alone = baseline.get(tenant_id, {}).get("latency_p99")
+        alone_text = f"{alone:.2f}" if alone is not None else "-"
+        print(f"{tenant_id:<14} {alone_text:>14} "
+              f"{loaded[tenant_id]['latency_p99']:>17.2f} {loaded[tenant_id]['completed']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
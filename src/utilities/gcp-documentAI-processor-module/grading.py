@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized Auto-Grading of Digitized Answers
+
+Grades a cohort's ExamSubmission answers against ExamQuestion.answer as a
+students x questions matrix instead of question by question:
+
+- Multiple-choice questions (questions with options) compare the chosen
+  option index with the key in one vectorized equality per question. The
+  chosen option is read from a letter ("b", "(B)", "Option B"), a number, or
+  the option text itself.
+- Short answers are normalized (case, punctuation, whitespace) and compared
+  by Levenshtein distance. The distance of every distinct answer to the key
+  is computed at once with a NumPy dynamic program that stops as soon as all
+  remaining answers are past the cutoff. Similarity above `full_credit`
+  earns full points, below `partial_credit` nothing, and linear partial
+  credit in between, which absorbs small OCR errors.
+
+Credits are weighted by ExamQuestion.points to give each submission's score.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import string
+import argparse
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_OPTION_LETTER = re.compile(r"^(?:option|opt|ans(?:wer)?)?\s*\(?([a-z])\)?[.)]?$")
+_OPTION_NUMBER = re.compile(r"^(?:option|opt)?\s*\(?(\d{1,2})\)?[.)]?$")
+
+
+def normalize_answer(text: Optional[str]) -> str:
+    """
+    Normalize an answer for comparison.
+
+    Args:
+        text: Answer text as extracted or as written in the key
+
+    Returns:
+        Lowercase text with punctuation removed and whitespace collapsed
+    """
+    if not text:
+        return ""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def option_index(text: Optional[str], options: List[str]) -> int:
+    """
+    Work out which option an MCQ answer refers to.
+
+    The option texts are matched first, so with numeric options such as
+    ['3', '4', '5', '6'] an answer of '4' is the option "4", not the fourth
+    option; letters and numbers are only read as positions otherwise.
+
+    Args:
+        text: Answer text ('B', '(b)', 'Option 2' or the option text)
+        options: The question's options
+
+    Returns:
+        0-based option index, or -1 if the answer is blank or unrecognized
+    """
+    normalized = normalize_answer(text)
+    if not normalized:
+        return -1
+    choices = [normalize_answer(option) for option in options]
+    if normalized in choices:
+        return choices.index(normalized)
+
+    raw = (text or "").strip().lower()
+    match = _OPTION_LETTER.match(raw)
+    if match and ord(match.group(1)) - ord("a") < len(options):
+        return ord(match.group(1)) - ord("a")
+    match = _OPTION_NUMBER.match(raw)
+    if match and 1 <= int(match.group(1)) <= len(options):
+        return int(match.group(1)) - 1
+
+    similarities = similarity_to_key(normalized, choices)
+    best = int(np.argmax(similarities))
+    return best if similarities[best] >= 0.8 else -1
+
+
+def bounded_edit_distances(key: str, answers: List[str], max_distance: int) -> np.ndarray:
+    """
+    Levenshtein distance from one key to many answers, capped at max_distance + 1.
+
+    The dynamic program advances one key character at a time for all answers
+    together; insertions along a row are resolved with a cumulative minimum.
+    Rows stop being computed once every answer is beyond max_distance.
+
+    Args:
+        key: Reference string
+        answers: Strings to compare with the key
+        max_distance: Distances above this are reported as max_distance + 1
+
+    Returns:
+        int array of distances, one per answer
+    """
+    count = len(answers)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+    lengths = np.fromiter((len(answer) for answer in answers), dtype=np.int64, count=count)
+    width = int(lengths.max()) if count else 0
+    codes = np.zeros((count, width), dtype=np.int64)
+    for row, answer in enumerate(answers):
+        if answer:
+            codes[row, :len(answer)] = np.frombuffer(answer.encode("utf-32-le"), dtype=np.uint32)
+
+    cap = max_distance + 1
+    columns = np.arange(width + 1, dtype=np.int64)
+    previous = np.broadcast_to(columns, (count, width + 1)).copy()
+    for i, char in enumerate(key, start=1):
+        substitution = previous[:, :-1] + (codes != ord(char))
+        deletion = previous[:, 1:] + 1
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(substitution, deletion)
+        # current[j] = min(current[j], current[j - 1] + 1) along the row
+        current = np.minimum.accumulate(current - columns, axis=1) + columns
+        previous = current
+        if (current.min(axis=1) > max_distance).all():
+            return np.full(count, cap, dtype=np.int64)
+    distances = previous[np.arange(count), lengths]
+    return np.minimum(distances, cap)
+
+
+def similarity_to_key(key: str, answers: List[str], min_similarity: float = 0.0) -> np.ndarray:
+    """
+    Normalized edit similarity (1 - distance / longer length) of answers to a key.
+
+    Args:
+        key: Normalized reference answer
+        answers: Normalized answers
+        min_similarity: Similarities below this may be reported as 0 (enables the early cutoff)
+
+    Returns:
+        float array of similarities between 0 and 1
+    """
+    if not answers:
+        return np.zeros(0)
+    lengths = np.fromiter((len(answer) for answer in answers), dtype=np.float64, count=len(answers))
+    longest = np.maximum(lengths, len(key))
+    max_distance = int(np.ceil((1.0 - min_similarity) * longest.max()))
+    distances = bounded_edit_distances(key, answers, max_distance)
+    similarity = 1.0 - distances / np.maximum(longest, 1.0)
+    similarity[(lengths == 0) & (len(key) > 0)] = 0.0
+    return np.clip(similarity, 0.0, 1.0)
+
+
+class Grader:
+    """Grades answer matrices for one exam."""
+
+    def __init__(
+        self,
+        questions: List[Dict[str, Any]],
+        full_credit: float = 0.9,
+        partial_credit: float = 0.7
+    ):
+        """
+        Prepare the answer key.
+
+        Args:
+            questions: ExamQuestion records (id, answer, points, optional options)
+            full_credit: Short-answer similarity that earns full points
+            partial_credit: Short-answer similarity below which nothing is earned
+        """
+        if not 0.0 <= partial_credit <= full_credit <= 1.0:
+            raise ValueError("expected 0 <= partial_credit <= full_credit <= 1")
+        self.questions = questions
+        self.question_ids = [question["id"] for question in questions]
+        self.points = np.array([float(question.get("points", 1)) for question in questions])
+        self.full_credit = full_credit
+        self.partial_credit = partial_credit
+        self.is_mcq = np.array([bool(question.get("options")) for question in questions])
+        self.keys = [
+            option_index(question["answer"], question["options"]) if question.get("options")
+            else normalize_answer(question["answer"])
+            for question in questions
+        ]
+
+    def answer_matrix(self, submissions: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        Arrange submissions' answers as rows of a students x questions matrix.
+
+        Args:
+            submissions: ExamSubmission records
+
+        Returns:
+            One row per submission, one answer string per question ('' if unanswered)
+        """
+        return [
+            [submission.get("answers", {}).get(question_id) or "" for question_id in self.question_ids]
+            for submission in submissions
+        ]
+
+    def credit(self, answers: List[List[str]], choices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Per-question credit for an answer matrix.
+
+        Args:
+            answers: students x questions answer strings (see answer_matrix)
+            choices: option_choices of the same answers, if already computed
+
+        Returns:
+            float array (students x questions) of credit between 0 and 1
+        """
+        students = len(answers)
+        credit = np.zeros((students, len(self.questions)))
+        if students == 0:
+            return credit
+        for column in range(len(self.questions)):
+            if self.is_mcq[column]:
+                continue
+            # Identical answers are graded once; cohorts repeat answers a lot
+            unique, inverse = np.unique(
+                np.array([row[column] for row in answers], dtype=object).astype(str), return_inverse=True
+            )
+            normalized = [normalize_answer(text) for text in unique]
+            similarity = similarity_to_key(self.keys[column], normalized, self.partial_credit)
+            scaled = (similarity - self.partial_credit) / max(self.full_credit - self.partial_credit, 1e-9)
+            scaled[similarity >= self.full_credit] = 1.0
+            credit[:, column] = np.clip(scaled, 0.0, 1.0)[inverse]
+
+        if choices is None:
+            choices = self.option_choices(answers)
+        keys = np.array([key if mcq else -1 for key, mcq in zip(self.keys, self.is_mcq)])
+        mcq = self.is_mcq & (keys >= 0)
+        credit[:, mcq] = choices[:, mcq] == keys[mcq]
+        return credit
+
+    def option_choices(self, answers: List[List[str]]) -> np.ndarray:
+        """
+        Chosen option indices for an answer matrix.
+
+        Args:
+            answers: students x questions answer strings (see answer_matrix)
+
+        Returns:
+            int array (students x questions) of 0-based option indices; -1 for
+            blank or unrecognized answers and for questions without options
+        """
+        choices = np.full((len(answers), len(self.questions)), -1, dtype=np.int64)
+        for column, question in enumerate(self.questions):
+            if not self.is_mcq[column] or not answers:
+                continue
+            unique, inverse = np.unique(
+                np.array([row[column] for row in answers], dtype=object).astype(str), return_inverse=True
+            )
+            chosen = np.array([option_index(text, question["options"]) for text in unique])
+            choices[:, column] = chosen[inverse]
+        return choices
+
+    def grade(self, submissions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Grade a cohort's submissions.
+
+        Args:
+            submissions: ExamSubmission records
+
+        Returns:
+            Dict with question_ids, credit (students x questions array),
+            choices (option_choices, same shape), points_earned (same shape),
+            scores (one per submission) and max_score
+        """
+        answers = self.answer_matrix(submissions)
+        choices = self.option_choices(answers)
+        credit = self.credit(answers, choices)
+        earned = credit * self.points[None, :]
+        return {
+            "question_ids": self.question_ids,
+            "credit": credit,
+            "choices": choices,
+            "points_earned": earned,
+            "scores": earned.sum(axis=1),
+            "max_score": float(self.points.sum()),
+        }
+
+    def grade_submissions(self, submissions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Grade submissions and return copies with score filled in.
+
+        Args:
+            submissions: ExamSubmission records
+
+        Returns:
+            Submissions with score, plus partialCredit (question ID -> points earned)
+        """
+        graded = self.grade(submissions)
+        results = []
+        for row, submission in enumerate(submissions):
+            result = dict(submission)
+            result["score"] = round(float(graded["scores"][row]), 2)
+            result["partialCredit"] = {
+                question_id: round(float(points), 2)
+                for question_id, points in zip(self.question_ids, graded["points_earned"][row])
+            }
+            results.append(result)
+        return results
+
+
+def synthetic_exam(students: int, questions: int, seed: int = 9) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Generate an exam (half MCQ, half short answer) and noisy submissions.
+
+    Args:
+        students: Number of submissions
+        questions: Number of questions
+        seed: Random seed
+
+    Returns:
+        (questions, submissions)
+    """
+    rng = random.Random(seed)
+    words = ["mitochondria", "photosynthesis", "osmosis", "newton", "gravity", "enzyme",
+             "velocity", "nucleus", "electron", "democracy", "equator", "oxygen"]
+    exam_questions = []
+    for index in range(questions):
+        if index % 2 == 0:
+            options = [rng.choice(words) for _ in range(4)]
+            exam_questions.append({"id": f"q{index}", "options": options,
+                                   "answer": "abcd"[rng.randrange(4)], "points": 1})
+        else:
+            exam_questions.append({"id": f"q{index}", "answer": " ".join(rng.sample(words, 2)),
+                                   "points": 2})
+
+    def noisy(text: str) -> str:
+        chars = list(text)
+        for _ in range(rng.randint(0, 2)):
+            if chars:
+                chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+        return "".join(chars)
+
+    submissions = []
+    for student in range(students):
+        answers = {}
+        for question in exam_questions:
+            if question.get("options"):
+                answers[question["id"]] = rng.choice(["A", "b", "(C)", "d.", question["answer"]])
+            else:
+                answers[question["id"]] = noisy(question["answer"]) if rng.random() < 0.7 \
+                    else " ".join(rng.sample(words, 2))
+        submissions.append({"id": f"s{student}", "userId": f"u{student}", "answers": answers})
+    return exam_questions, submissions
+
+
+def main():
+    """Command-line interface: grade ExamSubmission files, or benchmark the grader."""
+    parser = argparse.ArgumentParser(
+        description="Grade ExamSubmission answers against the exam key"
+    )
+    parser.add_argument("--exam", help="Exam JSON file with questions (see answer_sheets.py)")
+    parser.add_argument("--submissions-dir", help="Directory of ExamSubmission JSON files; scores are written back")
+    parser.add_argument("--full-credit", type=float, default=0.9, help="Similarity for full short-answer credit")
+    parser.add_argument("--partial-credit", type=float, default=0.7, help="Similarity below which no credit is given")
+    parser.add_argument("--benchmark", metavar="STUDENTSxQUESTIONS",
+                        help="Grade a synthetic cohort, e.g. 1000x50")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        students, questions = (int(part) for part in args.benchmark.lower().split("x"))
+        exam_questions, submissions = synthetic_exam(students, questions)
+        grader = Grader(exam_questions, args.full_credit, args.partial_credit)
+        started = time.perf_counter()
+        graded = grader.grade(submissions)
+        elapsed = time.perf_counter() - started
+        print(f"{students} x {questions} graded in {elapsed * 1000:.0f} ms, "
+              f"mean score {graded['scores'].mean():.1f} / {graded['max_score']:.0f}")
+        return 0
+
+    if not args.exam or not args.submissions_dir:
+        parser.error("--exam and --submissions-dir, or --benchmark, are required")
+    with open(args.exam, "r", encoding="utf-8") as f:
+        exam_questions = json.load(f)["questions"]
+
+    paths = sorted(
+        os.path.join(args.submissions_dir, name) for name in os.listdir(args.submissions_dir)
+        if name.endswith(".json") and name != "manifest.json"
+    )
+    submissions = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            submissions.append(json.load(f))
+
+    graded = Grader(exam_questions, args.full_credit, args.partial_credit).grade_submissions(submissions)
+    for path, submission in zip(paths, graded):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(submission, f, indent=2)
+        os.replace(temp_path, path)
+        print(f"{submission['userId']}: {submission['score']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,14 +18,37 @@ export interface DocumentAIEntity {
   type: string;
   mention_text: string;
   confidence: number;
+  start_index?: number;  // Offset of the mention in text, -1 if unknown
+  end_index?: number;
+  page?: number;  // 1-based page number, -1 if unknown
+}
+
+export interface DocumentAIPageOffsets {
+  page_number: number;
+  start_index: number;  // Slice text with these to get one page
+  end_index: number;
 }
 
 export interface DocumentAIResult {
   text: string;
   pages: number;
+  page_offsets?: DocumentAIPageOffsets[];
   entities: DocumentAIEntity[];
   mime_type: string;
   summary?: string;  // Summary text for NotesSummarizer processor
+  summary_sentences?: { text: string; pages: number[] }[];
+  layout?: {  // Per-page element text, when requested with include_layout
+    blocks: string[][];
+    paragraphs: string[][];
+    lines: string[][];
+  };
+  routing?: {  // Per-page extraction path, from local_extract.py
+    page_number: number;
+    route: 'local' | 'cloud';
+    reason: string;
+  }[];
+  local_pages?: number;
+  cloud_pages?: number;
   raw_output?: string;
   success?: boolean;
 }
@@ -92,7 +92,8 @@ def main():
         "google-cloud-documentai>=2.16.0",
         "google-api-core>=2.10.0",
         "google-auth>=2.6.0",
-        "google-cloud-core>=2.3.0"
+        "google-cloud-core>=2.3.0",
+        "numpy>=1.17.0"
     ]
     
     for package in key_packages:
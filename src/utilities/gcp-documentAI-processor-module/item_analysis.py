@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Item Analysis for Graded Exams
+
+Scores say how students did; item analysis says how the questions did.
+ItemAnalysis reads the graded students x questions matrices produced by
+grading.Grader and computes, for every question:
+
+- difficulty: mean credit (share of the points earned), 1.0 = everyone right
+- discrimination: point-biserial correlation between the item score and the
+  total score, and the corrected version against the rest of the test
+  (total minus the item), which does not reward an item for correlating
+  with itself
+- distractors: for MCQ questions, how many students chose each option or
+  left it blank, and the mean total score of each group
+
+and for the whole exam the KR-20 reliability (coefficient alpha when items
+carry partial credit, of which KR-20 is the 0/1 special case).
+
+Only running sums are kept (counts, sums, sums of squares and cross
+products with the total score), so every metric follows from one vectorized
+update per batch. Late submissions are folded in with another add() call
+without regrading the cohort, and the state can be saved as JSON between
+runs. report() returns an AnalyticsReport whose `data` carries the results.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable
+
+import numpy as np
+
+from grading import Grader, option_index, synthetic_exam
+
+# Thresholds behind the per-item flags
+TOO_EASY = 0.9
+TOO_HARD = 0.2
+LOW_DISCRIMINATION = 0.2
+MIN_DISTRACTOR_SHARE = 0.05
+
+
+def _rounded(value: float, digits: int = 4) -> Optional[float]:
+    """Round a metric for JSON, mapping undefined (NaN) values to None."""
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class ItemAnalysis:
+    """Incremental item statistics for one exam."""
+
+    def __init__(self, questions: List[Dict[str, Any]]):
+        """
+        Create an empty analysis.
+
+        Args:
+            questions: ExamQuestion records (id, points, optional options),
+                in the order of the graded matrices' columns
+        """
+        self.questions = questions
+        self.question_ids = [question["id"] for question in questions]
+        self.points = np.array([float(question.get("points", 1)) for question in questions])
+        self.option_counts = [len(question.get("options") or ()) for question in questions]
+        # One column per option plus a last column for blank/unrecognized
+        self._width = max(self.option_counts + [0]) + 1
+
+        items = len(questions)
+        self.students = 0
+        self.sum_item = np.zeros(items)
+        self.sum_item_sq = np.zeros(items)
+        self.sum_item_total = np.zeros(items)
+        self.sum_total = 0.0
+        self.sum_total_sq = 0.0
+        self.choice_counts = np.zeros((items, self._width), dtype=np.int64)
+        self.choice_totals = np.zeros((items, self._width))
+        self.submission_ids: set = set()
+        self.first_submitted: Optional[str] = None
+        self.last_submitted: Optional[str] = None
+
+    def add(
+        self,
+        credit: np.ndarray,
+        choices: np.ndarray,
+        submission_ids: Optional[List[str]] = None,
+        submitted_at: Optional[List[Optional[str]]] = None
+    ) -> int:
+        """
+        Fold a batch of graded submissions into the statistics.
+
+        Args:
+            credit: students x questions credit between 0 and 1 (Grader.credit)
+            choices: students x questions option indices, -1 for blank or
+                non-MCQ (Grader.option_choices)
+            submission_ids: ExamSubmission IDs; rows already counted are skipped
+            submitted_at: ISO submittedAt timestamps, for the report's date range
+
+        Returns:
+            Number of submissions added
+        """
+        credit = np.asarray(credit, dtype=float)
+        choices = np.asarray(choices, dtype=np.int64)
+        if credit.ndim != 2 or credit.shape[1] != len(self.question_ids) or choices.shape != credit.shape:
+            raise ValueError(f"expected students x {len(self.question_ids)} credit and choice matrices")
+
+        if submission_ids is not None:
+            keep = []
+            for row, submission_id in enumerate(submission_ids):
+                if submission_id not in self.submission_ids:
+                    self.submission_ids.add(submission_id)
+                    keep.append(row)
+            if len(keep) < len(submission_ids):
+                credit, choices = credit[keep], choices[keep]
+                submitted_at = [submitted_at[row] for row in keep] if submitted_at else None
+        students = credit.shape[0]
+        if students == 0:
+            return 0
+
+        scores = credit * self.points[None, :]
+        totals = scores.sum(axis=1)
+        self.students += students
+        self.sum_item += scores.sum(axis=0)
+        self.sum_item_sq += (scores * scores).sum(axis=0)
+        self.sum_item_total += totals @ scores
+        self.sum_total += float(totals.sum())
+        self.sum_total_sq += float(totals @ totals)
+
+        # Flatten (item, option) to one bin per cell and count in one pass
+        items = len(self.question_ids)
+        column = np.where(choices >= 0, np.minimum(choices, self._width - 2), self._width - 1)
+        bins = (np.arange(items)[None, :] * self._width + column).ravel()
+        size = items * self._width
+        self.choice_counts += np.bincount(bins, minlength=size).reshape(items, self._width)
+        self.choice_totals += np.bincount(
+            bins, weights=np.repeat(totals, items), minlength=size
+        ).reshape(items, self._width)
+
+        for stamp in submitted_at or ():
+            if not stamp:
+                continue
+            if self.first_submitted is None or stamp < self.first_submitted:
+                self.first_submitted = stamp
+            if self.last_submitted is None or stamp > self.last_submitted:
+                self.last_submitted = stamp
+        return students
+
+    def add_submissions(self, grader: Grader, submissions: List[Dict[str, Any]]) -> int:
+        """
+        Grade ExamSubmission records and fold them in.
+
+        Args:
+            grader: Grader for the same questions
+            submissions: ExamSubmission records (already counted IDs are skipped)
+
+        Returns:
+            Number of submissions added
+        """
+        fresh = [
+            submission for submission in submissions
+            if submission.get("id") not in self.submission_ids
+        ]
+        if not fresh:
+            return 0
+        graded = grader.grade(fresh)
+        return self.add(
+            graded["credit"],
+            graded["choices"],
+            [submission.get("id") for submission in fresh],
+            [submission.get("submittedAt") for submission in fresh],
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Compute item and test statistics from the running sums.
+
+        Returns:
+            Dict of arrays (one value per question): difficulty,
+            discrimination, corrected_discrimination and variance; plus
+            reliability, mean_score and score_sd for the test (NaN where
+            undefined, e.g. fewer than two students or no score spread)
+        """
+        n = np.float64(self.students)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_item = self.sum_item / n
+            var_item = np.maximum(self.sum_item_sq / n - mean_item ** 2, 0.0)
+            mean_total = self.sum_total / n
+            var_total = max(self.sum_total_sq / n - mean_total ** 2, 0.0)
+            cov = self.sum_item_total / n - mean_item * mean_total
+
+            difficulty = mean_item / self.points
+            discrimination = cov / np.sqrt(var_item * var_total)
+            # Rest score R = T - X: cov(X, R) = cov(X, T) - var(X)
+            var_rest = np.maximum(var_total - 2 * cov + var_item, 0.0)
+            corrected = (cov - var_item) / np.sqrt(var_item * var_rest)
+
+            k = len(self.question_ids)
+            reliability = k / (k - 1) * (1 - var_item.sum() / var_total) if k > 1 and n > 1 else np.nan
+        return {
+            "difficulty": difficulty,
+            "discrimination": discrimination,
+            "corrected_discrimination": corrected,
+            "variance": var_item,
+            "reliability": reliability,
+            "mean_score": mean_total,
+            "score_sd": np.sqrt(var_total),
+        }
+
+    def items(self) -> List[Dict[str, Any]]:
+        """
+        Per-question results with distractor tables and review flags.
+
+        Returns:
+            One dict per question: questionId, points, difficulty,
+            discrimination, correctedDiscrimination, flags, and for MCQ
+            questions distractors (option, text, count, share, meanScore,
+            isKey) with a final entry for blank answers
+        """
+        metrics = self.metrics()
+        n = self.students
+        results = []
+        for column, question in enumerate(self.questions):
+            difficulty = float(metrics["difficulty"][column])
+            corrected = float(metrics["corrected_discrimination"][column])
+            flags = []
+            if n and difficulty >= TOO_EASY:
+                flags.append("too_easy")
+            if n and difficulty <= TOO_HARD:
+                flags.append("too_hard")
+            if np.isfinite(corrected):
+                if corrected < 0:
+                    flags.append("negative_discrimination")
+                elif corrected < LOW_DISCRIMINATION:
+                    flags.append("low_discrimination")
+
+            item = {
+                "questionId": question["id"],
+                "points": float(self.points[column]),
+                "difficulty": _rounded(difficulty),
+                "discrimination": _rounded(metrics["discrimination"][column]),
+                "correctedDiscrimination": _rounded(corrected),
+                "flags": flags,
+            }
+            if self.option_counts[column]:
+                item["distractors"] = self._distractors(column, question, flags)
+            results.append(item)
+        return results
+
+    def _distractors(self, column: int, question: Dict[str, Any], flags: List[str]) -> List[Dict[str, Any]]:
+        """Option table for one MCQ question; appends distractor flags to `flags`."""
+        options = question["options"]
+        key = option_index(question.get("answer"), options)
+        counts = self.choice_counts[column]
+        totals = self.choice_totals[column]
+        n = max(self.students, 1)
+        rows = []
+        for index in list(range(len(options))) + [self._width - 1]:
+            count = int(counts[index])
+            blank = index == self._width - 1
+            rows.append({
+                "option": None if blank else chr(ord("A") + index) if index < 26 else str(index + 1),
+                "text": None if blank else options[index],
+                "count": count,
+                "share": round(count / n, 4),
+                "meanScore": round(float(totals[index] / count), 2) if count else None,
+                "isKey": index == key,
+            })
+
+        if self.students:
+            wrong = [row for index, row in enumerate(rows[:-1]) if index != key]
+            if any(row["share"] < MIN_DISTRACTOR_SHARE for row in wrong):
+                flags.append("nonfunctional_distractor")
+            key_mean = rows[key]["meanScore"] if 0 <= key < len(options) else None
+            if key_mean is not None and any(
+                row["meanScore"] is not None and row["meanScore"] > key_mean for row in wrong
+            ):
+                flags.append("distractor_outscores_key")
+        return rows
+
+    def report(
+        self,
+        exam: Dict[str, Any],
+        title: Optional[str] = None,
+        time_range: str = "MONTH"
+    ) -> Dict[str, Any]:
+        """
+        Package the analysis as an AnalyticsReport.
+
+        Args:
+            exam: Exam record (id, optional title)
+            title: Report title (default: derived from the exam title)
+            time_range: AnalyticsReport timeRange
+
+        Returns:
+            AnalyticsReport dict; data holds examId, students, reliability,
+            meanScore, scoreSd, maxScore and items
+        """
+        metrics = self.metrics()
+        now = _utc_now()
+        exam_title = exam.get("title") or exam["id"]
+        return {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"exam:{exam['id']}:item-analysis:{self.students}")),
+            "title": title or f"Item analysis: {exam_title}",
+            "description": f"Difficulty, discrimination and distractor analysis over "
+                           f"{self.students} graded submissions",
+            "timeRange": time_range,
+            "startDate": self.first_submitted or now,
+            "endDate": self.last_submitted or now,
+            "createdAt": now,
+            "data": {
+                "examId": exam["id"],
+                "students": self.students,
+                "reliability": _rounded(metrics["reliability"]),
+                "meanScore": _rounded(metrics["mean_score"], 2),
+                "scoreSd": _rounded(metrics["score_sd"], 2),
+                "maxScore": float(self.points.sum()),
+                "items": self.items(),
+            },
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Serialize the running sums.
+
+        Returns:
+            JSON-compatible dict (see from_state)
+        """
+        return {
+            "question_ids": self.question_ids,
+            "students": self.students,
+            "sum_item": self.sum_item.tolist(),
+            "sum_item_sq": self.sum_item_sq.tolist(),
+            "sum_item_total": self.sum_item_total.tolist(),
+            "sum_total": self.sum_total,
+            "sum_total_sq": self.sum_total_sq,
+            "choice_counts": self.choice_counts.tolist(),
+            "choice_totals": self.choice_totals.tolist(),
+            "submission_ids": sorted(self.submission_ids),
+            "first_submitted": self.first_submitted,
+            "last_submitted": self.last_submitted,
+        }
+
+    @classmethod
+    def from_state(cls, questions: List[Dict[str, Any]], state: Dict[str, Any]) -> "ItemAnalysis":
+        """
+        Restore an analysis saved with to_state.
+
+        Args:
+            questions: The exam's ExamQuestion records
+            state: Dict from to_state
+
+        Returns:
+            ItemAnalysis continuing from the saved sums
+        """
+        analysis = cls(questions)
+        if state["question_ids"] != analysis.question_ids:
+            raise ValueError("saved item analysis is for a different set of questions")
+        analysis.students = int(state["students"])
+        analysis.sum_item = np.array(state["sum_item"], dtype=float)
+        analysis.sum_item_sq = np.array(state["sum_item_sq"], dtype=float)
+        analysis.sum_item_total = np.array(state["sum_item_total"], dtype=float)
+        analysis.sum_total = float(state["sum_total"])
+        analysis.sum_total_sq = float(state["sum_total_sq"])
+        analysis.choice_counts = np.array(state["choice_counts"], dtype=np.int64).reshape(-1, analysis._width)
+        analysis.choice_totals = np.array(state["choice_totals"], dtype=float).reshape(-1, analysis._width)
+        analysis.submission_ids = set(state["submission_ids"])
+        analysis.first_submitted = state.get("first_submitted")
+        analysis.last_submitted = state.get("last_submitted")
+        return analysis
+
+
+def _load_submissions(directory: str) -> Iterable[Dict[str, Any]]:
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json") and name != "manifest.json":
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                yield json.load(f)
+
+
+def main():
+    """Command-line interface: analyse an exam's items, or benchmark the analysis."""
+    parser = argparse.ArgumentParser(
+        description="Item analysis (difficulty, discrimination, distractors, KR-20) for an exam"
+    )
+    parser.add_argument("--exam", help="Exam JSON file with exam and questions (see answer_sheets.py)")
+    parser.add_argument("--submissions-dir", help="Directory of ExamSubmission JSON files")
+    parser.add_argument("--state", help="JSON file of running sums; new submissions are added to it")
+    parser.add_argument("--time-range", default="MONTH", choices=["DAY", "WEEK", "MONTH", "QUARTER", "YEAR"],
+                        help="AnalyticsReport timeRange")
+    parser.add_argument("--benchmark", metavar="STUDENTSxQUESTIONS",
+                        help="Analyse a synthetic cohort, e.g. 10000x50")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        students, questions = (int(part) for part in args.benchmark.lower().split("x"))
+        exam_questions, submissions = synthetic_exam(students, questions)
+        graded = Grader(exam_questions).grade(submissions)
+        analysis = ItemAnalysis(exam_questions)
+        started = time.perf_counter()
+        analysis.add(graded["credit"], graded["choices"])
+        report = analysis.report({"id": "benchmark"})
+        elapsed = time.perf_counter() - started
+        print(f"{students} x {questions} analysed in {elapsed * 1000:.1f} ms, "
+              f"KR-20 {report['data']['reliability']}")
+        return 0
+
+    if not args.exam or not args.submissions_dir:
+        parser.error("--exam and --submissions-dir, or --benchmark, are required")
+    with open(args.exam, "r", encoding="utf-8") as f:
+        exam_data = json.load(f)
+    exam_questions = exam_data["questions"]
+
+    analysis = ItemAnalysis(exam_questions)
+    if args.state and os.path.exists(args.state):
+        with open(args.state, "r", encoding="utf-8") as f:
+            analysis = ItemAnalysis.from_state(exam_questions, json.load(f))
+
+    added = analysis.add_submissions(Grader(exam_questions), list(_load_submissions(args.submissions_dir)))
+    print(f"{added} new submissions, {analysis.students} in total", file=sys.stderr)
+
+    if args.state:
+        temp_path = f"{args.state}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(analysis.to_state(), f)
+        os.replace(temp_path, args.state)
+
+    print(json.dumps(analysis.report(exam_data.get("exam", {"id": "exam"}), time_range=args.time_range), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,815 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Durable Job Queue for Bulk Document Processing
+
+This module provides a SQLite-backed job queue so that bulk runs (admission
+form scans, term-end assignment archives) survive crashes and can be drained
+by several worker processes at once.
+
+Jobs are leased to a worker for a limited time and kept alive with heartbeats.
+A job whose lease expires is handed to another worker; a job that keeps
+failing is moved to the dead-letter state after `max_attempts`. Job IDs are
+derived from the document content, so enqueueing the same file twice is a
+no-op. A byte-identical copy under another path is recorded as a duplicate
+of the existing job and shares its result instead of being processed again.
+
+Jobs carry a priority class and an optional deadline. Workers always lease
+the most urgent class first and, within a class, the job with the earliest
+deadline (EDF). Interactive jobs therefore jump ahead of queued backfill work
+as soon as they arrive; jobs already leased are never interrupted.
+
+The database uses WAL mode by default, which lets readers and a writer work
+concurrently on one machine. SQLite's WAL mode needs shared memory and does
+not work on network filesystems; when the queue file lives on a shared
+filesystem, open it with journal_mode="DELETE".
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import hashlib
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterator, NamedTuple, Tuple
+
+from result_model import dumps_result
+
+# Job states
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+STANDARD = 1
+BACKFILL = 2
+
+PRIORITY_CLASSES = {
+    "interactive": INTERACTIVE,
+    "standard": STANDARD,
+    "backfill": BACKFILL,
+}
+
+# NULL deadlines sort after every real deadline within a priority class
+_EDF_ORDER = "priority, deadline IS NULL, deadline, created_at"
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    file_path     TEXT NOT NULL,
+    mime_type     TEXT NOT NULL,
+    state         TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    priority      INTEGER NOT NULL DEFAULT 1,
+    deadline      REAL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    completed_at  REAL,
+    result        TEXT,
+    last_error    TEXT,
+    phash         TEXT
+);
+
+CREATE INDEX IF NOT EXISTS jobs_edf_idx ON jobs (state, {_EDF_ORDER});
+
+CREATE TABLE IF NOT EXISTS duplicates (
+    file_path     TEXT PRIMARY KEY,
+    job_id        TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    distance      INTEGER NOT NULL DEFAULT 0,
+    created_at    REAL NOT NULL
+);
+"""
+
+# Duplicate kinds
+EXACT = "exact"
+NEAR = "near"
+
+
+def _edf_key(row: Tuple) -> Tuple:
+    """Sort key of a (..., priority, deadline, created_at) row, matching _EDF_ORDER."""
+    priority, deadline, created_at = row[-3:]
+    return (priority, deadline is None, deadline or 0.0, created_at)
+
+
+class Job(NamedTuple):
+    """A job leased from the queue."""
+    job_id: str
+    file_path: str
+    mime_type: str
+    attempts: int
+    priority: int = STANDARD
+    deadline: Optional[float] = None
+
+
+def content_job_id(file_path: str, mime_type: str) -> str:
+    """
+    Derive an idempotent job ID from a document's content.
+
+    Args:
+        file_path: Path to the document file
+        mime_type: MIME type the document will be processed as
+
+    Returns:
+        Hex SHA-256 digest of the MIME type and file content
+    """
+    digest = hashlib.sha256(mime_type.encode("utf-8") + b"\0")
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class JobQueue:
+    """Durable, lease-based job queue stored in a SQLite database."""
+
+    def __init__(
+        self,
+        db_path: str,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+        journal_mode: str = "WAL"
+    ):
+        """
+        Open (and create if needed) a job queue.
+
+        Args:
+            db_path: Path to the SQLite database file
+            lease_seconds: How long a leased job stays owned without a heartbeat
+            max_attempts: Attempts before a job is moved to the dead-letter state
+            journal_mode: SQLite journal mode ('WAL' locally, 'DELETE' on shared filesystems)
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        # Autocommit mode; write transactions are opened explicitly
+        self.conn = sqlite3.connect(
+            db_path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Run a single write statement in its own immediate transaction."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return cursor
+
+    def enqueue(
+        self,
+        file_path: str,
+        mime_type: str = "application/pdf",
+        priority: int = STANDARD,
+        deadline: Optional[float] = None
+    ) -> str:
+        """
+        Add a document to the queue.
+
+        Args:
+            file_path: Path to the document file
+            mime_type: MIME type of the document
+            priority: Priority class (INTERACTIVE, STANDARD or BACKFILL)
+            deadline: Unix timestamp by which the result is due (None for no deadline)
+
+        Returns:
+            The job ID (the same ID is returned if the document is already queued)
+        """
+        return self.enqueue_many([file_path], mime_type, priority, deadline)[0]
+
+    def enqueue_many(
+        self,
+        file_paths: List[str],
+        mime_type: str = "application/pdf",
+        priority: int = STANDARD,
+        deadline: Optional[float] = None,
+        perceptual_hashes: Optional[List[Optional[str]]] = None,
+        job_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Add several documents to the queue in one transaction.
+
+        A document that is already queued keeps its job but is promoted to the
+        more urgent of its current and the requested priority and deadline.
+        A file whose content matches a job under another path is recorded as
+        an exact duplicate of that job.
+
+        Args:
+            file_paths: Paths to the document files
+            mime_type: MIME type of the documents
+            priority: Priority class (INTERACTIVE, STANDARD or BACKFILL)
+            deadline: Unix timestamp by which the results are due (None for no deadline)
+            perceptual_hashes: Hex perceptual hash per file (None entries for
+                files without one), stored for near-duplicate lookups
+            job_ids: content_job_id of each file, if the caller has already
+                computed them (saves reading and hashing every file again)
+
+        Returns:
+            List of job IDs, in the same order as file_paths
+        """
+        now = time.time()
+        if job_ids is None:
+            job_ids = [content_job_id(path, mime_type) for path in file_paths]
+        paths = [os.path.abspath(path) for path in file_paths]
+        hashes = perceptual_hashes or [None] * len(file_paths)
+        rows = [
+            (job_id, path, mime_type, QUEUED, priority, deadline, now, now, phash)
+            for job_id, path, phash in zip(job_ids, paths, hashes)
+        ]
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO jobs "
+                    "(job_id, file_path, mime_type, state, priority, deadline, "
+                    "created_at, updated_at, phash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO duplicates "
+                    "(file_path, job_id, kind, distance, created_at) "
+                    "SELECT ?, job_id, ?, 0, ? FROM jobs WHERE job_id = ? AND file_path != ?",
+                    [(path, EXACT, now, job_id, path) for job_id, path in zip(job_ids, paths)]
+                )
+                self.conn.executemany(
+                    "UPDATE jobs SET priority = MIN(priority, ?), "
+                    "deadline = CASE WHEN deadline IS NULL THEN ? "
+                    "ELSE MIN(deadline, COALESCE(?, deadline)) END "
+                    "WHERE job_id = ? AND state = ?",
+                    [(priority, deadline, deadline, job_id, QUEUED) for job_id in job_ids]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return job_ids
+
+    def link_duplicates(self, links: List[Tuple[str, str, int]], kind: str = NEAR) -> int:
+        """
+        Record files as duplicates of existing jobs instead of queueing them.
+
+        Args:
+            links: (file_path, job_id, distance) tuples
+            kind: Duplicate kind (NEAR for perceptual matches)
+
+        Returns:
+            Number of new links
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO duplicates "
+                    "(file_path, job_id, kind, distance, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(os.path.abspath(path), job_id, kind, distance, now)
+                     for path, job_id, distance in links]
+                )
+                added = self.conn.total_changes - before
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def perceptual_hashes(self) -> List[Tuple[str, str]]:
+        """
+        List the stored perceptual hashes.
+
+        Returns:
+            (job_id, hex hash) tuples for jobs that have one
+        """
+        return self.conn.execute(
+            "SELECT job_id, phash FROM jobs WHERE phash IS NOT NULL"
+        ).fetchall()
+
+    def duplicate_counts(self) -> Dict[str, int]:
+        """
+        Count recorded duplicates by kind.
+
+        Returns:
+            Dict mapping EXACT and NEAR to their counts
+        """
+        counts = {EXACT: 0, NEAR: 0}
+        for kind, count in self.conn.execute(
+            "SELECT kind, COUNT(*) FROM duplicates GROUP BY kind"
+        ):
+            counts[kind] = count
+        return counts
+
+    def lease(self, worker_id: str, lease_seconds: Optional[float] = None) -> Optional[Job]:
+        """
+        Lease the next available job.
+
+        Queued jobs and jobs whose lease has expired are both eligible. Expired
+        jobs that have used up their attempts are dead-lettered instead. The
+        most urgent priority class wins, then the earliest deadline.
+
+        Args:
+            worker_id: Identifier of the leasing worker
+            lease_seconds: Lease duration (defaults to the queue's lease_seconds)
+
+        Returns:
+            The leased Job, or None if nothing is available
+        """
+        now = time.time()
+        expires = now + (lease_seconds or self.lease_seconds)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = NULL, updated_at = ?, "
+                    "last_error = 'lease expired' "
+                    "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                    (DEAD, now, LEASED, now, self.max_attempts)
+                )
+                # Two queries rather than one with OR, so that each can walk
+                # jobs_edf_idx in EDF order instead of sorting the whole table
+                columns = "job_id, file_path, mime_type, attempts, priority, deadline, created_at"
+                queued = self.conn.execute(
+                    f"SELECT {columns} FROM jobs WHERE state = ? ORDER BY {_EDF_ORDER} LIMIT 1",
+                    (QUEUED,)
+                ).fetchone()
+                expired = self.conn.execute(
+                    f"SELECT {columns} FROM jobs WHERE state = ? AND lease_expires < ? "
+                    f"ORDER BY {_EDF_ORDER} LIMIT 1",
+                    (LEASED, now)
+                ).fetchone()
+                candidates = [candidate for candidate in (queued, expired) if candidate is not None]
+                row = min(candidates, key=_edf_key) if candidates else None
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                    (LEASED, worker_id, expires, now, row[0])
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return Job(
+            job_id=row[0], file_path=row[1], mime_type=row[2], attempts=row[3] + 1,
+            priority=row[4], deadline=row[5]
+        )
+
+    def heartbeat(
+        self,
+        job_id: str,
+        worker_id: str,
+        lease_seconds: Optional[float] = None
+    ) -> bool:
+        """
+        Extend the lease on a job.
+
+        Args:
+            job_id: ID of the leased job
+            worker_id: Identifier of the worker holding the lease
+            lease_seconds: New lease duration from now
+
+        Returns:
+            True if the lease was extended, False if the worker no longer owns the job
+        """
+        now = time.time()
+        cursor = self._write(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE job_id = ? AND state = ? AND lease_owner = ?",
+            (now + (lease_seconds or self.lease_seconds), now, job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        Mark a leased job as done and store its result.
+
+        Args:
+            job_id: ID of the leased job
+            worker_id: Identifier of the worker holding the lease
+            result: JSON-serializable processing result
+
+        Returns:
+            True if the job was completed, False if the lease had been lost
+        """
+        now = time.time()
+        cursor = self._write(
+            "UPDATE jobs SET state = ?, result = ?, lease_owner = NULL, "
+            "lease_expires = NULL, last_error = NULL, completed_at = ?, updated_at = ? "
+            "WHERE job_id = ? AND state = ? AND lease_owner = ?",
+            (DONE, dumps_result(result), now, now, job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> Optional[str]:
+        """
+        Record a failed attempt, requeueing or dead-lettering the job.
+
+        Args:
+            job_id: ID of the leased job
+            worker_id: Identifier of the worker holding the lease
+            error: Error message to store with the job
+
+        Returns:
+            The job's new state, or None if the lease had been lost
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                    "lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+                    "WHERE job_id = ? AND state = ? AND lease_owner = ?",
+                    (self.max_attempts, DEAD, QUEUED, error, time.time(),
+                     job_id, LEASED, worker_id)
+                )
+                row = self.conn.execute(
+                    "SELECT state FROM jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return row[0] if cursor.rowcount == 1 else None
+
+    def requeue_dead(self) -> int:
+        """
+        Move all dead-lettered jobs back to the queue with a fresh attempt count.
+
+        Returns:
+            Number of jobs requeued
+        """
+        cursor = self._write(
+            "UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE state = ?",
+            (QUEUED, time.time(), DEAD)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Count jobs by state.
+
+        Returns:
+            Dict mapping each state to its job count
+        """
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, DEAD: 0}
+        for state, count in self.conn.execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+        ):
+            counts[state] = count
+        return counts
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Report job counts and deadline performance.
+
+        A job with a deadline counts as missed when it completed after its
+        deadline or was dead-lettered. Jobs still waiting past their deadline
+        are reported separately as overdue.
+
+        Returns:
+            Dict with the per-state counts from stats() plus deadline_met,
+            deadline_missed, deadline_miss_rate and overdue
+        """
+        metrics = dict(self.stats())
+        met, missed, overdue = self.conn.execute(
+            "SELECT "
+            "COALESCE(SUM(state = ? AND completed_at <= deadline), 0), "
+            "COALESCE(SUM((state = ? AND completed_at > deadline) OR state = ?), 0), "
+            "COALESCE(SUM(state IN (?, ?) AND deadline < ?), 0) "
+            "FROM jobs WHERE deadline IS NOT NULL",
+            (DONE, DONE, DEAD, QUEUED, LEASED, time.time())
+        ).fetchone()
+        finished = met + missed
+        metrics["deadline_met"] = met
+        metrics["deadline_missed"] = missed
+        metrics["deadline_miss_rate"] = missed / finished if finished else 0.0
+        metrics["overdue"] = overdue
+        duplicates = self.duplicate_counts()
+        metrics["duplicates_exact"] = duplicates[EXACT]
+        metrics["duplicates_near"] = duplicates[NEAR]
+        metrics["rpcs_avoided"] = duplicates[EXACT] + duplicates[NEAR]
+        return metrics
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over completed jobs.
+
+        Yields:
+            Dicts with job_id, file_path and the decoded result
+        """
+        cursor = self.conn.execute(
+            "SELECT job_id, file_path, result FROM jobs WHERE state = ? ORDER BY created_at",
+            (DONE,)
+        )
+        for job_id, file_path, result in cursor:
+            yield {"job_id": job_id, "file_path": file_path, "result": json.loads(result)}
+
+    def result_for(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the result for a file, following duplicate links.
+
+        Args:
+            file_path: Path the file was enqueued under
+
+        Returns:
+            Dict with job_id, state, duplicate ('exact', 'near' or None) and
+            result (None until the job is done), or None if the file is unknown
+        """
+        path = os.path.abspath(file_path)
+        row = self.conn.execute(
+            "SELECT job_id, state, result, NULL FROM jobs WHERE file_path = ? "
+            "UNION ALL "
+            "SELECT jobs.job_id, jobs.state, jobs.result, duplicates.kind "
+            "FROM duplicates JOIN jobs ON jobs.job_id = duplicates.job_id "
+            "WHERE duplicates.file_path = ? LIMIT 1",
+            (path, path)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, state, result, kind = row
+        return {
+            "job_id": job_id,
+            "state": state,
+            "duplicate": kind,
+            "result": json.loads(result) if result is not None else None,
+        }
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """
+        List dead-lettered jobs.
+
+        Returns:
+            List of dicts with job_id, file_path, attempts and last_error
+        """
+        cursor = self.conn.execute(
+            "SELECT job_id, file_path, attempts, last_error FROM jobs WHERE state = ?",
+            (DEAD,)
+        )
+        return [
+            {"job_id": job_id, "file_path": path, "attempts": attempts, "last_error": error}
+            for job_id, path, attempts, error in cursor
+        ]
+
+
+def default_worker_id() -> str:
+    """Build a worker ID that is unique across hosts and processes."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def run_worker(
+    queue: JobQueue,
+    processor,
+    worker_id: Optional[str] = None,
+    heartbeat_interval: Optional[float] = None,
+    poll_interval: float = 1.0,
+    exit_when_empty: bool = True,
+    max_jobs: Optional[int] = None
+) -> int:
+    """
+    Drain jobs from the queue with a document processor.
+
+    A background thread extends the lease while each document is being
+    processed, so slow documents are not handed to a second worker.
+
+    Args:
+        queue: The job queue to drain
+        processor: Object with a process_document(file_path, mime_type) method
+        worker_id: Identifier for this worker (generated if omitted)
+        heartbeat_interval: Seconds between heartbeats (defaults to a third of the lease)
+        poll_interval: Seconds to wait when the queue is empty
+        exit_when_empty: Return when no job is available instead of polling
+        max_jobs: Stop after this many jobs (None for no limit)
+
+    Returns:
+        Number of jobs completed by this worker
+    """
+    worker_id = worker_id or default_worker_id()
+    interval = heartbeat_interval or queue.lease_seconds / 3.0
+    completed = 0
+
+    while max_jobs is None or completed < max_jobs:
+        job = queue.lease(worker_id)
+        if job is None:
+            if exit_when_empty:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        stop = threading.Event()
+
+        def beat(job_id=job.job_id):
+            while not stop.wait(interval):
+                if not queue.heartbeat(job_id, worker_id):
+                    break
+
+        beater = threading.Thread(target=beat, daemon=True)
+        beater.start()
+        try:
+            result = processor.process_document(
+                file_path=job.file_path,
+                mime_type=job.mime_type
+            )
+        except Exception as e:
+            stop.set()
+            beater.join()
+            queue.fail(job.job_id, worker_id, f"{type(e).__name__}: {e}")
+            continue
+        stop.set()
+        beater.join()
+        if queue.complete(job.job_id, worker_id, result):
+            completed += 1
+
+    return completed
+
+
+class SleepingProcessor:
+    """Stand-in processor that spends a fixed time per document, like a remote call."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def process_document(self, file_path: str, mime_type: str = "application/pdf") -> Dict[str, Any]:
+        time.sleep(self.seconds)
+        return {"file_path": file_path, "mime_type": mime_type}
+
+
+def benchmark_workers(
+    worker_counts: List[int],
+    documents: int = 200,
+    seconds_per_document: float = 0.05,
+    directory: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Measure queue throughput for several worker counts.
+
+    Each run drains a fresh queue of distinct small documents with worker
+    threads whose processor sleeps per document, so the numbers show how
+    well leasing and completing scale with workers rather than the speed of
+    Document AI.
+
+    Args:
+        worker_counts: Worker counts to measure
+        documents: Documents per run
+        seconds_per_document: Simulated processing time of one document
+        directory: Scratch directory (default: a temporary directory)
+
+    Returns:
+        One dict per worker count with workers, elapsed_s, docs_per_s and speedup
+    """
+    import tempfile
+
+    scratch = directory or tempfile.mkdtemp(prefix="job-queue-bench-")
+    paths = []
+    for index in range(documents):
+        path = os.path.join(scratch, f"doc{index}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"document {index}\n")
+        paths.append(path)
+
+    processor = SleepingProcessor(seconds_per_document)
+    results = []
+    for workers in worker_counts:
+        queue = JobQueue(os.path.join(scratch, f"bench-{workers}-{uuid.uuid4().hex[:8]}.db"))
+        queue.enqueue_many(paths, "text/plain")
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run_worker, args=(queue, processor)) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done = queue.stats()[DONE]
+        queue.close()
+        results.append({"workers": workers, "done": done, "elapsed_s": round(elapsed, 3),
+                        "docs_per_s": round(done / elapsed, 1)})
+    base = results[0]["docs_per_s"] / results[0]["workers"] if results else 0.0
+    for result in results:
+        result["speedup"] = round(result["docs_per_s"] / (base or 1.0), 2)
+    return results
+
+
+def main():
+    """Command-line interface for the job queue."""
+    parser = argparse.ArgumentParser(
+        description="Durable job queue for bulk Document AI processing"
+    )
+    parser.add_argument("--db", help="Path to the queue database (required except for benchmark)")
+    parser.add_argument("--journal-mode", default="WAL",
+                        help="SQLite journal mode (use DELETE on shared filesystems)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add documents to the queue")
+    enqueue_parser.add_argument("paths", nargs="+", help="Files or directories to enqueue")
+    enqueue_parser.add_argument("--mime-type", default="application/pdf", help="Document MIME type")
+    enqueue_parser.add_argument("--priority", choices=sorted(PRIORITY_CLASSES), default="standard",
+                                help="Priority class")
+    enqueue_parser.add_argument("--deadline",
+                                help="ISO 8601 due date, e.g. an Exam.endDate plus the grading window")
+
+    work_parser = subparsers.add_parser("work", help="Drain the queue")
+    work_parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    work_parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    work_parser.add_argument("--processor-id", required=True, help="Document AI processor ID")
+    work_parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    work_parser.add_argument("--lease-seconds", type=float, default=300.0, help="Lease duration")
+    work_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before dead-lettering")
+    work_parser.add_argument("--follow", action="store_true", help="Keep polling when the queue is empty")
+
+    subparsers.add_parser("status", help="Show job counts and dead letters")
+    subparsers.add_parser("requeue-dead", help="Retry all dead-lettered jobs")
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="Measure throughput against worker count with a sleeping stub processor"
+    )
+    benchmark_parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    benchmark_parser.add_argument("--documents", type=int, default=200, help="Documents per run")
+    benchmark_parser.add_argument("--sleep", type=float, default=0.05, help="Seconds of processing per document")
+
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        for result in benchmark_workers(
+            [int(count) for count in args.workers.split(",")], args.documents, args.sleep
+        ):
+            print(f"{result['workers']:>3} workers: {result['docs_per_s']:>8.1f} docs/s "
+                  f"({result['elapsed_s']:.2f}s, speedup {result['speedup']:.2f}x)")
+        return 0
+    if not args.db:
+        parser.error("--db is required")
+
+    if args.command == "work":
+        queue = JobQueue(args.db, lease_seconds=args.lease_seconds,
+                         max_attempts=args.max_attempts, journal_mode=args.journal_mode)
+    else:
+        queue = JobQueue(args.db, journal_mode=args.journal_mode)
+
+    if args.command == "enqueue":
+        files = []
+        for path in args.paths:
+            if os.path.isdir(path):
+                files.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if os.path.isfile(os.path.join(path, name))
+                )
+            else:
+                files.append(path)
+        deadline = None
+        if args.deadline:
+            deadline = datetime.fromisoformat(args.deadline.replace("Z", "+00:00")).timestamp()
+        job_ids = queue.enqueue_many(
+            files, args.mime_type, PRIORITY_CLASSES[args.priority], deadline
+        )
+        print(f"Enqueued {len(job_ids)} documents")
+    elif args.command == "work":
+        from document_processor import DocumentAIProcessor
+
+        processor = DocumentAIProcessor(
+            project_id=args.project_id,
+            location=args.location,
+            processor_id=args.processor_id,
+            credentials_path=args.credentials
+        )
+        completed = run_worker(queue, processor, exit_when_empty=not args.follow)
+        print(f"Completed {completed} jobs")
+    elif args.command == "requeue-dead":
+        print(f"Requeued {queue.requeue_dead()} jobs")
+
+    print("Queue status:")
+    for name, value in queue.metrics().items():
+        if isinstance(value, float):
+            print(f"- {name}: {value:.2%}")
+        else:
+            print(f"- {name}: {value}")
+    if args.command == "status":
+        for dead in queue.dead_letters():
+            print(f"  dead: {dead['file_path']} ({dead['attempts']} attempts): {dead['last_error']}")
+
+    queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
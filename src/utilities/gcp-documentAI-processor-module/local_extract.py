@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Local Text Extraction Fast Path
+
+Plain-text uploads and digital-born PDFs already contain their text, so
+sending them to Document AI only to read `text` back costs a network round
+trip per document. LocalFirstExtractor reads that text locally:
+
+- text/plain is decoded directly.
+- PDFs are read page by page with pypdf, a pure-Python PDF reader. Pages with
+  a usable text layer are kept; scanned or image-only pages, and PDFs pypdf
+  cannot read, are sent to the cloud processor in a single request limited
+  to those pages.
+- Images always go to the cloud processor.
+
+Every result carries a per-page `routing` list recording which path each
+page took and why.
+
+pypdf is optional (`pip install pypdf`). Without it every PDF page is routed
+to the cloud processor.
+"""
+
+import os
+import io
+import re
+import sys
+import json
+import argparse
+from typing import Optional, Dict, Any, List, Tuple
+
+from result_model import EntityTable, json_default
+from page_index import PageOffsetIndex
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+TEXT_MIME_TYPES = ("text/plain",)
+PDF_MIME_TYPE = "application/pdf"
+
+# Fields needed from the cloud for routed pages
+_CLOUD_FIELDS = [
+    "text",
+    "mime_type",
+    "entities",
+    "pages.page_number",
+    "pages.layout",
+]
+
+
+def decode_text(content: bytes) -> str:
+    """
+    Decode a text upload.
+
+    Args:
+        content: Raw bytes of a text file
+
+    Returns:
+        The text, read as UTF-8 (with or without BOM) or else as Windows-1252
+    """
+    try:
+        return content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return content.decode("cp1252", errors="replace")
+
+
+def has_text_layer(text: str, min_chars: int = 64, min_letter_ratio: float = 0.5) -> bool:
+    """
+    Decide whether a page's extracted text is usable or the page needs OCR.
+
+    Args:
+        text: Text extracted from the page's text layer
+        min_chars: Minimum non-whitespace characters for a text page
+        min_letter_ratio: Minimum share of letters and digits among them,
+            which rejects pages whose fonts decode to symbol garbage
+
+    Returns:
+        True if the text can be used as is
+    """
+    visible = "".join(text.split())
+    if len(visible) < min_chars:
+        return False
+    letters = sum(1 for char in visible if char.isalnum())
+    return letters / len(visible) >= min_letter_ratio
+
+
+def pdf_page_texts(content: bytes) -> Optional[List[str]]:
+    """
+    Read the text layer of every page of a PDF.
+
+    Args:
+        content: Raw bytes of the PDF
+
+    Returns:
+        One string per page ('' for pages that fail to extract), or None if
+        pypdf is not installed or cannot open the file
+    """
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        if reader.is_encrypted:
+            return None
+        pages = reader.pages
+    except Exception:
+        return None
+
+    texts = []
+    for page in pages:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    return texts
+
+
+def pdf_page_count(content: bytes) -> Optional[int]:
+    """
+    Count the pages of a PDF without sending it anywhere.
+
+    Args:
+        content: Raw bytes of the PDF
+
+    Returns:
+        Page count from pypdf, or from counting page objects when pypdf is
+        unavailable; None if no pages are found
+    """
+    if PdfReader is not None:
+        try:
+            return len(PdfReader(io.BytesIO(content)).pages)
+        except Exception:
+            pass
+    count = len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", content))
+    return count or None
+
+
+class LocalFirstExtractor:
+    """Extracts document text locally where possible and from Document AI otherwise."""
+
+    def __init__(self, processor=None, min_page_chars: int = 64):
+        """
+        Configure the extractor.
+
+        Args:
+            processor: DocumentAIProcessor for pages that need OCR (None to
+                fail instead of calling the cloud)
+            min_page_chars: Minimum text-layer characters for a PDF page to be read locally
+        """
+        self.processor = processor
+        self.min_page_chars = min_page_chars
+
+    def process_document(self, file_path: str, mime_type: str = PDF_MIME_TYPE) -> Dict[str, Any]:
+        """
+        Extract a document's text, calling Document AI only for pages that need it.
+
+        Args:
+            file_path: Path to the document file
+            mime_type: MIME type of the document
+
+        Returns:
+            Dict with text, pages, page_offsets, entities and mime_type like
+            process_document, plus routing (one entry per page with
+            page_number, route 'local' or 'cloud', and reason), local_pages
+            and cloud_pages
+        """
+        with open(file_path, "rb") as f:
+            content = f.read()
+        return self.process_content(content, mime_type)
+
+    def process_content(self, content: bytes, mime_type: str = PDF_MIME_TYPE) -> Dict[str, Any]:
+        """
+        Extract in-memory document content (see process_document).
+
+        Args:
+            content: Raw bytes of the document
+            mime_type: MIME type of the document
+
+        Returns:
+            Dict with the extracted text and per-page routing
+        """
+        if mime_type in TEXT_MIME_TYPES:
+            text = decode_text(content)
+            return self._assemble(mime_type, [(text, "local", "text/plain", None)])
+
+        if mime_type != PDF_MIME_TYPE:
+            result = self._require_processor().process_content(content, mime_type)
+            result["routing"] = [
+                {"page_number": page, "route": "cloud", "reason": "image"}
+                for page in range(1, result["pages"] + 1)
+            ]
+            result["local_pages"], result["cloud_pages"] = 0, result["pages"]
+            return result
+
+        page_texts = pdf_page_texts(content)
+        if page_texts is None:
+            reason = "no pdf reader" if PdfReader is None else "unreadable pdf"
+            result = self._require_processor().process_content(content, mime_type)
+            result["routing"] = [
+                {"page_number": page, "route": "cloud", "reason": reason}
+                for page in range(1, result["pages"] + 1)
+            ]
+            result["local_pages"], result["cloud_pages"] = 0, result["pages"]
+            return result
+
+        cloud_pages = [
+            number for number, text in enumerate(page_texts, start=1)
+            if not has_text_layer(text, self.min_page_chars)
+        ]
+        cloud = self._fetch_pages(content, mime_type, cloud_pages) if cloud_pages else {}
+
+        pages = []
+        for number, text in enumerate(page_texts, start=1):
+            if number in cloud:
+                cloud_text, entities = cloud[number]
+                pages.append((cloud_text, "cloud", "no text layer", entities))
+            else:
+                pages.append((text, "local", "text layer", None))
+        return self._assemble(mime_type, pages)
+
+    def _require_processor(self):
+        if self.processor is None:
+            raise ValueError("document needs OCR but no Document AI processor is configured")
+        return self.processor
+
+    def _fetch_pages(
+        self,
+        content: bytes,
+        mime_type: str,
+        page_numbers: List[int]
+    ) -> Dict[int, Tuple[str, List[Tuple[str, str, float, int, int]]]]:
+        """Fetch the given pages from Document AI; map each to its text and page-relative entities."""
+        document = self._require_processor().fetch_document(
+            content, mime_type, pages=page_numbers, fields=_CLOUD_FIELDS
+        )
+        page_index = PageOffsetIndex.from_document(document)
+        entities = self.processor.extract_entities(document, page_index)
+
+        returned = sorted(page_index.page_numbers)
+        # Page numbers normally refer to the original file; fall back to
+        # request order if the response numbered the selection from 1
+        if not set(returned) <= set(page_numbers):
+            renumber = dict(zip(range(1, len(page_numbers) + 1), page_numbers))
+        else:
+            renumber = {number: number for number in page_numbers}
+
+        pages: Dict[int, Tuple[str, List[Tuple[str, str, float, int, int]]]] = {}
+        for number in set(returned):
+            span = page_index.page_span(number)
+            pages[renumber.get(number, number)] = (page_index.page_text(number), [
+                (entity["type"], entity["mention_text"], entity["confidence"],
+                 entity["start_index"] - span[0], entity["end_index"] - span[0])
+                for entity in entities if entity["page"] == number
+            ])
+        for number in page_numbers:
+            pages.setdefault(number, ("", []))
+        return pages
+
+    @staticmethod
+    def _assemble(mime_type: str, pages: List[Tuple[str, str, str, Any]]) -> Dict[str, Any]:
+        """Join per-page (text, route, reason, entities) into one result with page offsets."""
+        parts: List[str] = []
+        page_offsets = []
+        routing = []
+        entities = EntityTable()
+        offset = 0
+        for number, (text, route, reason, page_entities) in enumerate(pages, start=1):
+            page_offsets.append({"page_number": number, "start_index": offset, "end_index": offset + len(text)})
+            routing.append({"page_number": number, "route": route, "reason": reason})
+            for type_name, mention_text, confidence, start, end in page_entities or ():
+                entities.append(type_name, mention_text, confidence, offset + start, offset + end, number)
+            parts.append(text)
+            offset += len(text)
+            if text and not text.endswith("\n") and number < len(pages):
+                parts.append("\n")
+                offset += 1
+
+        local_pages = sum(1 for entry in routing if entry["route"] == "local")
+        return {
+            "text": "".join(parts),
+            "pages": len(pages),
+            "page_offsets": page_offsets,
+            "entities": entities.to_list(),
+            "mime_type": mime_type,
+            "routing": routing,
+            "local_pages": local_pages,
+            "cloud_pages": len(pages) - local_pages,
+        }
+
+
+def main():
+    """Command-line interface: extract a document's text, locally where possible."""
+    parser = argparse.ArgumentParser(
+        description="Extract document text locally, using Document AI only for scanned pages"
+    )
+    parser.add_argument("--file-path", required=True, help="Path to document file")
+    parser.add_argument("--mime-type", default=PDF_MIME_TYPE, help="Document MIME type")
+    parser.add_argument("--project-id", help="GCP Project ID (needed for scanned pages)")
+    parser.add_argument("--location", help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", help="Document AI OCR processor ID")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--min-page-chars", type=int, default=64,
+                        help="Minimum text-layer characters to read a PDF page locally")
+    args = parser.parse_args()
+
+    processor = None
+    if args.project_id and args.location and args.processor_id:
+        from document_processor import DocumentAIProcessor
+
+        processor = DocumentAIProcessor(
+            project_id=args.project_id,
+            location=args.location,
+            processor_id=args.processor_id,
+            credentials_path=args.credentials
+        )
+
+    extractor = LocalFirstExtractor(processor, args.min_page_chars)
+    result = extractor.process_document(args.file_path, args.mime_type)
+    print(f"{os.path.basename(args.file_path)}: {result['pages']} pages, "
+          f"{result['local_pages']} local, {result['cloud_pages']} cloud", file=sys.stderr)
+
+    print("RESULT_JSON_START")
+    print(json.dumps(result, default=json_default))
+    print("RESULT_JSON_END")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Local Extractive Summarization (TextRank)
+
+The NotesSummarizer processor takes seconds per call and fails outright
+while the API is throttled. This module summarizes text locally by picking
+its most central sentences with TextRank:
+
+1. The text is split into sentences, keeping their offsets.
+2. Sentences sharing content words are found through a term -> sentences
+   inverted index, and their word overlap (normalized by log sentence
+   lengths) gives edge weights. Terms found in a very large number of
+   sentences are skipped like stopwords, and only the strongest edges of
+   each sentence are kept, so the graph stays sparse and the work grows
+   linearly with the text.
+3. PageRank over that graph scores the sentences; the top ones, in document
+   order, are the summary.
+
+SummaryService uses the local summary as an instant preview while the cloud
+summary is computed, and as the answer when the document is short, the
+processor is throttled or unavailable, or repeated failures have opened the
+circuit for a cool-down period.
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Callable
+
+import numpy as np
+from google.api_core.exceptions import TooManyRequests, ServiceUnavailable, DeadlineExceeded
+
+# Errors that mean "try again later" rather than "this request is bad";
+# ResourceExhausted is a TooManyRequests
+THROTTLING_ERRORS = (TooManyRequests, ServiceUnavailable, DeadlineExceeded)
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n\s*\n|\n(?=\s*(?:[-*•]|\d+[.)])\s)")
+_WORD = re.compile(r"[^\W\d_]{2,}", re.UNICODE)
+_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been
+before being below between both but by can could did do does doing down during each
+few for from further had has have having he her here hers herself him himself his how
+i if in into is it its itself just me more most my myself no nor not now of off on
+once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too
+under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves
+""".split())
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    Split text into sentences.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        (start_index, end_index) of each non-blank sentence, without surrounding whitespace
+    """
+    spans = []
+    position = 0
+    for match in list(_SENTENCE_BREAK.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        piece = text[position:end]
+        stripped = piece.strip()
+        if stripped:
+            start = position + piece.index(stripped[0])
+            spans.append((start, start + len(stripped)))
+        if match:
+            position = match.end()
+    return spans
+
+
+def textrank_scores(
+    sentences: List[List[str]],
+    damping: float = 0.85,
+    neighbors: int = 10,
+    max_iterations: int = 100,
+    tolerance: float = 1e-6,
+    max_term_sentences: int = 250
+) -> np.ndarray:
+    """
+    Score sentences by TextRank.
+
+    Args:
+        sentences: Content words of each sentence
+        damping: PageRank damping factor
+        neighbors: Strongest edges kept per sentence
+        max_iterations: Power-iteration limit
+        tolerance: L1 change at which iteration stops
+        max_term_sentences: Terms in more sentences than this add no edges;
+            this bounds the candidate pairs to max_term_sentences times the
+            number of (sentence, term) postings
+
+    Returns:
+        Float array with one score per sentence
+    """
+    count = len(sentences)
+    if count == 0:
+        return np.zeros(0)
+    postings: Dict[str, List[int]] = {}
+    lengths = np.zeros(count)
+    for row, words in enumerate(sentences):
+        unique = set(words)
+        lengths[row] = len(unique)
+        for word in unique:
+            postings.setdefault(word, []).append(row)
+
+    # Every pair of sentences sharing a term: each posting pairs with the
+    # later postings of the same term (rows within a term are ascending)
+    shared = [rows for rows in postings.values() if 2 <= len(rows) <= max_term_sentences]
+    flat = np.fromiter((row for rows in shared for row in rows), dtype=np.int64)
+    sizes = np.array([len(rows) for rows in shared], dtype=np.int64)
+    group_end = np.repeat(np.cumsum(sizes), sizes)
+    partners = group_end - np.arange(len(flat)) - 1
+    first_position = np.repeat(np.arange(len(flat)), partners)
+    second_position = first_position + 1 + (
+        np.arange(len(first_position)) - np.repeat(np.cumsum(partners) - partners, partners)
+    )
+    keys, overlap = np.unique(flat[first_position] * count + flat[second_position], return_counts=True)
+    first, second = keys // count, keys % count
+    log_lengths = np.log1p(lengths)
+    weights = overlap / np.maximum(log_lengths[first] + log_lengths[second], 1e-9)
+
+    # Keep each sentence's strongest edges; a pair stays if either end keeps it
+    if count > neighbors + 1 and len(keys):
+        ends = np.concatenate([first, second])
+        order = np.lexsort((-np.concatenate([weights, weights]), ends))
+        sorted_ends = ends[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_ends, sorted_ends)
+        kept = np.zeros(len(keys), dtype=bool)
+        kept[order[rank < neighbors] % len(keys)] = True
+        first, second, weights = first[kept], second[kept], weights[kept]
+
+    edge_rows = np.concatenate([first, second])
+    edge_columns = np.concatenate([second, first])
+    edge_weights = np.concatenate([weights, weights])
+
+    out_weight = np.bincount(edge_rows, weights=edge_weights, minlength=count)
+    transition = edge_weights / np.maximum(out_weight[edge_rows], 1e-12)
+    dangling = out_weight == 0
+
+    scores = np.full(count, 1.0 / count)
+    for _ in range(max_iterations):
+        flow = np.bincount(edge_columns, weights=transition * scores[edge_rows], minlength=count)
+        updated = (1.0 - damping) / count + damping * (flow + scores[dangling].sum() / count)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def summarize_text(text: str, max_sentences: int = 5, min_words: int = 4) -> Dict[str, Any]:
+    """
+    Extractive TextRank summary of a text.
+
+    Args:
+        text: Text to summarize
+        max_sentences: Number of sentences in the summary
+        min_words: Sentences with fewer content words are never selected
+
+    Returns:
+        Dict with summary (selected sentences in document order, one per line)
+        and sentences (text, start_index, end_index and score of each)
+    """
+    spans = split_sentences(text)
+    words = [
+        [word for word in _WORD.findall(text[start:end].lower()) if word not in _STOPWORDS]
+        for start, end in spans
+    ]
+    scores = textrank_scores(words)
+    candidates = [i for i in range(len(spans)) if len(words[i]) >= min_words] or list(range(len(spans)))
+    chosen = sorted(sorted(candidates, key=lambda i: -scores[i])[:max_sentences])
+
+    sentences = [
+        {
+            "text": text[spans[i][0]:spans[i][1]],
+            "start_index": spans[i][0],
+            "end_index": spans[i][1],
+            "score": round(float(scores[i]), 6),
+        }
+        for i in chosen
+    ]
+    return {
+        "summary": "\n".join(sentence["text"] for sentence in sentences),
+        "sentences": sentences,
+    }
+
+
+class SummaryService:
+    """Cloud summaries with a local TextRank preview and fallback."""
+
+    def __init__(
+        self,
+        processor,
+        min_cloud_chars: int = 1500,
+        max_sentences: int = 5,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        max_workers: int = 4,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Configure the service.
+
+        Args:
+            processor: DocumentAIProcessor for a summarizing processor (e.g. NotesSummarizer)
+            min_cloud_chars: Shorter texts are summarized locally only
+            max_sentences: Sentences in local summaries
+            failure_threshold: Consecutive throttling errors that open the circuit
+            cooldown_seconds: How long an open circuit serves local summaries
+            max_workers: Cloud summaries in flight for summarize_with_preview
+            clock: Time source, replaceable in simulations
+        """
+        self.processor = processor
+        self.min_cloud_chars = min_cloud_chars
+        self.max_sentences = max_sentences
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    @property
+    def circuit_open(self) -> bool:
+        """Whether cloud calls are currently being skipped after repeated throttling."""
+        with self._lock:
+            return self.clock() < self._open_until
+
+    def preview(self, text: str) -> Dict[str, Any]:
+        """
+        Summarize text locally.
+
+        Args:
+            text: Text to summarize
+
+        Returns:
+            summarize_text result with source 'local'
+        """
+        result = summarize_text(text, self.max_sentences)
+        result["source"] = "local"
+        return result
+
+    def summarize(self, text: str) -> Dict[str, Any]:
+        """
+        Summarize text with the cloud processor, falling back to the local summary.
+
+        Args:
+            text: Text to summarize
+
+        Returns:
+            Dict with summary and source ('cloud' or 'local'); local results
+            also carry sentences and the reason the cloud was not used
+        """
+        if len(text) < self.min_cloud_chars:
+            return self._fallback(text, "short document")
+        if self.circuit_open:
+            return self._fallback(text, "circuit open")
+
+        try:
+            result = self.processor.process_content(text.encode("utf-8"), "text/plain")
+        except THROTTLING_ERRORS as e:
+            with self._lock:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open_until = self.clock() + self.cooldown_seconds
+                    self._failures = 0
+            return self._fallback(text, f"throttled: {type(e).__name__}")
+
+        with self._lock:
+            self._failures = 0
+        if not result.get("summary"):
+            return self._fallback(text, "no cloud summary")
+        return {
+            "summary": result["summary"],
+            "summary_sentences": result.get("summary_sentences", []),
+            "source": "cloud",
+        }
+
+    def summarize_with_preview(self, text: str) -> Tuple[Dict[str, Any], Future]:
+        """
+        Return a local preview immediately and the final summary as a future.
+
+        Args:
+            text: Text to summarize
+
+        Returns:
+            (preview, future resolving to the summarize result)
+        """
+        return self.preview(text), self._executor.submit(self.summarize, text)
+
+    def _fallback(self, text: str, reason: str) -> Dict[str, Any]:
+        result = self.preview(text)
+        result["reason"] = reason
+        return result
+
+    def shutdown(self, wait: bool = True):
+        """Stop the background executor."""
+        self._executor.shutdown(wait=wait)
+
+
+def synthetic_notes(pages: int, seed: int = 11) -> str:
+    """
+    Generate lecture-note-like text of roughly 500 words per page.
+
+    Args:
+        pages: Number of pages
+        seed: Random seed
+
+    Returns:
+        The generated text
+    """
+    rng = random.Random(seed)
+    topics = ["photosynthesis", "chlorophyll", "glucose", "respiration", "mitochondria",
+              "enzyme", "membrane", "protein", "energy", "carbon", "oxygen", "nucleus"]
+    filler = ["process", "cell", "produces", "requires", "stage", "reaction", "light",
+              "water", "structure", "function", "transport", "molecule", "plant", "animal"]
+    # A long tail of rarer words with Zipf-like frequencies, as in real notes
+    syllables = ["ba", "ce", "di", "fo", "gu", "ka", "le", "mi", "no", "pu", "ra", "se", "ti", "vo"]
+    vocabulary = filler + sorted({
+        "".join(rng.choice(syllables) for _ in range(3)) for _ in range(2000)
+    })
+    frequencies = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+    paragraphs = []
+    for _ in range(pages * 5):
+        sentences = []
+        for _ in range(rng.randint(4, 7)):
+            words = rng.sample(topics, 2) + rng.choices(vocabulary, frequencies, k=rng.randint(6, 12))
+            rng.shuffle(words)
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    """Command-line interface: summarize a text file locally, or benchmark the summarizer."""
+    parser = argparse.ArgumentParser(
+        description="Extractive TextRank summary of a text file"
+    )
+    parser.add_argument("--file-path", help="Path to a UTF-8 text file")
+    parser.add_argument("--max-sentences", type=int, default=5, help="Sentences in the summary")
+    parser.add_argument("--benchmark", type=int, metavar="PAGES",
+                        help="Time summaries of synthetic notes of this many pages")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        text = synthetic_notes(args.benchmark)
+        summarize_text(text, args.max_sentences)
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            summarize_text(text, args.max_sentences)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(f"{args.benchmark} pages, {len(split_sentences(text))} sentences: "
+              f"median {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms")
+        return 0
+
+    if not args.file_path:
+        parser.error("--file-path or --benchmark is required")
+    with open(args.file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    print(json.dumps(summarize_text(text, args.max_sentences), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-Batching for Small Text Notes
+
+Most notes uploads are a few hundred words of text/plain, so each request
+pays the full RPC latency for a tiny payload. NoteBatcher collects small
+notes for a few milliseconds, packs them into one text/plain request with a
+marker line before each note, and splits the returned `document.text` and
+entities back to the originating notes by offset.
+
+Markers carry a random per-batch nonce, so note text cannot be mistaken for
+a marker. If the markers do not come back intact, the affected notes are
+processed individually instead.
+
+Batching suits extraction processors (text and entities). A summarizing
+processor would summarize the packed notes together, so use
+process_content directly for those.
+"""
+
+import os
+import re
+import sys
+import time
+import uuid
+import queue
+import argparse
+import threading
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+
+from result_model import EntityTable
+
+_MARKER = "<<<note {nonce} {index}>>>"
+_MARKER_PATTERN = r"<<<note {nonce} (\d+)>>>"
+_EMPTY = object()
+
+
+def pack_notes(texts: List[str], nonce: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Pack notes into one text, each preceded by a marker line.
+
+    Args:
+        texts: Note texts
+        nonce: Marker nonce (random if omitted)
+
+    Returns:
+        (packed_text, nonce)
+    """
+    nonce = nonce or uuid.uuid4().hex[:12]
+    while any(nonce in text for text in texts):
+        nonce = uuid.uuid4().hex[:12]
+    parts = []
+    for index, text in enumerate(texts):
+        parts.append(_MARKER.format(nonce=nonce, index=index))
+        parts.append("\n")
+        parts.append(text)
+        parts.append("\n")
+    return "".join(parts), nonce
+
+
+def note_spans(text: str, nonce: str, count: int) -> List[Optional[Tuple[int, int]]]:
+    """
+    Find each note's (start_index, end_index) in a packed document's text.
+
+    Args:
+        text: document.text of the packed request
+        nonce: Marker nonce used by pack_notes
+        count: Number of packed notes
+
+    Returns:
+        One span per note, or None for notes whose marker is missing or
+        duplicated, or whose span is not closed by the next note's marker
+        (it could have swallowed a note whose marker was lost)
+    """
+    matches = list(re.finditer(_MARKER_PATTERN.format(nonce=re.escape(nonce)), text))
+    spans: List[Optional[Tuple[int, int]]] = [None] * count
+    seen = set()
+    for position, match in enumerate(matches):
+        index = int(match.group(1))
+        if index >= count:
+            continue
+        if index in seen:
+            spans[index] = None
+            continue
+        seen.add(index)
+        following = int(matches[position + 1].group(1)) if position + 1 < len(matches) else count
+        if following != index + 1:
+            continue
+        start = match.end()
+        if text.startswith("\n", start):
+            start += 1
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        if end > start and text[end - 1] == "\n":
+            end -= 1
+        spans[index] = (start, end)
+    return spans
+
+
+def split_document(document, nonce: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Split a packed Document back into per-note results.
+
+    Args:
+        document: DocumentAI document returned for a pack_notes request
+        nonce: Marker nonce used by pack_notes
+        count: Number of packed notes
+
+    Returns:
+        One process_content-style result per note (text, pages, page_offsets,
+        entities, mime_type), or None for notes that could not be located
+    """
+    text = document.text
+    spans = note_spans(text, nonce, count)
+    located = sorted((span[0], span[1], index) for index, span in enumerate(spans) if span)
+    starts = [start for start, _, _ in located]
+    tables = [EntityTable() for _ in range(count)]
+
+    for entity in document.entities:
+        if 'summary' in entity.type_.lower():
+            continue
+        segments = entity.text_anchor.text_segments
+        if not segments:
+            continue
+        start, end = int(segments[0].start_index), int(segments[-1].end_index)
+        i = bisect_right(starts, start) - 1
+        # Entities reaching into a marker or the next note are dropped
+        if i < 0 or end > located[i][1]:
+            continue
+        note_start, _, index = located[i]
+        tables[index].append(
+            entity.type_, entity.mention_text, entity.confidence,
+            start - note_start, end - note_start, 1
+        )
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for index, span in enumerate(spans):
+        if span is None:
+            results.append(None)
+            continue
+        note_text = text[span[0]:span[1]]
+        results.append({
+            "text": note_text,
+            "pages": 1,
+            "page_offsets": [{"page_number": 1, "start_index": 0, "end_index": len(note_text)}],
+            "entities": tables[index].to_list(),
+            "mime_type": "text/plain",
+        })
+    return results
+
+
+class NoteBatcher:
+    """Packs small text notes submitted within a short window into shared requests."""
+
+    def __init__(
+        self,
+        processor,
+        max_wait_ms: float = 10.0,
+        max_batch_bytes: int = 256 * 1024,
+        max_batch_notes: int = 64,
+        max_note_bytes: int = 16 * 1024,
+        workers: int = 4
+    ):
+        """
+        Start the batching thread.
+
+        Args:
+            processor: DocumentAIProcessor for a text extraction processor
+            max_wait_ms: How long the first note of a batch waits for others
+            max_batch_bytes: Size budget of a packed request
+            max_batch_notes: Maximum notes per packed request
+            max_note_bytes: Notes larger than this are sent on their own
+            workers: Packed requests in flight at once
+        """
+        self.processor = processor
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_notes = max_batch_notes
+        self.max_note_bytes = max_note_bytes
+        self._pending: "queue.Queue[Optional[Tuple[Future, str, bytes]]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._stats = {"notes": 0, "rpcs": 0, "batches": 0, "batched_notes": 0, "fallbacks": 0}
+        self._stopping = False
+        self._thread = threading.Thread(target=self._collect, name="note-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a note for processing.
+
+        Args:
+            text: Note text
+
+        Returns:
+            Future resolving to a process_content-style result for the note
+        """
+        if self._stopping:
+            raise RuntimeError("cannot submit to a batcher that is shutting down")
+        future: Future = Future()
+        content = text.encode("utf-8")
+        with self._lock:
+            self._stats["notes"] += 1
+        if len(content) > self.max_note_bytes:
+            self._executor.submit(self._process_single, future, content)
+        else:
+            self._pending.put((future, text, content))
+        return future
+
+    def _collect(self):
+        carry: Any = _EMPTY
+        while True:
+            item = self._pending.get() if carry is _EMPTY else carry
+            carry = _EMPTY
+            if item is None:
+                return
+            batch = [item]
+            size = len(item[2])
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_notes:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._pending.get(timeout=max(remaining, 0)) if remaining > 0 \
+                        else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None or size + len(item[2]) > self.max_batch_bytes:
+                    carry = item
+                    break
+                batch.append(item)
+                size += len(item[2])
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[Future, str, bytes]]):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if len(batch) == 1:
+            self._executor.submit(self._process_single, batch[0][0], batch[0][2], False)
+        elif batch:
+            self._executor.submit(self._process_batch, batch)
+
+    def _process_single(self, future: Future, content: bytes, notify: bool = True):
+        if notify and not future.set_running_or_notify_cancel():
+            return
+        with self._lock:
+            self._stats["rpcs"] += 1
+        try:
+            future.set_result(self.processor.process_content(content, "text/plain"))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _process_batch(self, batch: List[Tuple[Future, str, bytes]]):
+        packed, nonce = pack_notes([text for _, text, _ in batch])
+        with self._lock:
+            self._stats["rpcs"] += 1
+            self._stats["batches"] += 1
+            self._stats["batched_notes"] += len(batch)
+        try:
+            document = self.processor.fetch_document(packed.encode("utf-8"), "text/plain")
+            results = split_document(document, nonce, len(batch))
+        except Exception as e:
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (future, _, content), result in zip(batch, results):
+            if result is None:
+                with self._lock:
+                    self._stats["fallbacks"] += 1
+                self._process_single(future, content, False)
+            else:
+                result["batch"] = {"notes": len(batch), "rpc_shared": True}
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Batching statistics.
+
+        Returns:
+            Dict with notes, rpcs, batches, batched_notes, fallbacks and notes_per_rpc
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats["notes_per_rpc"] = round(stats["notes"] / stats["rpcs"], 2) if stats["rpcs"] else 0.0
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """
+        Flush pending notes and stop the batcher.
+
+        Args:
+            wait: Block until all submitted notes have been processed
+        """
+        self._stopping = True
+        self._pending.put(None)
+        if wait:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+
+def main():
+    """Command-line interface: process a directory of text notes through the batcher."""
+    parser = argparse.ArgumentParser(
+        description="Process many small text notes with packed Document AI requests"
+    )
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", required=True, help="Document AI processor ID")
+    parser.add_argument("--notes-dir", required=True, help="Directory of .txt notes")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Batching window")
+    parser.add_argument("--max-batch-kb", type=int, default=256, help="Packed request size budget")
+    parser.add_argument("--workers", type=int, default=4, help="Requests in flight at once")
+    args = parser.parse_args()
+
+    from document_processor import DocumentAIProcessor
+
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    batcher = NoteBatcher(
+        processor, args.max_wait_ms, args.max_batch_kb * 1024, workers=args.workers
+    )
+
+    started = time.monotonic()
+    futures = {}
+    for name in sorted(os.listdir(args.notes_dir)):
+        if name.endswith(".txt"):
+            with open(os.path.join(args.notes_dir, name), "r", encoding="utf-8") as f:
+                futures[name] = batcher.submit(f.read())
+    for name, future in futures.items():
+        try:
+            result = future.result()
+            print(f"{name}: {len(result['text'])} chars, {len(result['entities'])} entities")
+        except Exception as e:
+            print(f"{name}: failed: {e}")
+    batcher.shutdown()
+
+    elapsed = time.monotonic() - started
+    stats = batcher.stats()
+    print(f"\n{stats['notes']} notes in {stats['rpcs']} requests "
+          f"({stats['notes_per_rpc']} notes/request, {elapsed:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
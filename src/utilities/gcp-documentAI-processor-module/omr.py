@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bubble-Sheet (OMR) Reading
+
+For multiple-choice quizzes a bubble sheet is faster and more reliable to
+read than handwritten answers. Document AI's Form Parser reports every
+bubble it sees as a checkbox: a visual element (and often a checkbox form
+field) typed 'filled_checkbox' or 'unfilled_checkbox', with a bounding box.
+This module reads answers from those boxes by position:
+
+1. An OmrTemplate, computed once per exam, holds the normalized centre of
+   every bubble and which question and option it belongs to. It also
+   precomputes a lookup raster: every cell near a bubble stores that
+   bubble's index, so matching a mark to its bubble is an array lookup.
+2. Each scan is aligned to the template with a least-squares affine fit.
+   The fit uses the sheet's anchor marks (short printed labels at known
+   positions, read as tokens) when at least three are found, and otherwise
+   the mean and spread of the detected bubbles. It is then refined on the bubbles
+   the first estimate matched, which absorbs skew, scale and offset.
+3. Marks of a whole batch of sheets are matched and decoded together: fills
+   are scattered into a sheets x bubbles matrix and reduced to answers per
+   question with matrix products.
+
+A question with one filled bubble gets that option's letter ('A', 'B', ...),
+which grading.Grader reads as an option index. Blank and multiply-marked
+questions are reported separately.
+
+Exam file "omr" section (see answer_sheets.py for the rest of the file):
+
+    "omr": {
+      "anchors": {"#1": [0.05, 0.04], "#2": [0.95, 0.04], "#3": [0.05, 0.96]},
+      "grid": {"origin": [0.12, 0.2], "option_step": 0.045, "question_step": 0.028,
+               "questions_per_column": 25, "column_step": 0.3}
+    }
+
+"grid" can be replaced by an explicit "bubbles" list of
+{"question": id, "option": 0-based index, "x": ..., "y": ...}.
+"""
+
+import sys
+import json
+import time
+import argparse
+from typing import Optional, Dict, Any, List, Tuple, NamedTuple, Union, Sequence
+
+import numpy as np
+
+from answer_sheets import AnswerSheetPipeline, AnswerSheetTemplate, run_to_directory, failed_result
+from spatial_index import layout_box
+from text_anchor import TextAnchorResolver
+
+FILLED = "filled_checkbox"
+
+
+class SheetMarks(NamedTuple):
+    """Checkbox marks and anchor positions read from one sheet, in normalized page coordinates."""
+    centers: np.ndarray
+    filled: np.ndarray
+    confidence: np.ndarray
+    anchors: Dict[str, Tuple[float, float]]
+
+
+def fit_affine(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Least-squares affine transform between point sets.
+
+    Args:
+        source: (n, 2) points, n >= 3
+        target: (n, 2) corresponding points
+
+    Returns:
+        (3, 2) matrix M with [x, y, 1] @ M ~= target
+    """
+    design = np.hstack([source, np.ones((len(source), 1))])
+    matrix = np.linalg.lstsq(design, target, rcond=None)[0]
+    return matrix
+
+
+def apply_affine(points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Apply a (3, 2) affine matrix from fit_affine to (n, 2) points."""
+    return points @ matrix[:2] + matrix[2]
+
+
+def marks_from_document(document, anchor_labels: Sequence[str] = (), page_index: int = 0) -> SheetMarks:
+    """
+    Collect checkbox marks and anchor labels from a Form Parser document.
+
+    Args:
+        document: DocumentAI document of one sheet
+        anchor_labels: Printed anchor labels to look for among the tokens
+        page_index: 0-based page holding the bubbles
+
+    Returns:
+        SheetMarks with one entry per checkbox visual element or checkbox
+        form field (a bubble reported both ways appears twice, which is harmless)
+    """
+    centers: List[Tuple[float, float]] = []
+    filled: List[bool] = []
+    confidence: List[float] = []
+    anchors: Dict[str, Tuple[float, float]] = {}
+    if page_index >= len(document.pages):
+        return SheetMarks(np.zeros((0, 2)), np.zeros(0, dtype=bool), np.zeros(0), anchors)
+    page = document.pages[page_index]
+
+    def add(layout, kind: str):
+        box = layout_box(layout)
+        if box is not None:
+            centers.append(((box[0] + box[2]) / 2, (box[1] + box[3]) / 2))
+            filled.append(kind == FILLED)
+            confidence.append(float(layout.confidence))
+
+    for element in page.visual_elements:
+        if element.type_.endswith("checkbox"):
+            add(element.layout, element.type_)
+    for field in page.form_fields:
+        if field.value_type.endswith("checkbox"):
+            add(field.field_value, field.value_type)
+
+    if anchor_labels:
+        wanted = set(anchor_labels)
+        resolver = TextAnchorResolver(document)
+        for token in page.tokens:
+            label = resolver.layout_text(token.layout).strip()
+            box = layout_box(token.layout)
+            if label in wanted and label not in anchors and box is not None:
+                anchors[label] = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+
+    return SheetMarks(
+        np.array(centers, dtype=float).reshape(-1, 2),
+        np.array(filled, dtype=bool),
+        np.array(confidence, dtype=float),
+        anchors,
+    )
+
+
+class OmrTemplate:
+    """Bubble positions of an exam's answer sheet with a precomputed lookup raster."""
+
+    def __init__(
+        self,
+        question_ids: List[str],
+        bubbles: np.ndarray,
+        bubble_question: np.ndarray,
+        bubble_option: np.ndarray,
+        anchors: Optional[Dict[str, Tuple[float, float]]] = None,
+        tolerance: Optional[float] = None,
+        resolution: int = 1024
+    ):
+        """
+        Create a template.
+
+        Args:
+            question_ids: ExamQuestion IDs
+            bubbles: (B, 2) normalized bubble centres
+            bubble_question: (B,) index into question_ids per bubble
+            bubble_option: (B,) 0-based option index per bubble
+            anchors: Anchor label -> normalized centre
+            tolerance: Largest distance from a bubble centre at which a mark
+                still counts (default: 0.45 x the closest bubble spacing)
+            resolution: Lookup raster cells per page side
+        """
+        self.question_ids = question_ids
+        self.bubbles = np.asarray(bubbles, dtype=float).reshape(-1, 2)
+        self.bubble_question = np.asarray(bubble_question, dtype=np.int64)
+        self.bubble_option = np.asarray(bubble_option, dtype=np.int64)
+        self.anchors = {label: tuple(point) for label, point in (anchors or {}).items()}
+        self.resolution = resolution
+
+        if tolerance is None:
+            gaps = np.sqrt(((self.bubbles[:, None, :] - self.bubbles[None, :, :]) ** 2).sum(axis=2))
+            np.fill_diagonal(gaps, np.inf)
+            tolerance = 0.45 * float(gaps.min()) if len(self.bubbles) > 1 else 0.02
+        self.tolerance = tolerance
+
+        # Question membership of each bubble, for per-question reductions
+        self.membership = np.zeros((len(self.bubbles), len(question_ids)))
+        self.membership[np.arange(len(self.bubbles)), self.bubble_question] = 1.0
+        self.option_counts = np.bincount(self.bubble_question, minlength=len(question_ids))
+        self._lookup = self._build_lookup()
+
+    def _build_lookup(self) -> np.ndarray:
+        """Paint a disc of radius tolerance around every bubble into an index raster."""
+        size = self.resolution
+        lookup = np.full((size, size), -1, dtype=np.int32)
+        radius = int(np.ceil(self.tolerance * size))
+        dx, dy = np.meshgrid(np.arange(-radius, radius + 1), np.arange(-radius, radius + 1))
+        inside = dx ** 2 + dy ** 2 <= (self.tolerance * size) ** 2
+        dx, dy = dx[inside], dy[inside]
+
+        cells = np.floor(self.bubbles * size).astype(np.int64)
+        xs = (cells[:, 0:1] + dx[None, :]).ravel()
+        ys = (cells[:, 1:2] + dy[None, :]).ravel()
+        owner = np.repeat(np.arange(len(self.bubbles), dtype=np.int32), len(dx))
+        valid = (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+        lookup[ys[valid], xs[valid]] = owner[valid]
+        return lookup
+
+    def lookup(self, points: np.ndarray) -> np.ndarray:
+        """
+        Find the bubble at each point.
+
+        Args:
+            points: (n, 2) normalized template coordinates
+
+        Returns:
+            (n,) bubble indices, -1 where no bubble is within tolerance
+        """
+        cells = np.floor(points * self.resolution).astype(np.int64)
+        valid = ((cells >= 0) & (cells < self.resolution)).all(axis=1)
+        index = np.full(len(points), -1, dtype=np.int32)
+        index[valid] = self._lookup[cells[valid, 1], cells[valid, 0]]
+        return index
+
+    @classmethod
+    def grid(
+        cls,
+        question_ids: List[str],
+        options: Union[int, List[int]] = 4,
+        origin: Tuple[float, float] = (0.12, 0.2),
+        option_step: float = 0.045,
+        question_step: float = 0.028,
+        questions_per_column: int = 25,
+        column_step: float = 0.3,
+        anchors: Optional[Dict[str, Tuple[float, float]]] = None,
+        tolerance: Optional[float] = None
+    ) -> "OmrTemplate":
+        """
+        Build the template of a regular bubble grid.
+
+        Questions run down a column, one row each with options side by
+        side, and continue in the next column after questions_per_column.
+
+        Args:
+            question_ids: ExamQuestion IDs in sheet order
+            options: Options per question (one count for all, or one per question)
+            origin: Normalized centre of the first question's first bubble
+            option_step: Horizontal distance between options
+            question_step: Vertical distance between questions
+            questions_per_column: Questions before wrapping to the next column
+            column_step: Horizontal distance between columns
+            anchors: Anchor label -> normalized centre
+            tolerance: See __init__
+        """
+        counts = [options] * len(question_ids) if isinstance(options, int) else list(options)
+        question = np.repeat(np.arange(len(question_ids)), counts)
+        option = np.concatenate([np.arange(count) for count in counts]) if counts else np.zeros(0, dtype=int)
+        column, row = np.divmod(question, questions_per_column)
+        bubbles = np.stack([
+            origin[0] + column * column_step + option * option_step,
+            origin[1] + row * question_step,
+        ], axis=1)
+        return cls(question_ids, bubbles, question, option, anchors, tolerance)
+
+    @classmethod
+    def from_exam(cls, exam_data: Dict[str, Any]) -> "OmrTemplate":
+        """
+        Build a template from an exam file's questions and "omr" section.
+
+        Args:
+            exam_data: Parsed exam file (see the module docstring)
+        """
+        section = exam_data.get("omr", {})
+        questions = exam_data["questions"]
+        question_ids = [question["id"] for question in questions]
+        anchors = section.get("anchors")
+        if "bubbles" in section:
+            positions = {question_id: index for index, question_id in enumerate(question_ids)}
+            bubbles = section["bubbles"]
+            return cls(
+                question_ids,
+                np.array([[bubble["x"], bubble["y"]] for bubble in bubbles]),
+                np.array([positions[bubble["question"]] for bubble in bubbles]),
+                np.array([bubble["option"] for bubble in bubbles]),
+                anchors,
+                section.get("tolerance"),
+            )
+        grid = dict(section.get("grid", {}))
+        options = [len(question.get("options") or ()) or grid.get("options", 4) for question in questions]
+        grid["options"] = options
+        return cls.grid(question_ids, anchors=anchors, tolerance=section.get("tolerance"), **grid)
+
+
+class BubbleReader:
+    """Aligns sheets to an OmrTemplate and decodes their answers in batches."""
+
+    def __init__(self, template: OmrTemplate, min_matches: int = 6, refinements: int = 2):
+        """
+        Configure the reader.
+
+        Args:
+            template: Bubble layout of the exam
+            min_matches: Matched bubbles needed to refine the alignment
+            refinements: Refits of the alignment on matched bubbles
+        """
+        self.template = template
+        self.min_matches = min_matches
+        self.refinements = refinements
+
+    def align(self, marks: SheetMarks) -> Tuple[np.ndarray, str]:
+        """
+        Estimate the affine transform from a sheet to the template.
+
+        Args:
+            marks: Marks read from the sheet
+
+        Returns:
+            ((3, 2) matrix, method) where method is 'anchors', 'moments' or 'none'
+        """
+        template = self.template
+        centers = marks.centers
+        labels = [label for label in marks.anchors if label in template.anchors]
+        if len(labels) >= 3:
+            matrix = fit_affine(
+                np.array([marks.anchors[label] for label in labels]),
+                np.array([template.anchors[label] for label in labels]),
+            )
+            method = "anchors"
+        elif len(centers) >= 3:
+            # Match the mean and spread of the detected bubbles to the grid's;
+            # unlike the bounding box, these barely move when edge bubbles are missed
+            mean, spread = centers.mean(axis=0), centers.std(axis=0)
+            target_mean, target_spread = template.bubbles.mean(axis=0), template.bubbles.std(axis=0)
+            scale = target_spread / np.maximum(spread, 1e-9)
+            matrix = np.array([[scale[0], 0.0], [0.0, scale[1]], target_mean - mean * scale])
+            method = "moments"
+        else:
+            return np.array([[1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]), "none"
+
+        for _ in range(self.refinements):
+            index = template.lookup(apply_affine(centers, matrix))
+            hit = index >= 0
+            if hit.sum() < self.min_matches:
+                break
+            matrix = fit_affine(centers[hit], template.bubbles[index[hit]])
+        return matrix, method
+
+    def read_batch(self, sheets: List[SheetMarks]) -> List[Dict[str, Any]]:
+        """
+        Decode the answers of several sheets.
+
+        Args:
+            sheets: Marks of each sheet
+
+        Returns:
+            One dict per sheet with answers (question ID -> option letter),
+            confidence (question ID -> mark confidence), blank and multiple
+            (question IDs), and alignment (method, detected, matched, and
+            residual: mean distance of matched marks from their bubbles)
+        """
+        template = self.template
+        bubble_count = len(template.bubbles)
+        rows, indices, fills, confidences, alignments = [], [], [], [], []
+        for row, marks in enumerate(sheets):
+            matrix, method = self.align(marks)
+            mapped = apply_affine(marks.centers, matrix)
+            index = template.lookup(mapped)
+            hit = index >= 0
+            residual = np.sqrt(((mapped[hit] - template.bubbles[index[hit]]) ** 2).sum(axis=1))
+            alignments.append({
+                "method": method,
+                "detected": int(len(marks.centers)),
+                "matched": int(hit.sum()),
+                "residual": round(float(residual.mean()), 5) if hit.any() else None,
+            })
+            rows.append(np.full(int(hit.sum()), row, dtype=np.int64))
+            indices.append(index[hit])
+            fills.append(marks.filled[hit])
+            confidences.append(marks.confidence[hit])
+
+        marked = np.zeros((len(sheets), bubble_count), dtype=bool)
+        confidence = np.zeros((len(sheets), bubble_count))
+        if sheets:
+            rows, indices = np.concatenate(rows), np.concatenate(indices)
+            fills, confidences = np.concatenate(fills), np.concatenate(confidences)
+            marked[rows[fills], indices[fills]] = True
+            np.maximum.at(confidence, (rows[fills], indices[fills]), confidences[fills])
+
+        # Per-question reductions over the sheets x bubbles matrices
+        marks_per_question = marked.astype(float) @ template.membership
+        chosen = (marked * (template.bubble_option + 1)[None, :]) @ template.membership - 1
+        chosen_confidence = (confidence * marked) @ template.membership
+
+        results = []
+        for row in range(len(sheets)):
+            counts = marks_per_question[row]
+            single = np.nonzero(counts == 1)[0]
+            results.append({
+                "answers": {
+                    template.question_ids[column]: _option_letter(int(chosen[row, column]))
+                    for column in single
+                },
+                "confidence": {
+                    template.question_ids[column]: round(float(chosen_confidence[row, column]), 4)
+                    for column in single
+                },
+                "blank": [template.question_ids[column] for column in np.nonzero(counts == 0)[0]],
+                "multiple": [template.question_ids[column] for column in np.nonzero(counts > 1)[0]],
+                "alignment": alignments[row],
+            })
+        return results
+
+
+def _option_letter(index: int) -> str:
+    return chr(ord("A") + index) if index < 26 else str(index + 1)
+
+
+class OmrPipeline(AnswerSheetPipeline):
+    """Processes bubble sheets into ExamSubmission records, decoding a batch of sheets per worker."""
+
+    def __init__(
+        self,
+        processor,
+        exam: Dict[str, Any],
+        template: AnswerSheetTemplate,
+        omr_template: OmrTemplate,
+        workers: int = 8,
+        batch_size: int = 50
+    ):
+        """
+        Configure the pipeline.
+
+        Args:
+            processor: DocumentAIProcessor for a Form Parser processor
+            exam: Exam record (needs 'id')
+            template: Answer-sheet template, used for the student ID field
+                and pages_per_sheet
+            omr_template: Bubble layout of the exam
+            workers: Batches processed concurrently
+            batch_size: Sheets per batch
+        """
+        super().__init__(processor, exam, template, workers, batch_size)
+        self.reader = BubbleReader(omr_template)
+        self._anchor_labels = list(omr_template.anchors)
+
+    def process_batch(self, sheets: List[Tuple[str, Optional[List[int]], str]]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of sheets: one Document AI call per sheet, then one
+        decoding pass for the whole batch.
+
+        Args:
+            sheets: (file_path, pages, name) tuples from sheets()
+
+        Returns:
+            One result per sheet: submission, source, confidence, omr (blank,
+            multiple and alignment) and user_id_found; or {'source', 'error'}
+        """
+        results: List[Optional[Dict[str, Any]]] = []
+        read: List[Tuple[int, SheetMarks, Optional[str]]] = []
+        for path, pages, name in sheets:
+            try:
+                started = time.perf_counter()
+                content, mime_type, select = self.read_sheet(path, pages)
+                started = self._timed("read", started)
+                document = self.processor.fetch_document(content, mime_type, pages=select)
+                started = self._timed("ocr", started)
+                marks = marks_from_document(document, self._anchor_labels)
+                user_id = self.template.map_fields(self.processor.extract_form_fields(document))["user_id"]
+                self._timed("marks", started)
+            except Exception as e:
+                results.append(failed_result(path, pages, e))
+                continue
+            read.append((len(results), marks, user_id))
+            results.append(None)
+
+        started = time.perf_counter()
+        decoded = self.reader.read_batch([marks for _, marks, _ in read])
+        self._timed("decode_batch", started)
+
+        for (position, _, user_id), sheet in zip(read, decoded):
+            path, pages, name = sheets[position]
+            results[position] = {
+                "submission": self.submission(user_id or name, sheet["answers"]),
+                "source": {"file_path": path, "pages": pages},
+                "confidence": sheet["confidence"],
+                "omr": {key: sheet[key] for key in ("blank", "multiple", "alignment")},
+                "user_id_found": user_id is not None,
+            }
+        return results
+
+
+def synthetic_sheets(
+    template: OmrTemplate,
+    count: int,
+    seed: int = 3,
+    blank_rate: float = 0.03,
+    multiple_rate: float = 0.02,
+    anchor_rate: float = 0.8
+) -> Tuple[List[SheetMarks], List[Dict[str, Any]]]:
+    """
+    Generate marks of skewed, shifted and noisy scans of filled-in sheets.
+
+    Args:
+        template: Bubble layout
+        count: Number of sheets
+        seed: Random seed
+        blank_rate: Share of questions left blank
+        multiple_rate: Share of questions with two bubbles filled
+        anchor_rate: Share of sheets whose anchor labels are read
+
+    Returns:
+        (sheets, truths) where each truth has answers, blank and multiple
+        like BubbleReader.read_batch
+    """
+    rng = np.random.RandomState(seed)
+    sheets, truths = [], []
+    questions = len(template.question_ids)
+    for _ in range(count):
+        angle = np.radians(rng.uniform(-2, 2))
+        scale = rng.uniform(0.96, 1.04, size=2)
+        rotation = np.array([[np.cos(angle), np.sin(angle)], [-np.sin(angle), np.cos(angle)]])
+        matrix = np.vstack([rotation * scale[None, :], rng.uniform(-0.02, 0.02, size=2)])
+
+        chosen = np.array([rng.randint(n) if n else -1 for n in template.option_counts])
+        roll = rng.uniform(size=questions)
+        blank = roll < blank_rate
+        multiple = (roll >= blank_rate) & (roll < blank_rate + multiple_rate)
+        filled = template.bubble_option == chosen[template.bubble_question]
+        filled &= ~blank[template.bubble_question]
+        second = (template.bubble_option == (chosen[template.bubble_question] + 1)
+                  % np.maximum(template.option_counts[template.bubble_question], 1))
+        filled |= second & multiple[template.bubble_question]
+
+        # Scanners lose some empty bubbles but almost never a filled one
+        seen = filled | (rng.uniform(size=len(filled)) > 0.05)
+        centers = apply_affine(template.bubbles[seen], matrix) + rng.normal(0, 0.0015, size=(seen.sum(), 2))
+        anchors = {}
+        if template.anchors and rng.uniform() < anchor_rate:
+            labels = list(template.anchors)
+            points = apply_affine(np.array([template.anchors[label] for label in labels]), matrix)
+            anchors = {label: tuple(point) for label, point in zip(labels, points)}
+        sheets.append(SheetMarks(centers, filled[seen], rng.uniform(0.8, 1.0, size=seen.sum()), anchors))
+
+        single = ~blank & ~multiple
+        truths.append({
+            "answers": {
+                template.question_ids[column]: _option_letter(int(chosen[column]))
+                for column in np.nonzero(single)[0]
+            },
+            "blank": [template.question_ids[column] for column in np.nonzero(blank)[0]],
+            "multiple": [template.question_ids[column] for column in np.nonzero(multiple)[0]],
+        })
+    return sheets, truths
+
+
+def main():
+    """Command-line interface: read bubble sheets into ExamSubmission files, or benchmark decoding."""
+    parser = argparse.ArgumentParser(
+        description="Read scanned bubble sheets (OMR) into ExamSubmission JSON"
+    )
+    parser.add_argument("--project-id", help="GCP Project ID")
+    parser.add_argument("--location", help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", help="Form Parser processor ID")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--exam", help="Exam JSON file with exam, questions and omr section")
+    parser.add_argument("--output-dir", help="Directory for ExamSubmission files")
+    parser.add_argument("--workers", type=int, default=8, help="Batches processed concurrently")
+    parser.add_argument("--batch-size", type=int, default=50, help="Sheets per batch")
+    parser.add_argument("--benchmark", type=int, metavar="SHEETS",
+                        help="Decode this many synthetic sheets (60 questions, 5 options) and time it")
+    parser.add_argument("paths", nargs="*", help="Sheet files, multi-page PDFs or directories")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        anchors = {"#1": (0.05, 0.04), "#2": (0.95, 0.04), "#3": (0.05, 0.96), "#4": (0.95, 0.96)}
+        template = OmrTemplate.grid([f"q{i + 1}" for i in range(60)], 5, anchors=anchors)
+        sheets, truths = synthetic_sheets(template, args.benchmark)
+        reader = BubbleReader(template)
+        started = time.perf_counter()
+        results = []
+        for first in range(0, len(sheets), args.batch_size):
+            results.extend(reader.read_batch(sheets[first:first + args.batch_size]))
+        elapsed = time.perf_counter() - started
+        correct = sum(
+            result["answers"] == truth["answers"] and result["multiple"] == truth["multiple"]
+            for result, truth in zip(results, truths)
+        )
+        print(f"{args.benchmark} sheets decoded in {elapsed:.2f}s "
+              f"({args.benchmark / elapsed * 60:.0f} sheets/minute), "
+              f"{correct} / {args.benchmark} read exactly")
+        return 0
+
+    if not (args.project_id and args.location and args.processor_id and args.exam
+            and args.output_dir and args.paths):
+        parser.error("--project-id, --location, --processor-id, --exam, --output-dir and paths "
+                     "are required unless --benchmark is given")
+
+    from document_processor import DocumentAIProcessor
+
+    with open(args.exam, "r", encoding="utf-8") as f:
+        exam_data = json.load(f)
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    pipeline = OmrPipeline(
+        processor,
+        exam_data["exam"],
+        AnswerSheetTemplate.from_exam(exam_data),
+        OmrTemplate.from_exam(exam_data),
+        args.workers,
+        args.batch_size,
+    )
+    summary = run_to_directory(pipeline, args.paths, args.output_dir)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
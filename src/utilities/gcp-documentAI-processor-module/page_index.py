@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Page Offset Index
+
+Document AI returns one `text` string for the whole document; each page's
+layout points into it through text_anchor segments. This module collects
+those segments once into sorted offset arrays, so that any text offset (an
+entity mention, a summary sentence, a search hit) is mapped to its page by
+binary search instead of by walking the pages again.
+
+It also exposes per-page text slicing so callers can jump straight to a page.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional, Dict, Any, List, Tuple
+
+from text_anchor import raw_message
+
+
+class PageOffsetIndex:
+    """Sorted mapping from document text offsets to 1-based page numbers."""
+
+    def __init__(self, text: str, segments: List[Tuple[int, int, int]]):
+        """
+        Build the index from page segments.
+
+        Args:
+            text: The full document text
+            segments: (start_index, end_index, page_number) tuples, in any order
+        """
+        self.text = text
+        ordered = sorted(segments)
+        self.starts = array("q", (start for start, _, _ in ordered))
+        self.ends = array("q", (end for _, end, _ in ordered))
+        self.page_numbers = array("i", (page for _, _, page in ordered))
+
+        self._page_segments: Dict[int, List[Tuple[int, int]]] = {}
+        for start, end, page in ordered:
+            self._page_segments.setdefault(page, []).append((start, end))
+
+    @classmethod
+    def from_document(cls, document) -> "PageOffsetIndex":
+        """
+        Build the index from a DocumentAI document.
+
+        Args:
+            document: DocumentAI document object
+        """
+        document = raw_message(document)
+        segments = []
+        for index, page in enumerate(document.pages):
+            page_number = page.page_number or index + 1
+            for segment in page.layout.text_anchor.text_segments:
+                segments.append((int(segment.start_index), int(segment.end_index), page_number))
+        return cls(document.text, segments)
+
+    def __len__(self) -> int:
+        return len(self._page_segments)
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages with text."""
+        return len(self._page_segments)
+
+    def page_for_offset(self, offset: int) -> Optional[int]:
+        """
+        Find the page containing a text offset.
+
+        Args:
+            offset: Character offset into the document text
+
+        Returns:
+            1-based page number, or None if the offset is not on any page
+        """
+        i = bisect_right(self.starts, offset) - 1
+        if i >= 0 and offset < self.ends[i]:
+            return self.page_numbers[i]
+        return None
+
+    def pages_for_span(self, start: int, end: int) -> List[int]:
+        """
+        Find all pages a text span touches.
+
+        Args:
+            start: Start offset of the span
+            end: End offset of the span (exclusive)
+
+        Returns:
+            Sorted list of 1-based page numbers
+        """
+        if end <= start:
+            page = self.page_for_offset(start)
+            return [page] if page is not None else []
+        first = max(0, bisect_right(self.starts, start) - 1)
+        last = bisect_left(self.starts, end)
+        pages = {
+            self.page_numbers[i] for i in range(first, last)
+            if self.ends[i] > start
+        }
+        return sorted(pages)
+
+    def locate(self, fragment: str, start: int = 0) -> Optional[Tuple[int, int, List[int]]]:
+        """
+        Find a fragment of text (e.g. a summary sentence) and the pages it is on.
+
+        Args:
+            fragment: Text to look for
+            start: Offset to start searching from
+
+        Returns:
+            (start_index, end_index, pages) of the first match, or None if not found
+        """
+        fragment = fragment.strip()
+        if not fragment:
+            return None
+        position = self.text.find(fragment, start)
+        if position < 0:
+            return None
+        end = position + len(fragment)
+        return position, end, self.pages_for_span(position, end)
+
+    def locate_sentences(self, passage: str) -> List[Dict[str, Any]]:
+        """
+        Map each sentence of a passage (e.g. an extractive summary) to its pages.
+
+        Args:
+            passage: Text made of sentences that may appear in the document
+
+        Returns:
+            List of dicts with text and pages (empty when the sentence is not
+            found verbatim in the document)
+        """
+        sentences = []
+        for sentence in re.split(r"(?<=[.!?])\s+|\n+", passage):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            match = self.locate(sentence)
+            sentences.append({"text": sentence, "pages": match[2] if match else []})
+        return sentences
+
+    def page_span(self, page_number: int) -> Optional[Tuple[int, int]]:
+        """
+        Text offsets covered by a page.
+
+        Args:
+            page_number: 1-based page number
+
+        Returns:
+            (start_index, end_index) from the page's first to last segment, or None
+        """
+        segments = self._page_segments.get(page_number)
+        if not segments:
+            return None
+        return segments[0][0], segments[-1][1]
+
+    def page_text(self, page_number: int) -> str:
+        """
+        Text of a single page.
+
+        Args:
+            page_number: 1-based page number
+
+        Returns:
+            The page's text ('' if the page has no text)
+        """
+        segments = self._page_segments.get(page_number, ())
+        if len(segments) == 1:
+            start, end = segments[0]
+            return self.text[start:end]
+        return "".join(self.text[start:end] for start, end in segments)
+
+    def to_list(self) -> List[Dict[str, int]]:
+        """
+        Page spans for clients that slice the text themselves.
+
+        Returns:
+            List of dicts with page_number, start_index and end_index, by page
+        """
+        return [
+            {"page_number": page, "start_index": segments[0][0], "end_index": segments[-1][1]}
+            for page, segments in sorted(self._page_segments.items())
+        ]
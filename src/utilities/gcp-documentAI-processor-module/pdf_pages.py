@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Local PDF Page Splitting
+
+Document AI can be told to process only some pages of a file, but the whole
+file still has to be uploaded with every request. When a large PDF is
+processed a window or a sheet at a time, that resends the full file for each
+call. PdfPageSplitter indexes a PDF's pages once and cuts out just the
+requested pages as a small standalone PDF, so each request carries only its
+own pages.
+
+The splitter does not keep parsed pages. Opening it walks the page tree one
+node at a time and remembers only a reference to each page, and every
+extract parses just the requested pages and drops them again afterwards.
+Memory therefore follows the number of pages cut out at a time rather than
+the page count. open_pdf_file also leaves the file on disk and reads it as
+pages are needed, instead of loading it whole.
+
+pypdf is optional (`pip install pypdf`, or the `local` extra). Without it
+open_pdf_pages returns None and callers fall back to uploading the whole file
+with a page selector.
+"""
+
+import gc
+import io
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Sequence
+
+try:
+    from pypdf import PageObject, PdfReader, PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, IndirectObject, NameObject
+except ImportError:
+    PdfReader = None
+
+PDF_MIME_TYPE = "application/pdf"
+
+
+# Page attributes a page inherits from its ancestors in the page tree
+_INHERITABLE = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+class PdfPageSplitter:
+    """A PDF that page subsets can be cut out of repeatedly, from any thread."""
+
+    def __init__(self, reader, stream=None):
+        """
+        Index the pages of an open pypdf reader.
+
+        Args:
+            reader: pypdf PdfReader over the full document
+            stream: File the reader reads from, closed by close() (None when
+                the caller owns the stream)
+        """
+        self._reader = reader
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._pages = _page_references(reader)
+        self.page_count = len(self._pages)
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    def __enter__(self) -> "PdfPageSplitter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the file the splitter reads from, if it opened one."""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def extract(self, pages: Sequence[int]) -> bytes:
+        """
+        Build a PDF holding only the given pages.
+
+        Args:
+            pages: 1-based page numbers, in the order they should appear
+
+        Returns:
+            Bytes of a standalone PDF with those pages
+        """
+        for page_number in pages:
+            if not 1 <= page_number <= self.page_count:
+                raise ValueError(f"page {page_number} is outside 1-{self.page_count}")
+        # pypdf parses lazily from one stream, so readers are not thread-safe
+        with self._lock:
+            try:
+                return self._write(pages)
+            finally:
+                # Forget what this call parsed; the next call reads its own
+                # pages. pypdf objects point back at their reader or writer,
+                # so they are freed by the cycle collector, not on release.
+                self._reader.resolved_objects.clear()
+                gc.collect()
+
+    def _write(self, pages: Sequence[int]) -> bytes:
+        writer = PdfWriter()
+        for page_number in pages:
+            reference, inherited = self._pages[page_number - 1]
+            indirect = reference if isinstance(reference, IndirectObject) else None
+            page = PageObject(self._reader, indirect)
+            page.update(reference.get_object())
+            for name, value in inherited.items():
+                if name not in page:
+                    page[NameObject(name)] = value
+            writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+
+def _page_references(reader) -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    (indirect reference, inherited attributes) of every page, in order.
+
+    Walks the page tree without pypdf's page list, which would keep every
+    parsed page dictionary; each node is dropped from the reader's cache once
+    its kids or its reference are recorded. Pages given inline rather than
+    by reference are kept as they are.
+    """
+    cache = reader.resolved_objects
+    pages: List[Tuple[Any, Dict[str, Any]]] = []
+    visited = set()
+    stack: List[Tuple[Any, Dict[str, Any]]] = [(reader.trailer["/Root"].raw_get("/Pages"), {})]
+    while stack:
+        reference, inherited = stack.pop()
+        indirect = isinstance(reference, IndirectObject)
+        if indirect:
+            if reference.idnum in visited:
+                raise ValueError("page tree contains a cycle")
+            visited.add(reference.idnum)
+        node = reference.get_object()
+        if node.get("/Type") == "/Pages" or ("/Type" not in node and "/Kids" in node):
+            inherit = dict(inherited)
+            inherit.update((name, node.raw_get(name)) for name in _INHERITABLE if name in node)
+            stack.extend((kid, inherit) for kid in reversed(node["/Kids"]))
+        else:
+            pages.append((reference, inherited))
+        if indirect:
+            cache.pop((reference.generation, reference.idnum), None)
+    cache.clear()
+    return pages
+
+
+def open_pdf_pages(content: bytes, mime_type: str = PDF_MIME_TYPE) -> Optional[PdfPageSplitter]:
+    """
+    Parse a PDF for local page splitting.
+
+    Args:
+        content: Raw bytes of the document
+        mime_type: MIME type of the document; anything but a PDF returns None
+
+    Returns:
+        PdfPageSplitter, or None if the content is not a PDF, pypdf is not
+        installed, or the file cannot be read
+    """
+    if mime_type != PDF_MIME_TYPE or PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        if reader.is_encrypted:
+            return None
+        return PdfPageSplitter(reader)
+    except Exception:
+        return None
+
+
+def open_pdf_file(file_path: str, mime_type: str = PDF_MIME_TYPE) -> Optional[PdfPageSplitter]:
+    """
+    Open a PDF file for local page splitting without keeping it in memory.
+
+    Args:
+        file_path: Path to the document file
+        mime_type: MIME type of the document; anything but a PDF returns None
+
+    Returns:
+        PdfPageSplitter reading from the open file (close it when done), or
+        None if the file is not a PDF, pypdf is not installed, or the file
+        cannot be read
+    """
+    if mime_type != PDF_MIME_TYPE or PdfReader is None:
+        return None
+    try:
+        stream = open(file_path, "rb")
+    except OSError:
+        return None
+    try:
+        reader = PdfReader(stream)
+        if not reader.is_encrypted:
+            return PdfPageSplitter(reader, stream)
+    except Exception:
+        pass
+    stream.close()
+    return None
+
+
+def synthetic_pdf(page_count: int, text_bytes: int = 2000) -> bytes:
+    """
+    Build a text PDF for benchmarks, with "Page N" and filler on each page.
+
+    Args:
+        page_count: Number of pages
+        text_bytes: Approximate size of each page's content stream
+
+    Returns:
+        PDF bytes (requires pypdf)
+    """
+    if PdfReader is None:
+        raise RuntimeError("pypdf is required to build synthetic PDFs")
+    writer = PdfWriter()
+    filler = " ".join(f"word{i}" for i in range(text_bytes // 8))
+    for page_number in range(1, page_count + 1):
+        page = writer.add_blank_page(width=612, height=792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({
+                NameObject("/F1"): DictionaryObject({
+                    NameObject("/Type"): NameObject("/Font"),
+                    NameObject("/Subtype"): NameObject("/Type1"),
+                    NameObject("/BaseFont"): NameObject("/Helvetica"),
+                }),
+            }),
+        })
+        stream = DecodedStreamObject()
+        stream.set_data(
+            f"BT /F1 12 Tf 72 720 Td (Page {page_number}) Tj ET\n"
+            f"BT /F1 6 Tf 72 700 Td ({filler}) Tj ET".encode("latin-1")
+        )
+        page.replace_contents(stream)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
@@ -17,6 +17,8 @@ if current_dir not in sys.path:
 # Try importing dependencies, handle gracefully if not installed
 try:
     from document_processor import DocumentAIProcessor
+    from local_extract import LocalFirstExtractor
+    from result_model import json_default
 except ImportError as e:
     print(f"\n❌ Error: Required dependencies not found: {e}")
     print("Please install the required dependencies first:")
@@ -69,15 +71,16 @@ def process_from_config(config_file):
         print(f"Processing document: {file_path}")
         print(f"Using processor ID: {processor_id}")
         
-        # Process the document
-        result = processor.process_document(
+        # Process the document; text files and text-layer PDF pages are read
+        # locally, only scanned pages and images go to Document AI
+        result = LocalFirstExtractor(processor).process_document(
             file_path=file_path,
             mime_type=mime_type
         )
         
         # Print results
         print("\n🎉 Document Processing Results:")
-        print(f"Number of pages: {result['pages']}")
+        print(f"Number of pages: {result['pages']} ({result['local_pages']} local, {result['cloud_pages']} cloud)")
         print(f"MIME type: {result['mime_type']}")
         
         # Print summary if available (for NotesSummarizer processor)
@@ -102,7 +105,7 @@ def process_from_config(config_file):
             
         # Output JSON result for Node.js integration
         print("\nRESULT_JSON_START")
-        print(json.dumps(result))
+        print(json.dumps(result, default=json_default))
         print("RESULT_JSON_END")
         
         return result
@@ -156,15 +159,16 @@ def process_sample_document():
         print(f"Processing document: {file_path}")
         print(f"Using NotesSummarizer processor (ID: {processor_id})")
         
-        # Process the document
-        result = processor.process_document(
+        # Process the document; a text/plain file is decoded locally, with
+        # no Document AI request
+        result = LocalFirstExtractor(processor).process_document(
             file_path=file_path,
             mime_type="text/plain"  # Using text/plain for our text file
         )
         
         # Print results
         print("\n🎉 Document Processing Results:")
-        print(f"Number of pages: {result['pages']}")
+        print(f"Number of pages: {result['pages']} ({result['local_pages']} local, {result['cloud_pages']} cloud)")
         print(f"MIME type: {result['mime_type']}")
         
         # Print summary if available (for NotesSummarizer processor)
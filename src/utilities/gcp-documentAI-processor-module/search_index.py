@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Full-Text Search Index for Processed Documents
+
+This module keeps the output of process_document in a SQLite FTS5 index so
+archives of notes and handwritten work become searchable. Each document is
+keyed by its content hash (the same ID the job queue uses) and tagged with a
+course and student ID. Its text is indexed page by page, together with its
+entities and summary, so queries return BM25-ranked hits with a page number
+and a highlighted snippet.
+
+Re-indexing a document replaces its previous rows, so the index can be
+updated incrementally as results arrive. Bulk loading batches many
+documents per transaction for backfills.
+"""
+
+import re
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from common import percentile
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash    TEXT PRIMARY KEY,
+    course_id   TEXT,
+    student_id  TEXT,
+    file_path   TEXT,
+    mime_type   TEXT,
+    page_count  INTEGER,
+    summary     TEXT,
+    indexed_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_course_idx ON documents (course_id, student_id);
+CREATE TABLE IF NOT EXISTS segments (
+    id          INTEGER PRIMARY KEY,
+    doc_hash    TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    page        INTEGER,
+    label       TEXT
+);
+CREATE INDEX IF NOT EXISTS segments_doc_idx ON segments (doc_hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Segment kinds
+PAGE = "page"
+ENTITY = "entity"
+SUMMARY = "summary"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def quote_query(text: str) -> str:
+    """
+    Turn free text into a safe FTS5 query that matches all of its words.
+
+    Args:
+        text: User-entered search text
+
+    Returns:
+        FTS5 query string ('' if the text has no words)
+    """
+    return " ".join(f'"{word}"' for word in _WORD.findall(text))
+
+
+def _page_texts(result: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """Split a result's text into (page_number, text) using its page offsets."""
+    text = result.get("text") or ""
+    offsets = result.get("page_offsets")
+    if not offsets:
+        return [(1, text)] if text else []
+    return [
+        (span["page_number"], text[span["start_index"]:span["end_index"]])
+        for span in offsets
+    ]
+
+
+class SearchIndex:
+    """SQLite FTS5 index over processed documents."""
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) a search index.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def is_indexed(self, doc_hash: str) -> bool:
+        """Check whether a document is already in the index."""
+        row = self.conn.execute(
+            "SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)
+        ).fetchone()
+        return row is not None
+
+    def _delete(self, doc_hash: str):
+        self.conn.execute(
+            "DELETE FROM search_fts WHERE rowid IN "
+            "(SELECT id FROM segments WHERE doc_hash = ?)",
+            (doc_hash,)
+        )
+        self.conn.execute("DELETE FROM segments WHERE doc_hash = ?", (doc_hash,))
+        self.conn.execute("DELETE FROM documents WHERE doc_hash = ?", (doc_hash,))
+
+    def _insert(
+        self,
+        doc_hash: str,
+        result: Dict[str, Any],
+        course_id: Optional[str],
+        student_id: Optional[str],
+        file_path: Optional[str]
+    ):
+        summary = result.get("summary")
+        self.conn.execute(
+            "INSERT INTO documents (doc_hash, course_id, student_id, file_path, "
+            "mime_type, page_count, summary, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (doc_hash, course_id, student_id, file_path, result.get("mime_type"),
+             result.get("pages"), summary, time.time())
+        )
+
+        rows: List[Tuple[str, Optional[int], Optional[str], str]] = [
+            (PAGE, page, None, text) for page, text in _page_texts(result) if text.strip()
+        ]
+        for entity in result.get("entities") or ():
+            page = entity.get("page", -1)
+            rows.append((
+                ENTITY, page if page is not None and page > 0 else None,
+                entity["type"], entity["mention_text"]
+            ))
+        if summary:
+            rows.append((SUMMARY, None, None, summary))
+
+        # Segment IDs are allocated here so both tables can be filled with executemany
+        first_id = self.conn.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1 FROM segments"
+        ).fetchone()[0]
+        self.conn.executemany(
+            "INSERT INTO segments (id, doc_hash, kind, page, label) VALUES (?, ?, ?, ?, ?)",
+            [(first_id + i, doc_hash, kind, page, label)
+             for i, (kind, page, label, _) in enumerate(rows)]
+        )
+        self.conn.executemany(
+            "INSERT INTO search_fts (rowid, body) VALUES (?, ?)",
+            [(first_id + i, body) for i, (_, _, _, body) in enumerate(rows)]
+        )
+
+    def upsert(
+        self,
+        doc_hash: str,
+        result: Dict[str, Any],
+        course_id: Optional[str] = None,
+        student_id: Optional[str] = None,
+        file_path: Optional[str] = None
+    ):
+        """
+        Index a processed document, replacing any earlier version.
+
+        Args:
+            doc_hash: Content hash of the document
+            result: Result dict from DocumentAIProcessor.process_document
+            course_id: Course the document belongs to
+            student_id: Student who submitted the document
+            file_path: Original file path, for display
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(doc_hash)
+            self._insert(doc_hash, result, course_id, student_id, file_path)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def bulk_upsert(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        batch_size: int = 500
+    ) -> int:
+        """
+        Index many documents, committing once per batch.
+
+        Args:
+            documents: Dicts with doc_hash and result, and optionally
+                course_id, student_id and file_path
+            batch_size: Documents per transaction
+
+        Returns:
+            Number of documents indexed
+        """
+        count = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for doc in documents:
+                self._delete(doc["doc_hash"])
+                self._insert(
+                    doc["doc_hash"], doc["result"], doc.get("course_id"),
+                    doc.get("student_id"), doc.get("file_path")
+                )
+                count += 1
+                if count % batch_size == 0:
+                    self.conn.execute("COMMIT")
+                    self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def remove(self, doc_hash: str):
+        """Remove a document from the index."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(doc_hash)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def optimize(self):
+        """Merge FTS5 index segments; run after large backfills."""
+        self.conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+
+    def search(
+        self,
+        query: str,
+        course_id: Optional[str] = None,
+        student_id: Optional[str] = None,
+        kinds: Optional[Iterable[str]] = None,
+        limit: int = 20,
+        raw: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a BM25-ranked search.
+
+        Args:
+            query: Search text (an FTS5 query if raw is True)
+            course_id: Only return hits from this course
+            student_id: Only return hits from this student
+            kinds: Segment kinds to include ('page', 'entity', 'summary')
+            limit: Maximum number of hits
+            raw: Pass the query to FTS5 unchanged instead of quoting its words
+
+        Returns:
+            Hits ordered from best to worst, each with doc_hash, course_id,
+            student_id, file_path, kind, page, label, score and snippet
+        """
+        match = query if raw else quote_query(query)
+        if not match:
+            return []
+        sql = [
+            "SELECT s.doc_hash, d.course_id, d.student_id, d.file_path, s.kind, s.page, "
+            "s.label, bm25(search_fts) AS score, "
+            "snippet(search_fts, 0, '[', ']', '...', 12) "
+            "FROM search_fts "
+            "JOIN segments s ON s.id = search_fts.rowid "
+            "JOIN documents d ON d.doc_hash = s.doc_hash "
+            "WHERE search_fts MATCH ?"
+        ]
+        params: List[Any] = [match]
+        if course_id is not None:
+            sql.append("AND d.course_id = ?")
+            params.append(course_id)
+        if student_id is not None:
+            sql.append("AND d.student_id = ?")
+            params.append(student_id)
+        if kinds:
+            kinds = list(kinds)
+            sql.append(f"AND s.kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+        sql.append("ORDER BY score LIMIT ?")
+        params.append(limit)
+
+        columns = ("doc_hash", "course_id", "student_id", "file_path", "kind",
+                   "page", "label", "score", "snippet")
+        return [dict(zip(columns, row)) for row in self.conn.execute(" ".join(sql), params)]
+
+    def search_documents(
+        self,
+        query: str,
+        course_id: Optional[str] = None,
+        student_id: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Search and group hits by document.
+
+        Args:
+            query: Search text
+            course_id: Only return documents from this course
+            student_id: Only return documents from this student
+            limit: Maximum number of documents
+
+        Returns:
+            Documents ordered by their best hit, each with its best score,
+            matching pages and the best snippet
+        """
+        hits = self.search(query, course_id, student_id, limit=limit * 20)
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for hit in hits:
+            doc = grouped.get(hit["doc_hash"])
+            if doc is None:
+                doc = grouped[hit["doc_hash"]] = {
+                    "doc_hash": hit["doc_hash"],
+                    "course_id": hit["course_id"],
+                    "student_id": hit["student_id"],
+                    "file_path": hit["file_path"],
+                    "score": hit["score"],
+                    "snippet": hit["snippet"],
+                    "pages": [],
+                }
+            if hit["page"] is not None and hit["page"] not in doc["pages"]:
+                doc["pages"].append(hit["page"])
+        return list(grouped.values())[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        """Count indexed documents and segments."""
+        documents = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        segments = self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {"documents": documents, "segments": segments}
+
+
+def index_queue_results(
+    index: SearchIndex,
+    queue,
+    course_id: Optional[str] = None,
+    student_id: Optional[str] = None,
+    skip_indexed: bool = True
+) -> int:
+    """
+    Index completed jobs from a JobQueue, keyed by their content-hash job IDs.
+
+    Args:
+        index: Search index to write to
+        queue: job_queue.JobQueue with completed jobs
+        course_id: Course to tag the documents with
+        student_id: Student to tag the documents with
+        skip_indexed: Leave documents that are already indexed untouched
+
+    Returns:
+        Number of documents indexed
+    """
+    return index.bulk_upsert(
+        {
+            "doc_hash": job["job_id"],
+            "result": job["result"],
+            "course_id": course_id,
+            "student_id": student_id,
+            "file_path": job["file_path"],
+        }
+        for job in queue.results()
+        if not (skip_indexed and index.is_indexed(job["job_id"]))
+    )
+
+
+def _synthetic_corpus(count: int, pages: int, seed: int = 3) -> Iterable[Dict[str, Any]]:
+    """Generate synthetic processed documents for benchmarks."""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20000)]
+    for n in range(count):
+        page_texts = [" ".join(rng.choices(vocabulary, k=200)) for _ in range(pages)]
+        offsets, position = [], 0
+        for page, text in enumerate(page_texts, 1):
+            offsets.append({"page_number": page, "start_index": position,
+                            "end_index": position + len(text)})
+            position += len(text) + 1
+        yield {
+            "doc_hash": f"{n:064x}",
+            "course_id": f"course-{n % 50}",
+            "student_id": f"student-{n % 600}",
+            "result": {
+                "text": "\n".join(page_texts),
+                "pages": pages,
+                "page_offsets": offsets,
+                "entities": [{"type": "term", "mention_text": rng.choice(vocabulary), "page": 1}],
+                "mime_type": "application/pdf",
+            },
+        }
+
+
+def main():
+    """Command-line interface for the search index."""
+    parser = argparse.ArgumentParser(description="Full-text search over processed documents")
+    parser.add_argument("--db", required=True, help="Path to the index database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    queue_parser = subparsers.add_parser("index-queue", help="Index completed jobs of a job queue")
+    queue_parser.add_argument("--queue-db", required=True, help="Path to the job queue database")
+    queue_parser.add_argument("--course-id", help="Course ID to tag documents with")
+    queue_parser.add_argument("--student-id", help="Student ID to tag documents with")
+
+    search_parser = subparsers.add_parser("search", help="Search the index")
+    search_parser.add_argument("query", help="Search text")
+    search_parser.add_argument("--course-id", help="Restrict to a course")
+    search_parser.add_argument("--student-id", help="Restrict to a student")
+    search_parser.add_argument("--limit", type=int, default=10, help="Maximum hits")
+
+    bench_parser = subparsers.add_parser("benchmark", help="Backfill a synthetic corpus and time queries")
+    bench_parser.add_argument("--documents", type=int, default=100000, help="Synthetic documents")
+    bench_parser.add_argument("--pages", type=int, default=3, help="Pages per document")
+    bench_parser.add_argument("--queries", type=int, default=200, help="Queries to time")
+
+    args = parser.parse_args()
+    index = SearchIndex(args.db)
+
+    if args.command == "index-queue":
+        from job_queue import JobQueue
+
+        queue = JobQueue(args.queue_db)
+        count = index_queue_results(index, queue, args.course_id, args.student_id)
+        print(f"Indexed {count} documents")
+    elif args.command == "search":
+        for hit in index.search(args.query, args.course_id, args.student_id, limit=args.limit):
+            page = f"p.{hit['page']}" if hit["page"] is not None else hit["kind"]
+            print(f"{hit['score']:8.3f}  {hit['file_path'] or hit['doc_hash'][:12]} ({page}): "
+                  f"{hit['snippet']}")
+    elif args.command == "benchmark":
+        started = time.perf_counter()
+        count = index.bulk_upsert(_synthetic_corpus(args.documents, args.pages))
+        index.optimize()
+        elapsed = time.perf_counter() - started
+        print(f"Indexed {count} documents in {elapsed:.1f}s ({count / elapsed:.0f} docs/s)")
+
+        rng = random.Random(11)
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(f"term{rng.randrange(20000)}" for _ in range(rng.randint(1, 2)))
+            course = f"course-{rng.randrange(50)}" if rng.random() < 0.5 else None
+            started = time.perf_counter()
+            index.search(query, course_id=course, limit=10)
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"Query latency over {len(latencies)} queries: "
+              f"p50 {percentile(latencies, 0.50):.2f} ms, "
+              f"p99 {percentile(latencies, 0.99):.2f} ms")
+
+    print(f"Index: {index.stats()}")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
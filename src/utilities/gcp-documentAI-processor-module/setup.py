@@ -19,6 +19,13 @@ setup(
         "google-auth>=2.6.0",
         "google-cloud-core>=2.3.0",
         "requests>=2.27.1",
+        "numpy>=1.17.0",
     ],
+    extras_require={
+        # Local text-layer extraction for digital-born PDFs (local_extract.py)
+        "local": ["pypdf>=3.0.0"],
+        # Near-duplicate image detection (dedup.py)
+        "dedup": ["Pillow>=8.0.0"],
+    },
     python_requires=">=3.7",
 ) 
\ No newline at end of file
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Map-Reduce Summarization for Long Transcripts
+
+Live-class transcripts are often longer than the NotesSummarizer processor
+accepts and take too long as a single call. This module summarizes them
+hierarchically:
+
+1. Map: the transcript is split into sections under a token budget and each
+   section is summarized concurrently through DocumentAIProcessor.
+2. Reduce: the section summaries, in transcript order, are summarized again.
+   If they are still too long they are reduced in further rounds.
+
+Section summaries are yielded as soon as they complete, so callers can show
+partial results while the rest of the transcript is still being processed.
+
+A section the processor returns no summary for is reported as unsummarized
+and left out of the reduce step rather than passed up as raw text. A reduce
+or final call without a summary raises RuntimeError.
+"""
+
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Iterator
+
+from chunker import chunk_text, estimate_tokens
+
+
+class HierarchicalSummarizer:
+    """Summarizes long texts by summarizing sections, then their summaries."""
+
+    def __init__(
+        self,
+        processor,
+        section_tokens: int = 1500,
+        max_workers: int = 4,
+        max_rounds: int = 4
+    ):
+        """
+        Configure the summarizer.
+
+        Args:
+            processor: DocumentAIProcessor for a summarizing processor (e.g. NotesSummarizer)
+            section_tokens: Token budget for each summarized section
+            max_workers: Sections summarized concurrently
+            max_rounds: Maximum reduce rounds before the final summary
+        """
+        self.processor = processor
+        self.section_tokens = section_tokens
+        self.max_workers = max_workers
+        self.max_rounds = max_rounds
+
+    def _summarize(self, text: str) -> Optional[str]:
+        """Summarize one piece of text; None if the processor returned no summary."""
+        result = self.processor.process_content(text.encode("utf-8"), "text/plain")
+        return result.get("summary") or None
+
+    def _require(self, text: str, step: str) -> str:
+        """Summarize text that has no section to report against, raising if no summary comes back."""
+        summary = self._summarize(text)
+        if summary is None:
+            raise RuntimeError(f"processor returned no summary for the {step}")
+        return summary
+
+    def _map(self, texts: List[str]) -> Iterator[Any]:
+        """Summarize texts concurrently, yielding (index, summary or None) as each completes."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._summarize, text): index
+                for index, text in enumerate(texts)
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _split(self, text: str) -> List[Dict[str, Any]]:
+        doc_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return chunk_text(text, doc_hash, max_tokens=self.section_tokens, overlap_tokens=0)
+
+    def summarize_iter(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Summarize a long text, streaming section summaries as they complete.
+
+        Args:
+            text: Transcript or other long text
+
+        Yields:
+            {'type': 'section', 'index', 'section', 'start_index', 'end_index',
+            'summary', 'summarized'} for each section, in completion order, then
+            a single {'type': 'final', 'summary', 'sections', 'rounds',
+            'unsummarized'}. A section without a summary has summary '' and
+            summarized False, and its index is listed in 'unsummarized'.
+
+        Raises:
+            RuntimeError: If no section, reduce step or final call returns a summary
+        """
+        sections = self._split(text)
+        if len(sections) <= 1:
+            summary = self._require(text, "text") if text.strip() else ""
+            yield {"type": "final", "summary": summary, "sections": len(sections),
+                   "rounds": 0, "unsummarized": []}
+            return
+
+        summaries: List[Optional[str]] = [None] * len(sections)
+        for index, summary in self._map([section["text"] for section in sections]):
+            summaries[index] = summary
+            section = sections[index]
+            yield {
+                "type": "section",
+                "index": index,
+                "section": section["section"],
+                "start_index": section["start_index"],
+                "end_index": section["end_index"],
+                "summary": summary or "",
+                "summarized": summary is not None,
+            }
+
+        unsummarized = [index for index, summary in enumerate(summaries) if summary is None]
+        if len(unsummarized) == len(sections):
+            raise RuntimeError("processor returned no summary for any section")
+
+        # Reduce until the joined summaries fit one request
+        combined = "\n\n".join(summary for summary in summaries if summary is not None)
+        rounds = 1
+        while estimate_tokens(combined) > self.section_tokens and rounds < self.max_rounds:
+            parts = [chunk["text"] for chunk in self._split(combined)]
+            reduced: List[Optional[str]] = [None] * len(parts)
+            for index, summary in self._map(parts):
+                if summary is None:
+                    raise RuntimeError(f"processor returned no summary for reduce round {rounds}")
+                reduced[index] = summary
+            combined = "\n\n".join(reduced)
+            rounds += 1
+
+        yield {
+            "type": "final",
+            "summary": self._require(combined, "final summary"),
+            "sections": len(sections),
+            "rounds": rounds,
+            "unsummarized": unsummarized,
+        }
+
+    def summarize(self, text: str) -> Dict[str, Any]:
+        """
+        Summarize a long text.
+
+        Args:
+            text: Transcript or other long text
+
+        Returns:
+            Dict with the final summary, rounds, section summaries in text
+            order and the indexes of unsummarized sections
+
+        Raises:
+            RuntimeError: If no section, reduce step or final call returns a summary
+        """
+        sections = []
+        final: Dict[str, Any] = {}
+        for event in self.summarize_iter(text):
+            if event["type"] == "section":
+                sections.append(event)
+            else:
+                final = event
+        sections.sort(key=lambda event: event["index"])
+        return {
+            "summary": final["summary"],
+            "rounds": final["rounds"],
+            "unsummarized": final["unsummarized"],
+            "sections": [
+                {key: event[key] for key in
+                 ("index", "section", "start_index", "end_index", "summary", "summarized")}
+                for event in sections
+            ],
+        }
+
+
+def main():
+    """Command-line interface: summarize a long transcript, streaming NDJSON events."""
+    parser = argparse.ArgumentParser(
+        description="Hierarchically summarize a long transcript"
+    )
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--location", required=True, help="Processor location (e.g., 'us')")
+    parser.add_argument("--processor-id", required=True, help="Summarizer processor ID")
+    parser.add_argument("--file-path", required=True, help="Path to a UTF-8 transcript file")
+    parser.add_argument("--credentials", help="Path to service account credentials JSON")
+    parser.add_argument("--section-tokens", type=int, default=1500, help="Token budget per section")
+    parser.add_argument("--workers", type=int, default=4, help="Sections summarized concurrently")
+    args = parser.parse_args()
+
+    from document_processor import DocumentAIProcessor
+
+    processor = DocumentAIProcessor(
+        project_id=args.project_id,
+        location=args.location,
+        processor_id=args.processor_id,
+        credentials_path=args.credentials
+    )
+    with open(args.file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    summarizer = HierarchicalSummarizer(processor, args.section_tokens, args.workers)
+    for event in summarizer.summarize_iter(text):
+        print(json.dumps(event), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import json
+
+import pytest
+
+from admissions import (
+    ApplicationFormIngestor, ProgramCatalog, ProgramSchema, export_drafts, ingest, normalize_value
+)
+from job_queue import JobQueue
+
+
+class FormProcessor:
+    """Reads a form file's JSON content as its extracted form fields."""
+
+    def fetch_document(self, content, mime_type):
+        return json.loads(content)
+
+    def extract_form_fields(self, document):
+        return [
+            {"name": name, "value": value, "confidence": 0.95, "value_type": ""}
+            for name, value in document.items()
+        ]
+
+
+def catalog():
+    return ProgramCatalog(
+        [{"id": "prog-cs", "name": "Computer Science"}],
+        {"full_name": {"labels": ["name"], "type": "string"},
+         "email": {"type": "email", "required": True}},
+    )
+
+
+def write_form(directory, name, fields):
+    path = directory / name
+    path.write_text(json.dumps(fields))
+    return str(path)
+
+
+def test_resubmissions_get_their_own_application_ids(tmp_path):
+    first = write_form(tmp_path, "a.json", {"Program": "Computer Science", "Name": "Ada Lovelace",
+                                            "Email": "ada@example.org"})
+    second = write_form(tmp_path, "b.json", {"Program": "Computer Science", "Name": "Ada  Lovelace",
+                                             "Email": "ada@example.org"})
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue_many([first, second], "application/json")
+    ingest(queue, ApplicationFormIngestor(FormProcessor(), catalog()), workers=2)
+
+    output = tmp_path / "drafts.ndjson"
+    assert export_drafts(queue, str(output)) == 2
+    drafts = [json.loads(line) for line in output.read_text().splitlines()]
+    applications = [draft["application"] for draft in drafts]
+    assert applications[0]["userId"] == applications[1]["userId"]
+    assert applications[0]["id"] != applications[1]["id"]
+
+
+def test_application_id_is_stable_for_the_same_form(tmp_path):
+    path = write_form(tmp_path, "a.json", {"Program": "prog-cs", "Email": "ada@example.org"})
+    ingestor = ApplicationFormIngestor(FormProcessor(), catalog())
+    first = ingestor.process_document(path, "application/json")
+    again = ingestor.process_document(path, "application/json")
+    assert first["application"]["id"] == again["application"]["id"]
+
+
+def schema():
+    return ProgramSchema({"id": "prog-cs"}, {
+        "full_name": {"labels": ["Applicant Name"], "type": "string", "required": True},
+        "date_of_birth": {"labels": ["DOB"], "type": "date"},
+        "gpa": {"type": "number", "min": 0, "max": 4},
+    })
+
+
+def field(name, value, confidence=0.95, value_type=""):
+    return {"name": name, "value": value, "confidence": confidence, "value_type": value_type}
+
+
+def test_labels_match_keys_and_aliases_ignoring_case_and_punctuation():
+    labels = schema()
+    assert labels.field_for_label("Full name:") == "full_name"
+    assert labels.field_for_label("APPLICANT  NAME") == "full_name"
+    assert labels.field_for_label("Date of birth") == labels.field_for_label("dob:") == "date_of_birth"
+    assert labels.field_for_label("Hobbies") is None
+
+    mapped = labels.map_fields([field("Applicant name", "Ada Lovelace"), field("Hobbies", "chess")])
+    assert mapped["values"] == {"full_name": "Ada Lovelace"}
+    assert mapped["unmapped"] == ["Hobbies"]
+
+
+def test_higher_confidence_reading_of_a_repeated_label_wins():
+    mapped = schema().map_fields([
+        field("GPA", "3.1", 0.7), field("gpa:", "3.8", 0.99), field("Gpa", "2.0", 0.5),
+    ])
+    assert mapped["values"]["gpa"] == 3.8
+    assert mapped["confidence"]["gpa"] == 0.99
+
+
+@pytest.mark.parametrize("value, spec, value_type, expected", [
+    (" Ada@Example.ORG ", {"type": "email"}, "", ("ada@example.org", None)),
+    ("ada at example", {"type": "email"}, "", ("adaatexample", "invalid email")),
+    ("+44 (20) 7946-0958", {"type": "phone"}, "", ("+442079460958", None)),
+    ("12-34", {"type": "phone"}, "", ("12-34", "invalid phone number")),
+    ("10/12/1815", {"type": "date"}, "", ("1815-12-10", None)),
+    ("10/12/1815", {"type": "date", "day_first": False}, "", ("1815-10-12", None)),
+    ("next tuesday", {"type": "date"}, "", ("next tuesday", "invalid date")),
+    ("3.75", {"type": "number", "min": 0, "max": 4}, "", (3.75, None)),
+    ("1,250", {"type": "number"}, "", (1250.0, None)),
+    ("4.5", {"type": "number", "min": 0, "max": 4}, "", (4.5, "out of range")),
+    ("n/a", {"type": "number"}, "", ("n/a", "not a number")),
+    ("full time", {"type": "choice", "choices": ["Full-time", "Part-time"]}, "", ("Full-time", None)),
+    ("evenings", {"type": "choice", "choices": ["Full-time", "Part-time"]}, "", ("evenings", "not an allowed choice")),
+    ("", {"type": "checkbox"}, "filled_checkbox", (True, None)),
+    ("", {"type": "checkbox"}, "unfilled_checkbox", (False, None)),
+    ("Yes", {"type": "checkbox"}, "", (True, None)),
+    ("   ", {"type": "string"}, "", (None, "missing")),
+])
+def test_normalize_value(value, spec, value_type, expected):
+    assert normalize_value(value, spec, value_type) == expected
+
+
+def test_issues_separate_invalid_missing_and_low_confidence_fields():
+    mapped = schema().map_fields([field("DOB", "31/02/2001"), field("GPA", "3.2", 0.6)], min_confidence=0.8)
+    assert {issue["field"]: issue["problem"] for issue in mapped["issues"]} == {
+        "full_name": "missing", "date_of_birth": "invalid date", "gpa": "low confidence",
+    }
+
+
+def test_ingest_reports_counts_per_batch_and_for_the_run(tmp_path):
+    forms = [
+        {"Program": "Computer Science", "Name": "Ada Lovelace", "Email": "ada@example.org"},
+        {"Program": "Computer Science", "Name": "Alan Turing", "Email": "not an email"},
+        {"Program": "Computer Science", "Name": "Grace Hopper", "Email": "grace@example.org"},
+        {"Program": "Astrology", "Name": "Nobody", "Email": "nobody@example.org"},
+        {"Program": "Computer Science", "Name": "Edsger Dijkstra"},
+    ]
+    paths = [write_form(tmp_path, f"{i}.json", form) for i, form in enumerate(forms)]
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue_many(paths, "application/json")
+    ingestor = ApplicationFormIngestor(LowConfidenceNames(), catalog(), min_confidence=0.8)
+    seen = []
+    report = ingest(queue, ingestor, workers=1, batch_size=2, on_batch=seen.append)
+
+    assert report["processed"] == 5
+    assert [batch["processed"] for batch in report["batches"]] == [2, 2, 1]
+    assert seen == report["batches"]
+    # Grace's name is read with low confidence; Alan's email is invalid and
+    # Edsger's is missing; the Astrology form names no known program
+    assert (report["low_confidence_fields"], report["invalid_fields"], report["unknown_program"]) == (1, 2, 1)
+    assert report["forms_needing_review"] == 3
+    for name in ("processed", "low_confidence_fields", "invalid_fields", "forms_needing_review", "unknown_program"):
+        assert sum(batch[name] for batch in report["batches"]) == report[name]
+    assert report["queue"]["done"] == 5
+
+
+class LowConfidenceNames(FormProcessor):
+    """Reads Grace Hopper's name with low confidence."""
+
+    def extract_form_fields(self, document):
+        fields = super().extract_form_fields(document)
+        for form_field in fields:
+            if form_field["value"] == "Grace Hopper":
+                form_field["confidence"] = 0.5
+        return fields
@@ -0,0 +1,93 @@
+import json
+import re
+import time
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from answer_sheets import AnswerSheetPipeline, AnswerSheetTemplate
+from document_processor import DocumentAIProcessor, EchoClient
+from pdf_pages import synthetic_pdf
+
+
+class StudentProcessor(DocumentAIProcessor):
+    """Echo processor whose sheets name a student by their first page."""
+
+    def __init__(self, students):
+        super().__init__("test", "us", "echo", client=EchoClient(words_per_page=5))
+        self.students = students
+
+    def extract_form_fields(self, document):
+        first_page = int(re.match(r"Page (\d+)", document.text).group(1))
+        # The first sheet finishes last, so completion order differs from sheet order
+        if first_page == 1:
+            time.sleep(0.2)
+        return [
+            {"name": "Student ID", "value": self.students[first_page], "confidence": 0.9},
+            {"name": "Question 1", "value": f"answer {first_page}", "confidence": 0.8},
+        ]
+
+
+def class_pdf(tmp_path, pages):
+    path = tmp_path / "class.pdf"
+    path.write_bytes(synthetic_pdf(pages))
+    return str(path)
+
+
+def pipeline_for(processor, pages_per_sheet=2):
+    template = AnswerSheetTemplate(["q1"], pages_per_sheet=pages_per_sheet)
+    return AnswerSheetPipeline(processor, {"id": "exam-1"}, template, workers=2)
+
+
+def test_each_sheet_uploads_only_its_pages(tmp_path):
+    processor = StudentProcessor({1: "s1", 3: "s2", 5: "s3"})
+    results = list(pipeline_for(processor).run([class_pdf(tmp_path, 6)]))
+
+    assert sorted(processor.client.uploaded_pages) == [[1, 2], [3, 4], [5, 6]]
+    by_user = {result["submission"]["userId"]: result for result in results}
+    assert sorted(by_user) == ["s1", "s2", "s3"]
+    assert by_user["s2"]["source"]["pages"] == [3, 4]
+    assert by_user["s2"]["submission"]["answers"] == {"q1": "answer 3"}
+
+
+def test_duplicate_user_ids_are_flagged_without_output_dir(tmp_path):
+    processor = StudentProcessor({1: "s1", 3: "s1", 5: "s2"})
+    results = list(pipeline_for(processor).run([class_pdf(tmp_path, 6)]))
+
+    flagged = [result for result in results if result.get("duplicate_user_id")]
+    assert len(flagged) == 1
+    assert flagged[0]["submission"]["userId"] == "s1"
+
+
+def test_first_sheet_per_student_is_written(tmp_path):
+    processor = StudentProcessor({1: "s1", 3: "s1", 5: "s2"})
+    output_dir = tmp_path / "out"
+    pipeline = pipeline_for(processor)
+    results = list(pipeline.run([class_pdf(tmp_path, 6)], str(output_dir)))
+
+    assert sorted(path.name for path in output_dir.iterdir()) == ["s1.json", "s2.json"]
+    kept = next(
+        result for result in results
+        if result["submission"]["userId"] == "s1" and not result.get("duplicate_user_id")
+    )
+    written = json.loads((output_dir / "s1.json").read_text())
+    assert written["answers"] == kept["submission"]["answers"] == {"q1": "answer 1"}
+    assert kept["source"]["pages"] == [1, 2]
+    # Results come back in sheet order however the workers finish
+    assert [result["source"]["pages"] for result in results] == [[1, 2], [3, 4], [5, 6]]
+    assert [bool(result.get("duplicate_user_id")) for result in results] == [False, True, False]
+    assert sorted(processor.client.uploaded_pages) == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_winner_is_the_same_on_every_run(tmp_path):
+    path = class_pdf(tmp_path, 8)
+    for batch_size in (1, 2, 3):
+        processor = StudentProcessor({1: "s1", 3: "s2", 5: "s1", 7: "s2"})
+        template = AnswerSheetTemplate(["q1"], pages_per_sheet=2)
+        pipeline = AnswerSheetPipeline(processor, {"id": "exam-1"}, template, workers=4, batch_size=batch_size)
+        results = list(pipeline.run([path], str(tmp_path / f"out{batch_size}")))
+
+        flagged = [result["source"]["pages"] for result in results if result.get("duplicate_user_id")]
+        assert flagged == [[5, 6], [7, 8]]
+        assert json.loads((tmp_path / f"out{batch_size}" / "s2.json").read_text())["answers"] == {"q1": "answer 3"}
@@ -0,0 +1,117 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from attendance import RegisterReader, Roster, header_date
+from common import normalize_name, parse_date
+from table_extract import ExtractedTable
+
+SEMESTER = date(2027, 9, 1)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("02/09", date(2027, 9, 2)),
+    ("Mon 2.9", date(2027, 9, 2)),
+    ("25/08", date(2027, 8, 25)),
+    ("15/01", date(2028, 1, 15)),
+    ("29/02", date(2028, 2, 29)),
+    ("2027-09-02", date(2027, 9, 2)),
+    ("29/02/27", None),
+    ("31/04", None),
+    ("Name", None),
+    ("", None),
+])
+def test_header_date(text, expected):
+    assert header_date(text, SEMESTER) == expected
+
+
+def test_header_date_month_first():
+    assert header_date("09/02", SEMESTER, day_first=False) == date(2027, 9, 2)
+
+
+def test_shared_helpers():
+    assert parse_date("03/04/2007") == "2007-04-03"
+    assert parse_date("03/04/2007", day_first=False) == "2007-03-04"
+    assert parse_date("3 April, 2007") == "2007-04-03"
+    assert parse_date("soon") is None
+    assert normalize_name("Zoë Saint-Clair") == ["zoe", "saint", "clair"]
+
+
+STUDENTS = [
+    {"userId": "u-ada", "name": "Ada Lovelace", "studentNumber": "S1042", "courseId": "math"},
+    {"userId": "u-maria", "name": "Maria Garcia", "courseId": "math"},
+    {"userId": "u-alan", "name": "Alan Turing", "courseId": "math"},
+    {"userId": "u-ana", "name": "Ana Silva", "courseId": "math"},
+    {"userId": "u-ann", "name": "Ann Silva", "courseId": "math"},
+    {"userId": "u-sam1", "name": "Sam Lee", "courseId": "math"},
+    {"userId": "u-sam2", "name": "Sam Lee", "courseId": "math"},
+    {"userId": "u-grace", "name": "Grace Hopper", "studentNumber": "S7", "courseId": "physics"},
+    {"userId": "u-any", "name": "Edsger Dijkstra", "studentNumber": "S9"},
+]
+
+
+@pytest.mark.parametrize("name, number, expected", [
+    ("", "s1042", "u-ada"),
+    ("Somebody Else", "S9", "u-any"),
+    ("", "S7", None),
+    ("Lovelace, Ada", "", "u-ada"),
+    ("Maria Garcla", "", "u-maria"),
+    ("Alan Turnig", "", "u-alan"),
+    ("Turing Alam", "", "u-alan"),
+    ("rAda Lovelace", "", "u-ada"),
+    ("Edsger Dijkstr", "", "u-any"),
+    ("Sam Lee", "", None),
+    ("Anna Silva", "", None),
+    ("Grace Hopper", "", None),
+    ("Ada", "", None),
+])
+def test_roster_find(name, number, expected):
+    assert Roster(STUDENTS).find("math", name, number) == expected
+
+
+def register_table(rows, header=None, pages=(1,)):
+    width = len(rows[0])
+    return ExtractedTable(
+        header or [f"column {i + 1}" for i in range(width)],
+        np.array(rows, dtype=object).reshape(len(rows), width),
+        list(pages),
+        has_header=header is not None,
+    )
+
+
+def test_register_rows_with_a_headerless_continuation_table():
+    reader = RegisterReader(None, Roster(STUDENTS), SEMESTER)
+    tables = [
+        register_table([["Ada Lovelace", "P", "A"], ["Maria Garcla", "/", "L"]], ["Name", "02/09", "Tue 3/9"]),
+        # Next page: the table goes on without repeating its header
+        register_table([["Alan Turnig", "e", ""], ["Nobody Known", "P", "P"], ["Ana Silva", "?", "P"]], pages=(2,)),
+        register_table([["Notes", "see office"]], pages=(3,)),
+    ]
+    result = reader.read(tables, "math", "week1.pdf")
+
+    statuses = {(row["userId"], row["date"]): row["status"] for row in result["rows"]}
+    assert statuses == {
+        ("u-ada", "2027-09-02"): "PRESENT", ("u-ada", "2027-09-03"): "ABSENT",
+        ("u-maria", "2027-09-02"): "PRESENT", ("u-maria", "2027-09-03"): "LATE",
+        ("u-alan", "2027-09-02"): "EXCUSED",
+        ("u-ana", "2027-09-03"): "PRESENT",
+    }
+    notes = {row["userId"]: row["notes"] for row in result["rows"]}
+    assert notes["u-ada"] == "Paper register week1.pdf p1" and notes["u-alan"] == "Paper register week1.pdf p2"
+    assert result["issues"] == [
+        "week1.pdf p2: no roster match for 'Nobody Known'",
+        "week1.pdf p2: unknown mark '?' for 'Ana Silva' on 2027-09-02",
+        "week1.pdf p3: table without date columns skipped",
+    ]
+    assert reader.counts == {"rows": 6, "unmatched_students": 1, "unknown_marks": 1, "blank_cells": 1}
+
+
+def test_header_read_as_first_body_row_and_rescans_update_rows():
+    reader = RegisterReader(None, Roster(STUDENTS), SEMESTER, blank_status="ABSENT")
+    table = register_table([["Student No", "Name", "02/09"], ["S1042", "", ""]])
+    first = reader.read([table], "math", "a.pdf")["rows"]
+    again = reader.read([table], "math", "b.pdf")["rows"]
+
+    assert [(row["userId"], row["status"]) for row in first] == [("u-ada", "ABSENT")]
+    assert first[0]["id"] == again[0]["id"]
@@ -0,0 +1,103 @@
+import pytest
+
+from chunker import ChunkCache, chunk_text, estimate_tokens, split_sections
+
+
+def headings(text):
+    return [heading for heading, _, _ in split_sections(text)]
+
+
+def test_sections_split_at_heading_lines():
+    text = (
+        "Preface text.\n"
+        "# Overview\n"
+        "Cells are small.\n"
+        "CHAPTER ONE\n"
+        "Plants grow.\n"
+        "Chapter 2: Photosynthesis\n"
+        "Light is absorbed.\n"
+        "Topic: Cell Division\n"
+        "Cells split.\n"
+    )
+    sections = split_sections(text)
+
+    assert headings(text) == ["", "# Overview", "CHAPTER ONE", "Chapter 2: Photosynthesis", "Topic: Cell Division"]
+    assert sections[0][1] == 0 and sections[-1][2] == len(text)
+    assert all(previous[2] == current[1] for previous, current in zip(sections, sections[1:]))
+
+
+@pytest.mark.parametrize("line, next_line", [
+    ("Module 3 covers the cell wall and", "the membrane around it."),
+    ("Topic sentences should lead each", "paragraph of the essay."),
+    ("Chapter 4 is where the reactions of the light stage are described in", "Detail."),
+    ("Unit 2", "continues from the last lesson."),
+])
+def test_keyword_prose_is_not_a_heading(line, next_line):
+    text = f"# Notes\nSome text.\n{line}\n{next_line}\nMore text.\n"
+    assert headings(text) == ["# Notes"]
+
+
+def test_numbered_keyword_headings_are_split():
+    text = "Intro.\nLecture 12 - Enzymes\nEnzymes speed reactions.\nUnit IV\nRespiration releases energy.\n"
+    assert headings(text) == ["", "Lecture 12 - Enzymes", "Unit IV"]
+
+
+def test_chunks_fit_the_budget_and_overlap():
+    sentences = [f"Sentence {i} talks about cell number {i} in detail." for i in range(60)]
+    text = "Chapter 1\n" + " ".join(sentences) + "\n"
+    chunks = chunk_text(text, "doc", max_tokens=60, overlap_tokens=20)
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert chunk["tokens"] <= 60
+        assert chunk["text"] == text[chunk["start_index"]:chunk["end_index"]]
+        assert chunk["section"] == "Chapter 1"
+    for previous, current in zip(chunks, chunks[1:]):
+        # Each chunk starts inside the previous one and moves forward
+        assert previous["start_index"] < current["start_index"] < previous["end_index"]
+        overlap = text[current["start_index"]:previous["end_index"]]
+        assert 0 < estimate_tokens(overlap) <= 20
+    assert chunks[-1]["end_index"] == len(text) - 1
+
+
+def test_chunks_do_not_cross_sections():
+    text = "Chapter 1\nAlpha beta.\nChapter 2\nGamma delta.\n"
+    chunks = chunk_text(text, "doc", max_tokens=100, overlap_tokens=10)
+
+    assert [(chunk["section"], chunk["text"].strip()) for chunk in chunks] == [
+        ("Chapter 1", "Chapter 1\nAlpha beta."), ("Chapter 2", "Chapter 2\nGamma delta."),
+    ]
+
+
+def test_overlong_sentence_is_cut_at_words():
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = chunk_text(text, "doc", max_tokens=30, overlap_tokens=0)
+
+    assert all(chunk["tokens"] <= 30 for chunk in chunks)
+    assert " ".join(chunk["text"].strip() for chunk in chunks) == text
+
+
+def test_chunk_ids_are_stable_and_depend_on_the_document():
+    text = "Chapter 1\nCells are small. They divide."
+    first = chunk_text(text, "doc-a", max_tokens=10, overlap_tokens=2)
+
+    assert [chunk["chunk_id"] for chunk in first] == \
+        [chunk["chunk_id"] for chunk in chunk_text(text, "doc-a", max_tokens=10, overlap_tokens=2)]
+    assert first[0]["chunk_id"] != chunk_text(text, "doc-b", max_tokens=10, overlap_tokens=2)[0]["chunk_id"]
+
+
+def test_overlap_must_be_smaller_than_budget():
+    with pytest.raises(ValueError):
+        chunk_text("text", "doc", max_tokens=10, overlap_tokens=10)
+
+
+def test_chunk_cache_round_trip(tmp_path):
+    cache = ChunkCache(str(tmp_path / "cache"))
+    chunks = chunk_text("Chapter 1\nCells are small.", "doc", max_tokens=50, overlap_tokens=5)
+
+    assert cache.get("doc", 50, 5) is None
+    cache.put("doc", 50, 5, chunks)
+    assert cache.get("doc", 50, 5) == chunks
+    # Different settings are cached separately
+    assert cache.get("doc", 60, 5) is None
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["doc-50-5.json"]
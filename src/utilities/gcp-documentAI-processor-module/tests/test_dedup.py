@@ -0,0 +1,49 @@
+import pytest
+
+import dedup
+import job_queue
+from dedup import enqueue_deduplicated
+from job_queue import JobQueue
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    yield queue
+    queue.close()
+
+
+def gradient(path, shift=0):
+    image = Image.new("L", (64, 64))
+    image.putdata([min(255, (x * 4 + y + shift) % 256) for y in range(64) for x in range(64)])
+    image.save(path)
+    return str(path)
+
+
+def test_exact_and_near_duplicates_are_linked(queue, tmp_path):
+    original = gradient(tmp_path / "a.png")
+    copy = tmp_path / "copy.png"
+    copy.write_bytes((tmp_path / "a.png").read_bytes())
+    near = gradient(tmp_path / "b.png", shift=1)
+
+    report = enqueue_deduplicated(queue, [original, str(copy), near], "image/png")
+    assert report["enqueued"] == 1
+    assert report["exact_duplicates"] == 1
+    assert report["near_duplicates"] == 1
+
+
+def test_each_file_is_hashed_once(queue, tmp_path, monkeypatch):
+    calls = []
+    original = job_queue.content_job_id
+
+    def counting(path, mime_type):
+        calls.append(path)
+        return original(path, mime_type)
+
+    monkeypatch.setattr(dedup, "content_job_id", counting)
+    monkeypatch.setattr(job_queue, "content_job_id", counting)
+    paths = [gradient(tmp_path / f"{i}.png", shift=40 * i) for i in range(3)]
+    enqueue_deduplicated(queue, paths, "image/png", max_distance=0)
+    assert sorted(calls) == sorted(paths)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+import document_processor
+from document_processor import DocumentAIProcessor, EchoClient, benchmark_page_windows
+from pdf_pages import synthetic_pdf
+
+
+@pytest.fixture
+def processor():
+    return DocumentAIProcessor("test", "us", "echo", client=EchoClient(words_per_page=5))
+
+
+def test_fetch_document_uploads_only_requested_pages(processor):
+    content = synthetic_pdf(12)
+    document = processor.fetch_document(content, pages=[4, 9])
+    assert processor.client.uploaded_pages == [[4, 9]]
+    assert processor.client.uploaded_bytes < len(content) / 3
+    assert [page.page_number for page in document.pages] == [4, 9]
+    assert document.text.startswith("Page 4 ")
+
+
+def test_without_pypdf_whole_file_is_sent_with_page_selector(processor, monkeypatch):
+    monkeypatch.setattr(document_processor, "open_pdf_pages", lambda content, mime_type: None)
+    document = processor.fetch_document(synthetic_pdf(6), pages=[2, 5])
+    assert processor.client.uploaded_pages == [list(range(1, 7))]
+    assert [page.page_number for page in document.pages] == [2, 5]
+
+
+def test_page_windows_upload_each_page_once(processor, tmp_path):
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(synthetic_pdf(23))
+    pages = list(processor.process_document_pages(str(path), window_size=10))
+    assert [page["page_number"] for page in pages] == list(range(1, 24))
+    assert processor.client.uploaded_pages == [
+        list(range(1, 11)), list(range(11, 21)), list(range(21, 24))
+    ]
+    assert pages[12]["text"].startswith("Page 13 ")
+
+
+def test_benchmark_reports_both_modes():
+    results = benchmark_page_windows(page_count=20, window_size=5)
+    assert [r["mode"] for r in results] == ["whole document", "page windows"]
+    assert [r["requests"] for r in results] == [1, 4]
+    assert all(r["peak_bytes"] > 0 for r in results)
+    assert results[1]["peak_bytes"] < results[0]["peak_bytes"]
+
+
+def test_page_window_peak_stays_flat_as_page_count_doubles():
+    def peak(page_count):
+        result, = benchmark_page_windows(page_count, window_size=10, modes=["page windows"])
+        return result["peak_bytes"]
+
+    small, large = peak(100), peak(200)
+    # Only the cross-reference table and one reference per page grow with the
+    # file; whole-document processing roughly doubles (see the test above)
+    assert large < 1.4 * small
+    assert large - small < 1000 * 100
+
+
+def test_entities_are_plain_dicts_unless_compact_requested(processor, tmp_path):
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(synthetic_pdf(2))
+    result = processor.process_document(str(path))
+    assert isinstance(result["entities"], list)
+    json.dumps(result)
+    result["entities"].append({"type": "note", "mention_text": "added", "confidence": 1.0})
+    compact = processor.process_document(str(path), compact_entities=True)
+    assert compact["entities"] == []
+    assert not isinstance(compact["entities"], list)
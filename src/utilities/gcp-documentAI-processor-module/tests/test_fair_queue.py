@@ -0,0 +1,60 @@
+from collections import Counter
+
+import pytest
+
+from fair_queue import FairQueue, simulate
+
+
+def dispatched(queue, count):
+    tickets = [queue.get(block=False) for _ in range(count)]
+    return Counter(ticket.tenant_id for ticket in tickets if ticket is not None)
+
+
+def test_backlogged_tenants_share_by_weight():
+    queue = FairQueue()
+    queue.configure_tenant("bulk", weight=1.0)
+    queue.configure_tenant("interactive", weight=3.0)
+    for i in range(200):
+        queue.put("bulk", i)
+        queue.put("interactive", i)
+    assert dispatched(queue, 80) == {"interactive": 60, "bulk": 20}
+
+
+def test_costly_requests_use_up_more_credit():
+    queue = FairQueue()
+    for i in range(50):
+        queue.put("big", i, cost=4.0)
+        queue.put("small", i, cost=1.0)
+    shares = dispatched(queue, 50)
+    assert shares["small"] == pytest.approx(4 * shares["big"], abs=4)
+
+
+def test_concurrency_cap_holds_until_task_done():
+    queue = FairQueue()
+    queue.configure_tenant("capped", max_concurrency=2)
+    for i in range(5):
+        queue.put("capped", i)
+    first, second = queue.get(block=False), queue.get(block=False)
+    assert queue.get(block=False) is None
+    queue.put("other", "x")
+    assert queue.get(block=False).tenant_id == "other"
+
+    queue.task_done(first)
+    assert queue.get(block=False).tenant_id == "capped"
+    assert queue.metrics()["capped"]["in_flight"] == 2
+    assert queue.depth("capped") == 2
+    queue.task_done(second)
+
+
+def test_noisy_tenant_does_not_raise_quiet_p99():
+    quiet = {f"school-{i}": {"rate": 0.5, "service": 1.0} for i in range(5)}
+    noisy = dict(quiet, **{"noisy-school": {"burst": 3000, "service": 1.0}})
+    alone = simulate(quiet, workers=8, duration=300)
+    loaded = simulate(noisy, workers=8, duration=300)
+
+    assert loaded["noisy-school"]["completed"] == 3000
+    worst_alone = max(alone[tenant]["latency_p99"] for tenant in quiet)
+    worst_loaded = max(loaded[tenant]["latency_p99"] for tenant in quiet)
+    # Without fair queueing the quiet tenants would wait behind the whole burst
+    assert worst_loaded <= 1.5 * worst_alone
+    assert loaded["noisy-school"]["latency_p99"] > 50 * worst_loaded
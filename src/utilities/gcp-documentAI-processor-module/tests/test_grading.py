@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pytest
+
+from grading import (
+    Grader, bounded_edit_distances, normalize_answer, option_index, similarity_to_key, synthetic_exam
+)
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_edit_distances_match_reference():
+    rng = random.Random(3)
+    key = "photosynthesis"
+    answers = ["".join(rng.choice("aehinopsty ") for _ in range(rng.randint(0, 20))) for _ in range(300)]
+    answers += ["", key, "photosynthesys", "photo synthesis", "ésis"]
+    expected = np.array([levenshtein(key, answer) for answer in answers])
+
+    assert (bounded_edit_distances(key, answers, 100) == expected).all()
+    capped = bounded_edit_distances(key, answers, 3)
+    assert (capped == np.minimum(expected, 4)).all()
+
+
+def test_edit_distances_stop_early_when_all_answers_are_far():
+    assert bounded_edit_distances("mitochondria", ["xyz", "qqqqqqq"], 2).tolist() == [3, 3]
+    assert bounded_edit_distances("key", [], 2).tolist() == []
+
+
+def test_similarity_of_blank_answers_is_zero():
+    assert similarity_to_key("osmosis", ["", "osmosis"]).tolist() == [0.0, 1.0]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("B", 1), ("(b)", 1), ("c.", 2), ("Option 4", 3), ("2", 1),
+    ("Gravity", 1), ("gravty", 1), ("", -1), ("e", -1), ("something else", -1),
+])
+def test_option_index(text, expected):
+    assert option_index(text, ["Newton", "Gravity", "Enzyme", "Oxygen"]) == expected
+
+
+def test_numeric_options_match_option_text_before_position():
+    options = ["3", "4", "5", "6"]
+    assert [option_index(answer, options) for answer in ["4", "B", "6", "D", "(c)", "Option 2", "7"]] == \
+        [1, 1, 3, 3, 2, 1, -1]
+
+    question = {"id": "q", "options": options, "answer": "4", "points": 1}
+    graded = Grader([question]).grade([{"answers": {"q": answer}} for answer in ["4", "b", "3", "6"]])
+    assert graded["credit"][:, 0].tolist() == [1.0, 1.0, 0.0, 0.0]
+
+
+def test_grade_weights_mcq_and_short_answer_credit():
+    questions = [
+        {"id": "q1", "options": ["red", "green", "blue"], "answer": "b", "points": 1},
+        {"id": "q2", "answer": "Mitochondria", "points": 2},
+    ]
+    submissions = [
+        {"id": "s1", "userId": "u1", "answers": {"q1": "(B)", "q2": "mitochondria."}},
+        {"id": "s2", "userId": "u2", "answers": {"q1": "red", "q2": "mitochondrla"}},
+        {"id": "s3", "userId": "u3", "answers": {"q2": "ribosome"}},
+    ]
+    graded = Grader(questions).grade_submissions(submissions)
+
+    assert [submission["score"] for submission in graded] == [3.0, 2.0, 0.0]
+    assert graded[1]["partialCredit"] == {"q1": 0.0, "q2": 2.0}
+    assert "score" not in submissions[0]
+
+
+def test_partial_credit_is_linear_between_thresholds():
+    grader = Grader([{"id": "q", "answer": "abcdefghij", "points": 1}], full_credit=0.9, partial_credit=0.5)
+    graded = grader.grade([{"answers": {"q": "abcdefgxyz"}}])
+    # similarity 0.7 sits halfway between 0.5 and 0.9
+    assert graded["credit"][0, 0] == pytest.approx(0.5)
+
+
+def test_grade_matches_per_answer_reference():
+    questions, submissions = synthetic_exam(200, 8)
+    grader = Grader(questions)
+    graded = grader.grade(submissions)
+
+    for row, submission in enumerate(submissions):
+        for column, question in enumerate(questions):
+            answer = submission["answers"][question["id"]]
+            if question.get("options"):
+                expected = float(option_index(answer, question["options"]) == grader.keys[column])
+            else:
+                key, text = grader.keys[column], normalize_answer(answer)
+                similarity = 1 - levenshtein(key, text) / max(len(key), len(text), 1)
+                expected = min(1.0, max(0.0, (similarity - 0.7) / 0.2))
+            assert graded["credit"][row, column] == pytest.approx(expected)
+
+
+def test_invalid_thresholds_are_rejected():
+    with pytest.raises(ValueError):
+        Grader([], full_credit=0.6, partial_credit=0.8)
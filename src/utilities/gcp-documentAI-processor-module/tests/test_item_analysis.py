@@ -0,0 +1,117 @@
+import json
+from math import sqrt
+
+import numpy as np
+import pytest
+
+from grading import Grader, synthetic_exam
+from item_analysis import ItemAnalysis
+
+# Five students, three 1-point items; totals are [3, 2, 1, 1, 0]
+CREDIT = np.array([
+    [1, 1, 1],
+    [1, 1, 0],
+    [1, 0, 0],
+    [0, 1, 0],
+    [0, 0, 0],
+], dtype=float)
+QUESTIONS = [{"id": f"q{i}", "points": 1} for i in range(1, 4)]
+
+
+def no_choices(credit):
+    return np.full(credit.shape, -1)
+
+
+def test_metrics_match_hand_computed_values():
+    analysis = ItemAnalysis(QUESTIONS)
+    analysis.add(CREDIT, no_choices(CREDIT))
+    metrics = analysis.metrics()
+
+    # Population variances: items 0.24, 0.24, 0.16; totals 1.04
+    assert metrics["difficulty"].tolist() == pytest.approx([0.6, 0.6, 0.2])
+    assert metrics["variance"].tolist() == pytest.approx([0.24, 0.24, 0.16])
+    assert metrics["mean_score"] == pytest.approx(1.4)
+    assert metrics["score_sd"] == pytest.approx(sqrt(1.04))
+    # cov(X, T) is 0.36, 0.36 and 0.32
+    assert metrics["discrimination"].tolist() == pytest.approx([
+        0.36 / sqrt(0.24 * 1.04), 0.36 / sqrt(0.24 * 1.04), 0.32 / sqrt(0.16 * 1.04),
+    ])
+    # Against the rest score T - X: cov 0.12, 0.12, 0.16; rest variance 0.56 each
+    assert metrics["corrected_discrimination"].tolist() == pytest.approx([
+        0.12 / sqrt(0.24 * 0.56), 0.12 / sqrt(0.24 * 0.56), 0.16 / sqrt(0.16 * 0.56),
+    ])
+    # KR-20 = k / (k - 1) * (1 - sum(pq) / var(T))
+    assert metrics["reliability"] == pytest.approx(3 / 2 * (1 - 0.64 / 1.04))
+
+
+def test_partial_credit_is_weighted_by_points():
+    questions = [{"id": "a", "points": 2}, {"id": "b", "points": 1}]
+    analysis = ItemAnalysis(questions)
+    credit = np.array([[1.0, 0.5], [0.5, 1.0], [0.0, 0.0]])
+    analysis.add(credit, no_choices(credit))
+    metrics = analysis.metrics()
+
+    assert metrics["difficulty"].tolist() == pytest.approx([0.5, 0.5])
+    assert metrics["mean_score"] == pytest.approx((2.5 + 2.0 + 0.0) / 3)
+
+
+def assert_same_results(left, right):
+    for name, value in left.metrics().items():
+        assert np.allclose(value, right.metrics()[name], equal_nan=True), name
+    assert left.items() == right.items()
+    assert left.students == right.students
+
+
+def test_incremental_adds_match_one_batch():
+    questions, submissions = synthetic_exam(300, 12, seed=5)
+    grader = Grader(questions)
+    graded = grader.grade(submissions)
+    ids = [submission["id"] for submission in submissions]
+
+    batch = ItemAnalysis(questions)
+    batch.add(graded["credit"], graded["choices"], ids)
+
+    incremental = ItemAnalysis(questions)
+    for start, end in [(0, 10), (10, 150), (150, 300)]:
+        incremental.add(graded["credit"][start:end], graded["choices"][start:end], ids[start:end])
+    assert_same_results(batch, incremental)
+
+    # Saving and restoring the sums between runs, then adding late submissions
+    saved = ItemAnalysis(questions)
+    saved.add(graded["credit"][:200], graded["choices"][:200], ids[:200])
+    restored = ItemAnalysis.from_state(questions, json.loads(json.dumps(saved.to_state())))
+    restored.add(graded["credit"][200:], graded["choices"][200:], ids[200:])
+    assert_same_results(batch, restored)
+
+
+def test_already_counted_submissions_are_skipped():
+    questions, submissions = synthetic_exam(50, 5, seed=2)
+    grader = Grader(questions)
+    analysis = ItemAnalysis(questions)
+
+    assert analysis.add_submissions(grader, submissions[:30]) == 30
+    assert analysis.add_submissions(grader, submissions) == 20
+    assert analysis.add_submissions(grader, submissions) == 0
+
+    once = ItemAnalysis(questions)
+    once.add_submissions(grader, submissions)
+    assert_same_results(once, analysis)
+
+
+def test_distractor_table_uses_option_text_for_numeric_options():
+    questions = [{"id": "q", "options": ["3", "4", "5", "6"], "answer": "4", "points": 1}]
+    submissions = [{"id": str(i), "answers": {"q": answer}} for i, answer in enumerate(["4", "B", "6", "D", ""])]
+    analysis = ItemAnalysis(questions)
+    analysis.add_submissions(Grader(questions), submissions)
+    rows = analysis.items()[0]["distractors"]
+
+    assert [row["count"] for row in rows] == [0, 2, 0, 2, 1]
+    assert [row["isKey"] for row in rows] == [False, True, False, False, False]
+    assert rows[1]["meanScore"] == 1.0 and rows[3]["meanScore"] == 0.0
+    assert "distractor_outscores_key" not in analysis.items()[0]["flags"]
+
+
+def test_state_for_other_questions_is_rejected():
+    state = ItemAnalysis(QUESTIONS).to_state()
+    with pytest.raises(ValueError):
+        ItemAnalysis.from_state(QUESTIONS[:2], state)
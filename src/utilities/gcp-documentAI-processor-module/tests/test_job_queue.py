@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from job_queue import (
+    JobQueue, DONE, DEAD, LEASED, INTERACTIVE, BACKFILL, _EDF_ORDER,
+    benchmark_workers, run_worker, SleepingProcessor,
+)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"), lease_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def make_files(tmp_path, count):
+    paths = []
+    for index in range(count):
+        path = tmp_path / f"doc{index}.txt"
+        path.write_text(f"document {index}")
+        paths.append(str(path))
+    return paths
+
+
+def test_enqueue_is_idempotent(queue, tmp_path):
+    paths = make_files(tmp_path, 3)
+    first = queue.enqueue_many(paths, "text/plain")
+    second = queue.enqueue_many(paths, "text/plain")
+    assert first == second
+    assert queue.stats()["queued"] == 3
+
+
+def test_lease_order_follows_priority_then_deadline(queue, tmp_path):
+    backfill, late, early, urgent = make_files(tmp_path, 4)
+    queue.enqueue(backfill, "text/plain", priority=BACKFILL)
+    queue.enqueue(late, "text/plain", deadline=time.time() + 3600)
+    queue.enqueue(early, "text/plain", deadline=time.time() + 60)
+    queue.enqueue(urgent, "text/plain", priority=INTERACTIVE)
+
+    order = [queue.lease("w").file_path for _ in range(4)]
+    assert [path.rsplit("/", 1)[-1] for path in order] == ["doc3.txt", "doc2.txt", "doc1.txt", "doc0.txt"]
+    assert queue.lease("w") is None
+
+
+def test_expired_lease_is_released_in_edf_order(queue, tmp_path):
+    urgent, standard = make_files(tmp_path, 2)
+    queue.enqueue(standard, "text/plain")
+    queue.enqueue(urgent, "text/plain", priority=INTERACTIVE)
+    job = queue.lease("w1", lease_seconds=-1)  # expires immediately
+    assert job.file_path.endswith("doc0.txt")
+
+    # The expired interactive job beats the still-queued standard job
+    again = queue.lease("w2")
+    assert again.job_id == job.job_id
+    assert again.attempts == 2
+
+
+def test_expired_lease_without_attempts_left_is_dead_lettered(queue, tmp_path):
+    (path,) = make_files(tmp_path, 1)
+    queue.enqueue(path, "text/plain")
+    queue.lease("w1", lease_seconds=-1)
+    queue.lease("w2", lease_seconds=-1)
+    assert queue.lease("w3") is None
+    assert queue.stats()[DEAD] == 1
+
+
+def test_lease_queries_use_the_edf_index(queue):
+    columns = "job_id, file_path, mime_type, attempts, priority, deadline, created_at"
+    for sql, params in (
+        (f"SELECT {columns} FROM jobs WHERE state = ? ORDER BY {_EDF_ORDER} LIMIT 1", ("queued",)),
+        (f"SELECT {columns} FROM jobs WHERE state = ? AND lease_expires < ? ORDER BY {_EDF_ORDER} LIMIT 1",
+         (LEASED, time.time())),
+    ):
+        plan = " ".join(row[-1] for row in queue.conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        assert "jobs_edf_idx" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_workers_drain_the_queue(queue, tmp_path):
+    paths = make_files(tmp_path, 10)
+    queue.enqueue_many(paths, "text/plain")
+    assert run_worker(queue, SleepingProcessor(0)) == 10
+    assert queue.stats()[DONE] == 10
+    assert {record["file_path"] for record in queue.results()} == {str(tmp_path / f"doc{i}.txt") for i in range(10)}
+
+
+def test_benchmark_throughput_grows_with_workers(tmp_path):
+    results = benchmark_workers([1, 4], documents=40, seconds_per_document=0.02, directory=str(tmp_path))
+    assert [result["done"] for result in results] == [40, 40]
+    assert results[1]["docs_per_s"] > 2 * results[0]["docs_per_s"]
+
+
+def test_schema_is_created_in_one_step(queue):
+    columns = {row[1] for row in queue.conn.execute("PRAGMA table_info(jobs)")}
+    assert {"priority", "deadline", "completed_at", "phash"} <= columns
+    indexes = {row[1] for row in queue.conn.execute("PRAGMA index_list(jobs)")}
+    assert "jobs_edf_idx" in indexes
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from local_extract import LocalFirstExtractor, decode_text, has_text_layer
+
+
+def test_text_plain_is_decoded_without_a_processor():
+    result = LocalFirstExtractor().process_content("﻿Café notes\nline two".encode("utf-8"), "text/plain")
+
+    assert result["text"] == "Café notes\nline two"
+    assert result["routing"] == [{"page_number": 1, "route": "local", "reason": "text/plain"}]
+    assert (result["local_pages"], result["cloud_pages"]) == (1, 0)
+    assert result["page_offsets"] == [{"page_number": 1, "start_index": 0, "end_index": len(result["text"])}]
+
+
+def test_text_that_is_not_utf8_falls_back_to_cp1252():
+    assert decode_text("naïve – café".encode("cp1252")) == "naïve – café"
+
+
+def test_text_layer_threshold():
+    assert has_text_layer("Photosynthesis converts light energy into chemical energy stored in glucose.")
+    assert not has_text_layer("Page 2")
+    assert not has_text_layer("~ ^ | " * 40)
+
+
+def test_scanned_page_goes_to_the_cloud_and_text_page_stays_local():
+    pypdf = pytest.importorskip("pypdf")
+    pytest.importorskip("google.cloud.documentai_v1")
+    from document_processor import DocumentAIProcessor, EchoClient
+    from pdf_pages import synthetic_pdf
+
+    # Page 1 has a full text layer; page 2 carries only its "Page 2" marker,
+    # as a scan with no recognised text would
+    text_pages = pypdf.PdfReader(io.BytesIO(synthetic_pdf(2)))
+    scan_pages = pypdf.PdfReader(io.BytesIO(synthetic_pdf(2, text_bytes=0)))
+    writer = pypdf.PdfWriter()
+    writer.add_page(text_pages.pages[0])
+    writer.add_page(scan_pages.pages[1])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    client = EchoClient(words_per_page=5)
+    processor = DocumentAIProcessor("test", "us", "echo", client=client)
+    result = LocalFirstExtractor(processor).process_content(buffer.getvalue(), "application/pdf")
+
+    assert result["routing"] == [
+        {"page_number": 1, "route": "local", "reason": "text layer"},
+        {"page_number": 2, "route": "cloud", "reason": "no text layer"},
+    ]
+    assert (result["local_pages"], result["cloud_pages"]) == (1, 1)
+    # Only the scanned page was uploaded, in a single request
+    assert client.uploaded_pages == [[2]]
+    first, second = result["page_offsets"]
+    assert result["text"][first["start_index"]:first["end_index"]].split()[:3] == ["Page", "1", "word0"]
+    assert result["text"][second["start_index"]:second["end_index"]].strip() == "Page 2 word0 word1 word2 word3 word4"
+
+
+def test_scanned_page_without_a_processor_is_an_error():
+    pytest.importorskip("pypdf")
+    from pdf_pages import synthetic_pdf
+
+    with pytest.raises(ValueError):
+        LocalFirstExtractor().process_content(synthetic_pdf(1, text_bytes=0), "application/pdf")
@@ -0,0 +1,56 @@
+import numpy as np
+
+from local_summary import _STOPWORDS, _WORD, split_sentences, summarize_text, synthetic_notes, textrank_scores
+
+
+def content_words(text):
+    return [
+        [word for word in _WORD.findall(text[start:end].lower()) if word not in _STOPWORDS]
+        for start, end in split_sentences(text)
+    ]
+
+
+def dense_textrank(sentences, damping=0.85, iterations=200):
+    """Reference TextRank over the full sentence x sentence overlap matrix."""
+    count = len(sentences)
+    sets = [set(words) for words in sentences]
+    weights = np.zeros((count, count))
+    for i in range(count):
+        for j in range(count):
+            if i != j and sets[i] & sets[j]:
+                weights[i, j] = len(sets[i] & sets[j]) / (np.log1p(len(sets[i])) + np.log1p(len(sets[j])))
+    out = weights.sum(axis=1)
+    scores = np.full(count, 1.0 / count)
+    for _ in range(iterations):
+        flow = (weights / np.maximum(out[:, None], 1e-12) * scores[:, None]).sum(axis=0)
+        scores = (1 - damping) / count + damping * (flow + scores[out == 0].sum() / count)
+    return scores
+
+
+def test_sparse_graph_matches_dense_reference():
+    sentences = content_words(synthetic_notes(1))
+    sparse = textrank_scores(sentences, neighbors=len(sentences), tolerance=1e-12)
+    assert np.allclose(sparse, dense_textrank(sentences), atol=1e-9)
+
+
+def test_common_terms_add_no_edges():
+    sentences = [["common", f"word{i}"] for i in range(5)] + [["rare", "alpha"], ["rare", "beta"]]
+    scores = textrank_scores(sentences, max_term_sentences=4)
+    # Only the two 'rare' sentences are linked; the rest score like isolated nodes
+    assert scores[5] == scores[6] > scores[0]
+    assert np.allclose(scores[:5], scores[0])
+
+
+def test_degenerate_inputs():
+    assert len(textrank_scores([])) == 0
+    assert textrank_scores([["a"]]).tolist() == [1.0]
+    assert np.allclose(textrank_scores([["a"], ["b"]]), [0.5, 0.5])
+
+
+def test_summary_sentences_are_in_document_order():
+    text = synthetic_notes(3)
+    result = summarize_text(text, max_sentences=4)
+    starts = [sentence["start_index"] for sentence in result["sentences"]]
+    assert len(starts) == 4 and starts == sorted(starts)
+    for sentence in result["sentences"]:
+        assert text[sentence["start_index"]:sentence["end_index"]] == sentence["text"]
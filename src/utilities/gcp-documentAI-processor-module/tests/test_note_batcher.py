@@ -0,0 +1,95 @@
+import re
+
+from google.cloud import documentai_v1 as documentai
+
+from note_batcher import NoteBatcher, note_spans, pack_notes, split_document
+
+NOTES = [
+    "Met with Ada about the Lovelace essay.",
+    "Grace asked for an extension.",
+    "Reminder: Turing quiz on Friday.",
+]
+
+
+def echo_document(text):
+    """Document AI stand-in output: the text back, one 'name' entity per capitalized word."""
+    entities = []
+    for match in re.finditer(r"\b[A-Z][a-z]+\b", text):
+        segment = documentai.Document.TextAnchor.TextSegment(
+            start_index=match.start(), end_index=match.end()
+        )
+        entities.append(documentai.Document.Entity(
+            type_="name", mention_text=match.group(), confidence=0.5,
+            text_anchor=documentai.Document.TextAnchor(text_segments=[segment])
+        ))
+    return documentai.Document(text=text, mime_type="text/plain", entities=entities)
+
+
+class EchoProcessor:
+    """Echoes requests, optionally dropping the marker line in front of notes containing a word."""
+
+    def __init__(self, drop_marker_for=None):
+        self.drop_marker_for = drop_marker_for
+        self.fetches = 0
+        self.singles = 0
+
+    def fetch_document(self, content, mime_type):
+        self.fetches += 1
+        text = content.decode("utf-8")
+        if self.drop_marker_for:
+            text = re.sub(r"<<<note \w+ \d+>>>\n(?=[^\n]*" + self.drop_marker_for + ")", "", text)
+        return echo_document(text)
+
+    def process_content(self, content, mime_type):
+        self.singles += 1
+        document = echo_document(content.decode("utf-8"))
+        return {"text": document.text, "entities": [
+            {"type": e.type_, "mention_text": e.mention_text, "confidence": e.confidence,
+             "start_index": int(e.text_anchor.text_segments[0].start_index),
+             "end_index": int(e.text_anchor.text_segments[0].end_index), "page": 1}
+            for e in document.entities
+        ], "mime_type": mime_type}
+
+
+def assert_matches_note(result, note):
+    assert result["text"] == note
+    mentions = re.findall(r"\b[A-Z][a-z]+\b", note)
+    assert [e["mention_text"] for e in result["entities"]] == mentions
+    for entity in result["entities"]:
+        assert note[entity["start_index"]:entity["end_index"]] == entity["mention_text"]
+
+
+def test_split_document_rebases_entity_offsets():
+    packed, nonce = pack_notes(NOTES)
+    results = split_document(echo_document(packed), nonce, len(NOTES))
+    for result, note in zip(results, NOTES):
+        assert_matches_note(result, note)
+
+
+def test_missing_or_duplicated_marker_leaves_note_unlocated():
+    packed, nonce = pack_notes(NOTES)
+    marker = f"<<<note {nonce} 1>>>\n"
+    # Note 0 is unlocated too: its span would run on into note 1's text
+    assert note_spans(packed.replace(marker, ""), nonce, 3)[:2] == [None, None]
+    duplicated = packed.replace(marker, marker + "x\n" + marker)
+    assert note_spans(duplicated, nonce, 3)[1] is None
+
+    results = split_document(echo_document(packed.replace(marker, "")), nonce, 3)
+    assert results[:2] == [None, None]
+    assert_matches_note(results[2], NOTES[2])
+
+
+def test_batcher_falls_back_to_single_requests_for_lost_markers():
+    processor = EchoProcessor(drop_marker_for="Grace")
+    batcher = NoteBatcher(processor, max_wait_ms=200)
+    futures = [batcher.submit(note) for note in NOTES]
+    results = [future.result(timeout=10) for future in futures]
+    batcher.shutdown()
+
+    assert processor.fetches == 1
+    assert processor.singles == 2
+    assert batcher.stats()["fallbacks"] == 2
+    assert ["batch" in result for result in results] == [False, False, True]
+    assert results[2]["batch"] == {"notes": 3, "rpc_shared": True}
+    for result, note in zip(results, NOTES):
+        assert_matches_note(result, note)
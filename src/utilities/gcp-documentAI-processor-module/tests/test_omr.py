@@ -0,0 +1,37 @@
+import pytest
+
+from answer_sheets import AnswerSheetTemplate
+from omr import BubbleReader, OmrPipeline, OmrTemplate, synthetic_sheets
+
+ANCHORS = {"#1": (0.05, 0.04), "#2": (0.95, 0.04), "#3": (0.05, 0.96), "#4": (0.95, 0.96)}
+
+
+def test_synthetic_sheets_decode_exactly():
+    template = OmrTemplate.grid([f"q{i + 1}" for i in range(60)], 5, anchors=ANCHORS)
+    sheets, truths = synthetic_sheets(template, 200)
+    results = BubbleReader(template).read_batch(sheets)
+
+    correct = sum(
+        result["answers"] == truth["answers"] and result["multiple"] == truth["multiple"]
+        for result, truth in zip(results, truths)
+    )
+    assert correct >= 198
+
+
+def test_each_sheet_uploads_only_its_pages(tmp_path):
+    pytest.importorskip("pypdf")
+    from document_processor import DocumentAIProcessor, EchoClient
+    from pdf_pages import synthetic_pdf
+
+    path = tmp_path / "class.pdf"
+    path.write_bytes(synthetic_pdf(6))
+    processor = DocumentAIProcessor("test", "us", "echo", client=EchoClient(words_per_page=5))
+    pipeline = OmrPipeline(
+        processor, {"id": "exam-1"}, AnswerSheetTemplate(["q1"], pages_per_sheet=3),
+        OmrTemplate.grid(["q1"], 4), workers=1
+    )
+    results = list(pipeline.run([str(path)]))
+
+    assert sorted(processor.client.uploaded_pages) == [[1, 2, 3], [4, 5, 6]]
+    assert sorted(result["source"]["pages"] for result in results) == [[1, 2, 3], [4, 5, 6]]
+    assert all("error" not in result for result in results)
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("google.cloud.documentai_v1")
+
+from google.cloud import documentai_v1 as documentai
+
+from page_index import PageOffsetIndex
+
+#          page 1     | page 2a  |gap| page 2b | page 3
+TEXT = "first page\n" "second " "--" "part\n" "third\n"
+
+
+def make_document(segments_by_page, proto_plus=True):
+    pages = []
+    for number, segments in enumerate(segments_by_page, 1):
+        anchor = documentai.Document.TextAnchor(text_segments=[
+            documentai.Document.TextAnchor.TextSegment(start_index=start, end_index=end)
+            for start, end in segments
+        ])
+        pages.append(documentai.Document.Page(
+            page_number=number, layout=documentai.Document.Page.Layout(text_anchor=anchor)
+        ))
+    document = documentai.Document(text=TEXT, pages=pages)
+    return document if proto_plus else documentai.Document.pb(document)
+
+
+@pytest.fixture(params=[True, False], ids=["proto-plus", "protobuf"])
+def index(request):
+    return PageOffsetIndex.from_document(make_document([[(0, 11)], [(11, 18), (20, 25)], [(25, 31)]], request.param))
+
+
+def test_page_for_offset_at_boundaries(index):
+    assert index.page_for_offset(0) == 1
+    assert index.page_for_offset(10) == 1
+    assert index.page_for_offset(11) == 2
+    assert index.page_for_offset(18) is None  # between page 2's segments
+    assert index.page_for_offset(24) == 2
+    assert index.page_for_offset(25) == 3
+    assert index.page_for_offset(31) is None
+
+
+def test_pages_for_span_at_boundaries(index):
+    assert index.pages_for_span(0, 11) == [1]  # end is exclusive
+    assert index.pages_for_span(5, 12) == [1, 2]
+    assert index.pages_for_span(11, 25) == [2]
+    assert index.pages_for_span(18, 20) == []
+    assert index.pages_for_span(24, 26) == [2, 3]
+    assert index.pages_for_span(0, 31) == [1, 2, 3]
+    assert index.pages_for_span(25, 25) == [3]
+
+
+def test_page_text_joins_segments(index):
+    assert index.page_text(2) == "second part\n"
+    assert index.page_span(2) == (11, 25)
+    assert index.page_text(4) == ""
+    assert index.locate("part\nthird") == (20, 30, [2, 3])
+    assert index.to_list()[1] == {"page_number": 2, "start_index": 11, "end_index": 25}
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+pypdf = pytest.importorskip("pypdf")
+
+from pypdf.generic import NameObject
+from pdf_pages import open_pdf_file, open_pdf_pages, synthetic_pdf
+
+
+def page_markers(content):
+    return [page.extract_text().split()[:2] for page in pypdf.PdfReader(io.BytesIO(content)).pages]
+
+
+def test_extract_keeps_requested_pages_in_order(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(synthetic_pdf(30, text_bytes=100))
+    with open_pdf_file(str(path)) as splitter:
+        assert len(splitter) == 30
+        assert page_markers(splitter.extract([7, 3])) == [["Page", "7"], ["Page", "3"]]
+        assert page_markers(splitter.extract([30])) == [["Page", "30"]]
+        with pytest.raises(ValueError):
+            splitter.extract([31])
+
+
+def test_inherited_resources_are_copied_to_extracted_pages():
+    reader = pypdf.PdfReader(io.BytesIO(synthetic_pdf(3, text_bytes=100)))
+    writer = pypdf.PdfWriter(clone_from=reader)
+    tree = writer.root_object["/Pages"]
+    tree[NameObject("/Resources")] = writer.pages[0]["/Resources"]
+    for page in writer.pages:
+        del page["/Resources"]
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    extracted = pypdf.PdfReader(io.BytesIO(open_pdf_pages(buffer.getvalue()).extract([2])))
+    assert "/F1" in extracted.pages[0]["/Resources"]["/Font"]
+
+
+def test_non_pdf_content_is_not_split(tmp_path):
+    assert open_pdf_pages(b"not a pdf") is None
+    assert open_pdf_pages(synthetic_pdf(1), mime_type="image/png") is None
+    path = tmp_path / "missing.pdf"
+    assert open_pdf_file(str(path)) is None
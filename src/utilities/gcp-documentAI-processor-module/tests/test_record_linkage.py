@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from record_linkage import ApplicantIndex, link_drafts, normalize_name, soundex, synthetic_applicants
+
+
+def write_drafts(path, drafts):
+    path.write_text("".join(json.dumps(draft) + "\n" for draft in drafts))
+    return str(path)
+
+
+def draft(application_id, form, job_id=None, source=None):
+    record = {"application": {"id": application_id, "userId": "u1"}, "form": form, "source": source}
+    if job_id is not None:
+        record["job_id"] = job_id
+    return record
+
+
+ADA = {"full_name": "Ada Lovelace", "date_of_birth": "1815-12-10", "email": "ada@example.org"}
+ADA_AGAIN = {"full_name": "Lovelace Ada", "date_of_birth": "1815-10-12", "email": "ada@example.org"}
+
+
+def test_soundex_and_names():
+    assert soundex("robert") == soundex("rupert") == "r163"
+    assert normalize_name("  José  O'Neil ") == ["jose", "o", "neil"]
+
+
+def test_drafts_sharing_an_application_id_are_both_checked(tmp_path):
+    path = write_drafts(tmp_path / "drafts.ndjson", [
+        draft("app-1", ADA, source="paper.pdf"),
+        draft("app-1", ADA_AGAIN, source="upload.pdf"),
+    ])
+    report = link_drafts([path], ApplicantIndex())
+
+    assert len(report) == 1
+    assert report[0]["key"] == f"{path}:2"
+    assert report[0]["source"] == "upload.pdf"
+    duplicate = report[0]["duplicates"][0]
+    assert duplicate["key"] == f"{path}:1"
+    assert duplicate["applicationId"] == "app-1"
+    assert duplicate["source"] == "paper.pdf"
+    assert duplicate["match"]
+
+
+def test_drafts_are_keyed_by_job_id_across_files(tmp_path):
+    first = write_drafts(tmp_path / "a.ndjson", [draft("app-1", ADA, job_id="job-a")])
+    second = write_drafts(tmp_path / "b.ndjson", [
+        draft("app-1", ADA, job_id="job-a"),
+        draft("app-2", ADA_AGAIN, job_id="job-b"),
+    ])
+    report = link_drafts([first, second], ApplicantIndex())
+
+    # The re-exported job-a is skipped rather than reported as its own duplicate
+    assert [entry["key"] for entry in report] == ["job-b"]
+    assert report[0]["duplicates"][0]["applicationId"] == "app-1"
+
+
+def test_add_rejects_a_repeated_record_id():
+    index = ApplicantIndex()
+    index.add("job-a", ADA)
+    with pytest.raises(ValueError):
+        index.add("job-a", ADA)
+
+
+def test_synthetic_resubmissions_are_found():
+    index = ApplicantIndex()
+    records, truth = synthetic_applicants(2000, 40)
+    index.add_many(records[:2000])
+    found = index.add_many(records[2000:])
+    flagged = {(record_id, match["id"]) for record_id, match in found if match["match"]}
+    recall = sum((record_id, original) in flagged for record_id, original in truth.items()) / len(truth)
+    assert recall >= 0.9
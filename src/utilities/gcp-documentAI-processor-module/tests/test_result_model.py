@@ -0,0 +1,37 @@
+import json
+
+from result_model import EntityTable, benchmark, dumps_result, json_default
+
+
+def test_confidence_reads_back_exactly():
+    table = EntityTable()
+    table.append("date", "1 May", 0.9, 3, 8, 1)
+    assert table[0]["confidence"] == 0.9
+    assert json.loads(json.dumps(table, default=json_default))[0]["confidence"] == 0.9
+
+
+def test_append_accepts_entity_dicts():
+    table = EntityTable()
+    table.append({"type": "person", "mention_text": "Ada", "confidence": 0.75})
+    table.append("person", "Grace", 0.5, 10, 15, 2)
+    assert table.to_list() == [
+        {"type": "person", "mention_text": "Ada", "confidence": 0.75,
+         "start_index": -1, "end_index": -1, "page": -1},
+        {"type": "person", "mention_text": "Grace", "confidence": 0.5,
+         "start_index": 10, "end_index": 15, "page": 2},
+    ]
+    assert table.type_names == ["person"]
+
+
+def test_compact_round_trip():
+    table = EntityTable()
+    for index in range(5):
+        table.append("citation" if index % 2 else "author", f"m{index}", 0.25 * index, index, index + 1, 1)
+    restored = EntityTable.from_compact(json.loads(dumps_result({"e": table}, compact=True))["e"])
+    assert restored == table
+    assert json.loads(dumps_result({"e": table}))["e"] == table.to_list()
+
+
+def test_benchmark_table_is_smaller_than_dicts():
+    results = benchmark(2000, repeat=1)
+    assert results["table"]["bytes"] * 3 < results["dicts"]["bytes"]
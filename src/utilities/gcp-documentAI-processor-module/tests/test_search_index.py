@@ -0,0 +1,71 @@
+import pytest
+
+from search_index import ENTITY, PAGE, SUMMARY, SearchIndex, quote_query
+
+
+def result(*pages, summary=None, entities=()):
+    text, offsets, position = [], [], 0
+    for number, page in enumerate(pages, 1):
+        offsets.append({"page_number": number, "start_index": position, "end_index": position + len(page)})
+        text.append(page)
+        position += len(page) + 1
+    return {"text": "\n".join(text), "pages": len(pages), "page_offsets": offsets,
+            "summary": summary, "entities": list(entities), "mime_type": "application/pdf"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    yield index
+    index.close()
+
+
+def test_upsert_replaces_earlier_segments(index):
+    index.upsert("doc-1", result("photosynthesis in leaves", "osmosis"), course_id="bio")
+    index.upsert("doc-1", result("mitochondria"), course_id="bio")
+
+    assert index.search("photosynthesis") == []
+    assert [hit["page"] for hit in index.search("mitochondria")] == [1]
+    assert index.stats() == {"documents": 1, "segments": 1}
+    index.remove("doc-1")
+    assert index.stats() == {"documents": 0, "segments": 0}
+
+
+def test_bm25_ranks_denser_matches_first(index):
+    index.upsert("sparse", result("enzyme " + "filler " * 60))
+    index.upsert("dense", result("enzyme enzyme enzyme catalysis"))
+    index.upsert("other", result("velocity"))
+
+    hits = index.search("enzyme")
+    assert [hit["doc_hash"] for hit in hits] == ["dense", "sparse"]
+    assert hits[0]["score"] < hits[1]["score"]  # bm25() is lower for better hits
+    assert "[enzyme]" in hits[0]["snippet"]
+
+
+def test_filters_and_segment_kinds(index):
+    index.upsert("a", result("gravity page", summary="gravity summary",
+                             entities=[{"type": "topic", "mention_text": "gravity", "page": 1}]),
+                 course_id="physics", student_id="s1")
+    index.upsert("b", result("gravity again"), course_id="physics", student_id="s2")
+
+    assert {hit["kind"] for hit in index.search("gravity", student_id="s1")} == {PAGE, SUMMARY, ENTITY}
+    assert [hit["doc_hash"] for hit in index.search("gravity", kinds=[SUMMARY])] == ["a"]
+    assert index.search("gravity", course_id="chemistry") == []
+    entity = index.search("gravity", kinds=[ENTITY])[0]
+    assert (entity["label"], entity["page"]) == ("topic", 1)
+
+
+def test_search_documents_groups_pages(index):
+    index.upsert("doc", result("newton laws", "unrelated", "newton apple"), file_path="notes.pdf")
+    index.upsert("brief", result("newton"))
+
+    documents = index.search_documents("newton")
+    by_hash = {doc["doc_hash"]: doc for doc in documents}
+    assert sorted(by_hash["doc"]["pages"]) == [1, 3]
+    assert by_hash["doc"]["file_path"] == "notes.pdf"
+    assert len(index.search_documents("newton", limit=1)) == 1
+
+
+def test_queries_are_quoted():
+    assert quote_query('cell "wall" OR -x') == '"cell" "wall" "OR" "x"'
+    assert quote_query("!!") == ""
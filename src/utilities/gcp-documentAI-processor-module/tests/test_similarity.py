@@ -0,0 +1,42 @@
+import pytest
+
+from similarity import SimilarityIndex, jaccard, shingle_hashes, synthetic_submissions
+
+
+def test_shingles_ignore_case_and_formatting():
+    assert (shingle_hashes("The cell,\nproduces  ENERGY today now", k=3)
+            == shingle_hashes("the cell produces energy today now", k=3)).all()
+    assert shingle_hashes("", k=5).size == 0
+    assert shingle_hashes("two words", k=5).size == 1
+
+
+def test_copies_are_found_and_estimates_track_exact_jaccard():
+    documents = synthetic_submissions(400, copies=20)
+    index = SimilarityIndex()
+    pairs = index.add_many(documents)
+    copied = {doc_id for doc_id, _ in documents[-20:]}
+    assert {doc_id for doc_id, _, _ in pairs} == copied
+
+    texts = dict(documents)
+    errors = [abs(score - jaccard(texts[a], texts[b])) for a, b, score in pairs]
+    assert sum(errors) / len(errors) < 0.06
+
+
+def test_candidate_pairs_and_query_agree_with_add():
+    documents = synthetic_submissions(200, copies=10, seed=9)
+    index = SimilarityIndex()
+    found = {(a, b) for a, b, _ in index.add_many(documents)}
+    assert {tuple(sorted((a, b))) for a, b, _ in index.candidate_pairs()} == \
+        {tuple(sorted(pair)) for pair in found}
+
+    copy_id, copy_text = documents[-1]
+    assert copy_id in [doc_id for doc_id, _ in index.query(copy_text)]
+
+
+def test_duplicate_ids_and_empty_texts():
+    index = SimilarityIndex()
+    assert index.add("a", "") == []
+    assert index.add("b", "") == []
+    with pytest.raises(ValueError):
+        index.add("a", "again")
+    assert index.query("") == []
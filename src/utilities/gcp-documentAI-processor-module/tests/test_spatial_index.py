@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from spatial_index import CENTER, INTERSECTS, WITHIN, PageSpatialIndex, benchmark, synthetic_page
+
+
+def scan(boxes, rect, mode):
+    x0, y0, x1, y1 = rect
+    if mode == INTERSECTS:
+        keep = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+    elif mode == WITHIN:
+        keep = (boxes[:, 0] >= x0) & (boxes[:, 2] <= x1) & (boxes[:, 1] >= y0) & (boxes[:, 3] <= y1)
+    else:
+        cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+        keep = (cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1)
+    return np.nonzero(keep)[0]
+
+
+@pytest.mark.parametrize("mode", [CENTER, INTERSECTS, WITHIN])
+def test_query_rect_matches_scan(mode):
+    boxes = synthetic_page(2000)
+    index = PageSpatialIndex(boxes)
+    rng = np.random.RandomState(1)
+    for _ in range(300):
+        corner = rng.uniform(-0.1, 0.9, size=2)
+        rect = tuple(np.concatenate([corner, corner + rng.uniform(0, 0.3, size=2)]))
+        assert np.array_equal(index.query_rect(rect, mode), scan(boxes, rect, mode))
+
+
+def test_nearest_matches_brute_force():
+    boxes = synthetic_page(1500)
+    index = PageSpatialIndex(boxes)
+    rng = np.random.RandomState(2)
+    for x, y in rng.uniform(0, 1, size=(200, 2)):
+        dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+        dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+        expected = np.sort(np.sqrt(dx * dx + dy * dy))[:5]
+        found = [distance for _, distance in index.nearest(x, y, 5)]
+        assert found == pytest.approx(expected.tolist())
+
+
+def test_empty_page_and_inverted_rect():
+    empty = PageSpatialIndex(np.zeros((0, 4)))
+    assert len(empty.query_rect((0, 0, 1, 1))) == 0
+    assert empty.nearest(0.5, 0.5) == []
+    index = PageSpatialIndex(synthetic_page(50))
+    assert len(index.query_rect((0.6, 0.6, 0.4, 0.4))) == 0
+
+
+def test_benchmark_reports_both_query_paths():
+    result = benchmark(500, queries=50)
+    assert result["hits"] > 0
+    assert result["rect_us"] > 0 and result["scan_us"] > 0
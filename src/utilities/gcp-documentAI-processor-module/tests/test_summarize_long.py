@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from summarize_long import HierarchicalSummarizer
+
+
+class StubSummarizer:
+    """Summarizes text to its first word; returns no summary for texts containing a skip word."""
+
+    def __init__(self, skip=()):
+        self.skip = skip
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def process_content(self, content, mime_type):
+        text = content.decode("utf-8")
+        with self._lock:
+            self.calls.append(text)
+        if any(word in text for word in self.skip):
+            return {"text": text}
+        return {"text": text, "summary": "S:" + text.split()[0]}
+
+
+def transcript(sections, words=300):
+    return "\n\n".join(
+        " ".join([f"topic{index}"] + ["filler"] * words) for index in range(sections)
+    )
+
+
+def test_unsummarized_section_is_reported_and_not_passed_up():
+    processor = StubSummarizer(skip=("topic2",))
+    text = transcript(4)
+    result = HierarchicalSummarizer(processor, section_tokens=400).summarize(text)
+    skipped = [
+        section["index"] for section in result["sections"]
+        if "topic2" in text[section["start_index"]:section["end_index"]]
+    ]
+    assert len(skipped) == 1
+    assert result["unsummarized"] == skipped
+    section = result["sections"][skipped[0]]
+    assert (section["summary"], section["summarized"]) == ("", False)
+    assert all(s["summarized"] for s in result["sections"] if s["index"] != skipped[0])
+    # Only summaries reach the final call, never a section's raw text
+    final_input = processor.calls[-1]
+    assert all(part.startswith("S:") for part in final_input.split("\n\n"))
+    assert "topic2" not in final_input
+    assert result["summary"] == "S:S:topic0"
+
+
+def test_missing_final_summary_raises():
+    processor = StubSummarizer(skip=("S:topic0",))
+    with pytest.raises(RuntimeError, match="final summary"):
+        HierarchicalSummarizer(processor, section_tokens=400).summarize(transcript(3))
+
+
+def test_short_text_without_summary_raises():
+    with pytest.raises(RuntimeError, match="no summary"):
+        HierarchicalSummarizer(StubSummarizer(skip=("topic0",))).summarize(transcript(1, 10))
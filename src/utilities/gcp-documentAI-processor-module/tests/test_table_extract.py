@@ -0,0 +1,149 @@
+import math
+
+import numpy as np
+import pytest
+
+from table_extract import (
+    ExtractedTable, _place_rows, extract_tables, parse_number, performance_metrics, synthetic_document
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("85", 85.0), ("85%", 85.0), ("$ 1,234.50", 1234.5), ("(3)", -3.0), ("−2.5", -2.5),
+    ("7,5", 7.5), ("1,234", 1234.0), ("1 234", 1234.0), ("1 234,5", 1234.5), ("1'234", 1234.0),
+    ("3 4", math.nan), ("12 34", math.nan), ("1.234,5", math.nan), ("1,2,3", math.nan),
+    ("1.234.567", math.nan), ("inf", math.nan), ("n/a", math.nan), ("", math.nan),
+])
+def test_parse_number(text, expected):
+    value = parse_number(text)
+    assert (math.isnan(value) and math.isnan(expected)) or value == expected
+
+
+def table(header, rows):
+    return ExtractedTable(header, np.array(rows, dtype=object).reshape(len(rows), len(header)), [1])
+
+
+def test_column_types():
+    gradebook = table(["Name", "Score", "Grade", "Comment", "Mostly"], [
+        ["Ada", "91", "A", "", "1"],
+        ["Alan", "-", "B", "n/a", "2"],
+        ["Grace", "78.5", "C", "", "3"],
+        ["Edsger", "64", "D", "-", "4"],
+        ["Barbara", "55", "E", "", "3 4"],
+    ])
+    assert gradebook.column_types() == ["text", "number", "text", "empty", "number"]
+    columns = gradebook.columns()
+    assert np.isnan(columns["Score"][1])
+    assert columns["Score"][[0, 2, 3, 4]].tolist() == [91.0, 78.5, 64.0, 55.0]
+    # Four of five filled cells are numbers; "3 4" is not read as 34
+    assert columns["Mostly"][:4].tolist() == [1.0, 2.0, 3.0, 4.0] and np.isnan(columns["Mostly"][4])
+    assert columns["Comment"].tolist() == [None] * 5
+
+    gradebook.min_numeric = 0.9
+    gradebook._types = None
+    assert gradebook.column_types()[4] == "text"
+
+
+def test_performance_metrics():
+    gradebook = table(["Student", "Quiz 1", "Quiz 2", "Notes"], [
+        ["Ada", "9", "", "good"],
+        ["Unknown", "5", "6", ""],
+        ["", "7", "8", ""],
+        ["Alan", "-", "10", "late"],
+    ])
+    users = {"Ada": "u-ada", "Alan": "u-alan"}
+    metrics = list(performance_metrics(gradebook, 0, "math", "2027-09-30T00:00:00Z", users.get))
+
+    assert [(m["userId"], m["metricType"], m["value"]) for m in metrics] == [
+        ("u-ada", "Quiz 1", 9.0), ("u-alan", "Quiz 2", 10.0),
+    ]
+    again = list(performance_metrics(gradebook, 0, "math", "2027-09-30T00:00:00Z", users.get))
+    assert [m["id"] for m in metrics] == [m["id"] for m in again]
+    assert len({m["id"] for m in metrics}) == 2
+    only_quiz_2 = performance_metrics(gradebook, 0, "math", "t", users.get, metric_columns=[2])
+    assert [m["metricType"] for m in only_quiz_2] == ["Quiz 2"]
+
+
+class TextBuilder:
+    """Collects cell texts into one document text and anchors cells to it."""
+
+    def __init__(self, documentai):
+        self.documentai = documentai
+        self.text = ""
+
+    def cell(self, value, row_span=1, col_span=1, inline=False):
+        documentai = self.documentai
+        if inline:
+            anchor = documentai.Document.TextAnchor(content=value)
+        else:
+            segment = documentai.Document.TextAnchor.TextSegment(
+                start_index=len(self.text), end_index=len(self.text) + len(value)
+            )
+            anchor = documentai.Document.TextAnchor(text_segments=[segment])
+            self.text += value + "\n"
+        return documentai.Document.Page.Table.TableCell(
+            layout=documentai.Document.Page.Layout(text_anchor=anchor), row_span=row_span, col_span=col_span
+        )
+
+    def rows(self, rows):
+        return [
+            self.documentai.Document.Page.Table.TableRow(cells=[
+                self.cell(*cell) if isinstance(cell, tuple) else self.cell(cell) for cell in row
+            ])
+            for row in rows
+        ]
+
+    def table(self, header, body):
+        return self.documentai.Document.Page.Table(header_rows=self.rows(header), body_rows=self.rows(body))
+
+
+@pytest.fixture
+def builder():
+    return TextBuilder(pytest.importorskip("google.cloud.documentai_v1").types.document)
+
+
+def test_place_rows_repeats_row_and_column_spans(builder):
+    rows = builder.rows([
+        [("Ada", 2, 1), ("Term 1", 1, 2), "x"],
+        ["7", "8", ("  spaced   text ", 1, 1, True)],
+        ["a", "b", "c", "d"],
+    ])
+    assert _place_rows(builder.text, rows) == [
+        ["Ada", "Term 1", "Term 1", "x"],
+        ["Ada", "7", "8", "spaced text"],
+        ["a", "b", "c", "d"],
+    ]
+
+
+def test_continuation_tables_are_merged(builder):
+    documentai = builder.documentai
+    pages = [
+        [builder.table([["", ("Term 1", 1, 2)], ["Student", "Quiz", "Test"]], [["Ada", "9", "80"]])],
+        # Same width, no header: continues the table of page 1
+        [builder.table([], [["Alan", "7", "70"]]), builder.table([], [["x", "y", "z"]])],
+        # A header starts a new table
+        [builder.table([["Student", "Quiz", "Test"]], [["Grace", "8", "90"]])],
+        # Different width: not a continuation
+        [builder.table([], [["Edsger", "6"]])],
+    ]
+    document = documentai.Document(text=builder.text, pages=[
+        documentai.Document.Page(page_number=number, tables=tables) for number, tables in enumerate(pages, 1)
+    ])
+    tables = extract_tables(document)
+
+    assert [(t.pages, t.shape, t.has_header) for t in tables] == [
+        ([1, 2], (2, 3), True), ([2], (1, 3), False), ([3], (1, 3), True), ([4], (1, 2), False),
+    ]
+    assert tables[0].header == ["Student", "Term 1 Quiz", "Term 1 Test"]
+    assert tables[0].cells.tolist() == [["Ada", "9", "80"], ["Alan", "7", "70"]]
+    assert tables[0].numeric([2]).ravel().tolist() == [80.0, 70.0]
+    assert len(extract_tables(document, merge_continuations=False)) == 5
+
+
+def test_synthetic_gradebook_spanning_pages_is_one_table():
+    pytest.importorskip("google.cloud.documentai_v1")
+    tables = extract_tables(synthetic_document(2, 100, 3, rows_per_page=40))
+
+    assert [(t.pages, t.shape) for t in tables] == [([1, 2, 3], (100, 4)), ([4, 5, 6], (100, 4))]
+    assert tables[1].header == ["Student", "Quiz 1", "Quiz 2", "Quiz 3"]
+    assert tables[1].column_types() == ["text", "number", "number", "number"]
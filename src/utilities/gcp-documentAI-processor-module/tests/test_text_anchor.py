@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("google.cloud.documentai_v1")
+
+from google.cloud import documentai_v1 as documentai
+
+from text_anchor import TextAnchorResolver, anchor_segments, raw_message, resolve_anchor
+
+TEXT = "Name: Ada Lovelace\nGrade: A\n"
+
+
+def anchor(*segments, content=""):
+    return documentai.Document.TextAnchor(
+        text_segments=[
+            documentai.Document.TextAnchor.TextSegment(start_index=start, end_index=end)
+            for start, end in segments
+        ],
+        content=content,
+    )
+
+
+def layout(*segments, content=""):
+    return documentai.Document.Page.Layout(text_anchor=anchor(*segments, content=content))
+
+
+def make_document():
+    page = documentai.Document.Page(
+        layout=layout((0, 28)),
+        # One line split over two segments, skipping "Lovelace\n"
+        lines=[documentai.Document.Page.Line(layout=layout((0, 10), (19, 28)))],
+        tokens=[
+            documentai.Document.Page.Token(layout=layout((6, 9))),
+            documentai.Document.Page.Token(layout=layout(content="inline")),
+        ],
+        form_fields=[documentai.Document.Page.FormField(
+            field_name=layout((0, 4)), field_value=layout((6, 9), (9, 18))
+        )],
+    )
+    return documentai.Document(text=TEXT, pages=[page, documentai.Document.Page(layout=layout((19, 28)))])
+
+
+@pytest.fixture(params=[True, False], ids=["proto-plus", "protobuf"])
+def document(request):
+    document = make_document()
+    return document if request.param else documentai.Document.pb(document)
+
+
+def test_multi_segment_anchors(document):
+    resolver = TextAnchorResolver(document)
+    page = raw_message(document).pages[0]
+    assert resolver.layout_text(page.lines[0].layout) == "Name: Ada Grade: A\n"
+    field = page.form_fields[0]
+    assert resolver.layout_text(field.field_name) == "Name"
+    assert resolver.layout_text(field.field_value) == "Ada Lovelace"
+    assert anchor_segments(field.field_value.text_anchor) == [(6, 9), (9, 18)]
+
+
+def test_inline_content_is_used_without_segments(document):
+    page = raw_message(document).pages[0]
+    assert TextAnchorResolver(document).resolve(page.tokens[1].layout.text_anchor) == "inline"
+
+
+def test_page_texts_and_layouts(document):
+    resolver = TextAnchorResolver(document)
+    assert resolver.page_texts() == [TEXT, "Grade: A\n"]
+    layouts = resolver.resolve_layouts(["lines", "tokens"])
+    assert layouts["lines"] == [["Name: Ada Grade: A\n"], []]
+    assert layouts["tokens"] == [["Ada", "inline"], []]
+    with pytest.raises(ValueError):
+        resolver.resolve_layouts(["cells"])
+
+
+def test_resolve_anchor_matches_proto_plus_and_protobuf():
+    value = anchor((0, 4), (19, 24))
+    assert resolve_anchor(TEXT, value) == resolve_anchor(TEXT, documentai.Document.TextAnchor.pb(value)) == "NameGrade"
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from worker_pool import RecyclingWorkerPool, SyntheticProcessor
+
+
+class CrashOnceProcessor:
+    """Kills its worker the first time it sees a file, before doing any work."""
+
+    def __init__(self, marker_dir):
+        self.marker_dir = marker_dir
+
+    def process_document(self, file_path, mime_type="application/pdf"):
+        marker = os.path.join(self.marker_dir, os.path.basename(file_path))
+        if not os.path.exists(marker):
+            open(marker, "w").close()
+            os._exit(1)
+        return {"text": file_path}
+
+
+class AlwaysCrashProcessor:
+    def process_document(self, file_path, mime_type="application/pdf"):
+        os._exit(1)
+
+
+def test_documents_of_crashed_workers_are_requeued(tmp_path):
+    pool = RecyclingWorkerPool(
+        lambda: CrashOnceProcessor(str(tmp_path)), workers=2, mp_context="fork"
+    )
+    try:
+        futures = [pool.submit(f"doc-{i}.pdf") for i in range(6)]
+        results = [f.result(timeout=30) for f in futures]
+    finally:
+        pool.shutdown()
+    assert [r["text"] for r in results] == [f"doc-{i}.pdf" for i in range(6)]
+    assert pool.crashed == 6
+
+
+def test_shutdown_returns_when_requeues_are_exhausted():
+    pool = RecyclingWorkerPool(
+        AlwaysCrashProcessor, workers=2, max_requeues=1, mp_context="fork"
+    )
+    futures = [pool.submit(f"doc-{i}.pdf") for i in range(3)]
+    pool.shutdown()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="exited with code 1"):
+            future.result(timeout=0)
+
+
+def test_recycling_keeps_every_document():
+    pool = RecyclingWorkerPool(
+        SyntheticProcessor, workers=3, max_tasks_per_child=5, prefetch=3, mp_context="fork"
+    )
+    try:
+        futures = [pool.submit(f"doc-{i}.pdf") for i in range(200)]
+        results = [f.result(timeout=60) for f in futures]
+    finally:
+        pool.shutdown()
+    assert len(results) == 200
+    assert pool.recycled >= 200 // 5 - 3
+    assert pool.crashed == 0
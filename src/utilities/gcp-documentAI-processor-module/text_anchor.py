@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Text Anchor Resolution
+
+Layout elements in a Document AI response (pages, blocks, paragraphs, lines,
+tokens, form fields, table cells) do not carry their own text. Their
+`text_anchor.content` is usually empty; the text lives in `text_segments`,
+which are offsets into `document.text`.
+
+This module resolves anchors by slicing `document.text` directly: a single
+segment is one slice, several segments are joined once, and nothing is built
+by repeated concatenation. Whole-document passes read the underlying protobuf
+messages rather than the proto-plus wrappers, which avoids allocating a
+wrapper object for every element visited.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+LAYOUT_KINDS = ("blocks", "paragraphs", "lines", "tokens")
+
+
+def raw_message(message):
+    """
+    Return the underlying protobuf message of a proto-plus wrapper.
+
+    Args:
+        message: proto-plus message or plain protobuf message
+
+    Returns:
+        The protobuf message (the argument itself if it is not a wrapper)
+    """
+    pb = getattr(type(message), "pb", None)
+    return pb(message) if pb is not None else message
+
+
+def anchor_segments(text_anchor) -> List[Tuple[int, int]]:
+    """
+    List the (start_index, end_index) offsets of a text anchor.
+
+    Args:
+        text_anchor: DocumentAI TextAnchor (proto-plus or protobuf)
+    """
+    return [
+        (int(segment.start_index), int(segment.end_index))
+        for segment in text_anchor.text_segments
+    ]
+
+
+def resolve_anchor(text: str, text_anchor) -> str:
+    """
+    Resolve a text anchor to the text it points at.
+
+    Args:
+        text: The full document text
+        text_anchor: DocumentAI TextAnchor with text_segments offsets into text
+
+    Returns:
+        The text of all segments, or the anchor's inline content if it has no segments
+    """
+    segments = text_anchor.text_segments
+    if len(segments) == 1:
+        segment = segments[0]
+        return text[int(segment.start_index):int(segment.end_index)]
+    if not segments:
+        return text_anchor.content
+    return "".join(
+        text[int(segment.start_index):int(segment.end_index)]
+        for segment in segments
+    )
+
+
+class TextAnchorResolver:
+    """Resolves text anchors of one document against its text."""
+
+    def __init__(self, document):
+        """
+        Prepare a resolver for a document.
+
+        Args:
+            document: DocumentAI document object
+        """
+        self._document = raw_message(document)
+        self.text = self._document.text
+
+    def resolve(self, text_anchor) -> str:
+        """
+        Resolve one text anchor of this document.
+
+        Args:
+            text_anchor: DocumentAI TextAnchor
+
+        Returns:
+            The anchored text
+        """
+        return resolve_anchor(self.text, text_anchor)
+
+    def layout_text(self, layout) -> str:
+        """
+        Resolve the text of a layout (e.g. block.layout or form_field.field_name).
+
+        Args:
+            layout: DocumentAI Layout
+        """
+        return resolve_anchor(self.text, layout.text_anchor)
+
+    def page_texts(self) -> List[str]:
+        """
+        Text of every page, in page order.
+
+        Returns:
+            List with one string per page
+        """
+        text = self.text
+        return [
+            resolve_anchor(text, page.layout.text_anchor)
+            for page in self._document.pages
+        ]
+
+    def resolve_layouts(
+        self,
+        kinds: Sequence[str] = ("blocks", "paragraphs", "lines")
+    ) -> Dict[str, List[List[str]]]:
+        """
+        Resolve the text of layout elements of every page in one pass.
+
+        Args:
+            kinds: Page element collections to resolve, any of
+                'blocks', 'paragraphs', 'lines' and 'tokens'
+
+        Returns:
+            Dict mapping each kind to a list (one entry per page) of element texts
+        """
+        unknown = set(kinds) - set(LAYOUT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown layout kinds: {', '.join(sorted(unknown))}")
+
+        text = self.text
+        resolved: Dict[str, List[List[str]]] = {kind: [] for kind in kinds}
+        for page in self._document.pages:
+            for kind in kinds:
+                texts = []
+                for element in getattr(page, kind):
+                    segments = element.layout.text_anchor.text_segments
+                    if len(segments) == 1:
+                        segment = segments[0]
+                        texts.append(text[segment.start_index:segment.end_index])
+                    elif not segments:
+                        texts.append(element.layout.text_anchor.content)
+                    else:
+                        texts.append("".join(
+                            text[segment.start_index:segment.end_index]
+                            for segment in segments
+                        ))
+                resolved[kind].append(texts)
+        return resolved
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Recycling Worker Pool for Long-Lived Document Processors
+
+This module runs DocumentAIProcessor instances in persistent worker
+processes. Long-lived workers slowly accumulate memory from large protobuf
+responses and grpc buffers, so each worker tracks its resident set size (RSS)
+and the number of documents it has processed, and retires itself once either
+crosses a configured threshold. The pool then starts a fresh worker.
+
+The pool hands documents to workers itself, at most `prefetch` at a time
+per worker, and remembers which worker holds which document until its
+result arrives. Workers only retire between documents, and any document a
+retired or dead worker had not answered is handed to another worker, so
+recycling and crashes never drop work. Each worker answers on its own
+pipe, so a worker that dies mid-write cannot block the others.
+
+Running the module directly performs a soak test with synthetic documents
+and prints worker memory over time.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import itertools
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Callable, Tuple, Deque
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of the current process in bytes.
+
+    Uses /proc on Linux and falls back to the peak RSS reported by
+    getrusage elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux/BSD
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _worker_main(
+    processor_factory: Callable[[], Any],
+    tasks,
+    results,
+    max_tasks: Optional[int],
+    max_rss_bytes: Optional[int]
+):
+    """Worker process loop: process documents until told to stop or a limit is hit."""
+    processor = processor_factory()
+    processed = 0
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, kwargs = task
+        try:
+            outcome = (True, processor.process_document(**kwargs))
+        except Exception as e:
+            outcome = (False, f"{type(e).__name__}: {e}")
+        processed += 1
+        rss = current_rss_bytes()
+        retiring = (max_tasks is not None and processed >= max_tasks) or \
+            (max_rss_bytes is not None and rss >= max_rss_bytes)
+        # The retiring flag stops the pool from handing this worker more documents
+        results.send((task_id, outcome, processed, rss, retiring))
+        if retiring:
+            return
+
+
+class _Worker:
+    """Pool-side record of a worker process and the documents handed to it."""
+
+    __slots__ = ("process", "tasks", "results", "assigned", "retiring")
+
+    def __init__(self, process, tasks, results):
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.assigned: List[int] = []
+        self.retiring = False
+
+
+class RecyclingWorkerPool:
+    """Process pool whose workers restart after a task or memory budget."""
+
+    def __init__(
+        self,
+        processor_factory: Callable[[], Any],
+        workers: int = 4,
+        max_tasks_per_child: Optional[int] = 1000,
+        max_rss_mb: Optional[float] = None,
+        max_requeues: int = 1,
+        memory_samples: int = 100000,
+        mp_context: str = "spawn",
+        prefetch: int = 2
+    ):
+        """
+        Start the worker processes.
+
+        Args:
+            processor_factory: Picklable callable returning an object with a
+                process_document(file_path, mime_type) method, e.g.
+                functools.partial(DocumentAIProcessor, project_id=..., ...)
+            workers: Number of worker processes
+            max_tasks_per_child: Documents a worker processes before it is replaced
+            max_rss_mb: RSS ceiling in MiB after which a worker is replaced
+            max_requeues: Times a document is retried after its worker crashed
+            memory_samples: Number of recent per-document RSS samples to keep
+            mp_context: multiprocessing start method ('spawn' is safe with grpc)
+            prefetch: Documents handed to a worker ahead of its results
+        """
+        self.processor_factory = processor_factory
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_rss_bytes = int(max_rss_mb * 1024 * 1024) if max_rss_mb else None
+        self.max_requeues = max_requeues
+
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._processes: Dict[int, _Worker] = {}
+        self._pending: Dict[int, Tuple[Future, Dict[str, Any], int]] = {}
+        # Task IDs waiting for a worker, oldest first
+        self._backlog: Deque[int] = deque()
+        self.prefetch = prefetch
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = False
+
+        self.recycled = 0
+        self.crashed = 0
+        # (timestamp, pid, documents processed by that worker, rss bytes)
+        self.memory_samples: Deque[Tuple[float, int, int, int]] = deque(maxlen=memory_samples)
+
+        with self._lock:
+            for _ in range(workers):
+                self._spawn()
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _spawn(self):
+        """Start a worker process (called with the lock held)."""
+        tasks = self._ctx.Queue()
+        results, results_writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.processor_factory, tasks, results_writer,
+                  self.max_tasks_per_child, self.max_rss_bytes),
+            daemon=True
+        )
+        process.start()
+        # Keep only the child's copy of the write end so EOF follows its exit
+        results_writer.close()
+        self._processes[process.pid] = _Worker(process, tasks, results)
+
+    def _dispatch(self):
+        """Hand backlog documents to workers with free prefetch slots (lock held)."""
+        for worker in self._processes.values():
+            while self._backlog and not worker.retiring and len(worker.assigned) < self.prefetch:
+                task_id = self._backlog.popleft()
+                entry = self._pending.get(task_id)
+                if entry is None:
+                    continue
+                worker.assigned.append(task_id)
+                worker.tasks.put((task_id, entry[1]))
+            if not self._backlog:
+                return
+
+    def _release(self, pid: int, crashed: bool) -> Optional[_Worker]:
+        """
+        Forget a worker and requeue the documents it had not answered (lock held).
+
+        Workers take documents in the order they were handed out, so only the
+        oldest unanswered one can have been in progress when a worker crashed;
+        it uses up one of its requeues and the rest go back unchanged.
+        """
+        worker = self._processes.pop(pid, None)
+        if worker is None:
+            return None
+        for index in range(len(worker.assigned) - 1, -1, -1):
+            task_id = worker.assigned[index]
+            entry = self._pending.get(task_id)
+            if entry is None:
+                continue
+            future, kwargs, requeues = entry
+            crashed_on = crashed and index == 0
+            if crashed_on and requeues >= self.max_requeues:
+                del self._pending[task_id]
+                future.set_exception(RuntimeError(
+                    f"worker {pid} exited with code {worker.process.exitcode}"
+                ))
+                continue
+            self._pending[task_id] = (future, kwargs, requeues + 1 if crashed_on else requeues)
+            self._backlog.appendleft(task_id)
+        worker.assigned.clear()
+        return worker
+
+    def submit(self, file_path: str, mime_type: str = "application/pdf") -> Future:
+        """
+        Queue a document for processing.
+
+        Args:
+            file_path: Path to the document file
+            mime_type: MIME type of the document
+
+        Returns:
+            Future resolving to the process_document result
+        """
+        if self._stopping:
+            raise RuntimeError("cannot submit to a pool that is shutting down")
+        future: Future = Future()
+        kwargs = {"file_path": file_path, "mime_type": mime_type}
+        with self._lock:
+            task_id = next(self._ids)
+            self._pending[task_id] = (future, kwargs, 0)
+            self._backlog.append(task_id)
+            self._dispatch()
+        return future
+
+    def _collect(self):
+        """Resolve futures, replace retired workers and requeue work from crashed ones."""
+        while True:
+            with self._lock:
+                if self._stopping and not self._pending:
+                    return
+                workers = list(self._processes.items())
+            handles = [w.results for _, w in workers] + [w.process.sentinel for _, w in workers]
+            ready = set(wait(handles, timeout=0.5))
+            for pid, worker in workers:
+                if worker.results in ready:
+                    self._drain(pid, worker)
+            for pid, worker in workers:
+                if worker.process.sentinel in ready:
+                    self._reap(pid, worker)
+
+    def _drain(self, pid: int, worker: _Worker):
+        """Resolve the futures of every answer waiting on a worker's pipe."""
+        while True:
+            try:
+                if not worker.results.poll():
+                    return
+                task_id, (ok, value), processed, rss, retiring = worker.results.recv()
+            except (EOFError, OSError):
+                return
+            self.memory_samples.append((time.time(), pid, processed, rss))
+            with self._lock:
+                if task_id in worker.assigned:
+                    worker.assigned.remove(task_id)
+                worker.retiring = worker.retiring or retiring
+                entry = self._pending.pop(task_id, None)
+                self._dispatch()
+            if entry is None:
+                # Already requeued and completed elsewhere
+                continue
+            future = entry[0]
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _reap(self, pid: int, worker: _Worker):
+        """Replace a worker that exited, requeueing whatever it had not answered."""
+        # Answers written just before exiting are still in the pipe
+        self._drain(pid, worker)
+        worker.process.join()
+        retired = worker.retiring and worker.process.exitcode == 0
+        with self._lock:
+            if self._release(pid, crashed=not retired) is None:
+                # Already replaced
+                return
+            if retired:
+                self.recycled += 1
+            else:
+                self.crashed += 1
+            self._spawn()
+            self._dispatch()
+        worker.results.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report pool health.
+
+        Returns:
+            Dict with live workers, pending documents, recycled and crashed
+            worker counts and the latest RSS sample per worker
+        """
+        latest: Dict[int, int] = {}
+        for _, pid, _, rss in list(self.memory_samples)[-4 * self.workers:]:
+            latest[pid] = rss
+        with self._lock:
+            pending = len(self._pending)
+            workers = len(self._processes)
+        return {
+            "workers": workers,
+            "pending": pending,
+            "recycled": self.recycled,
+            "crashed": self.crashed,
+            "rss_bytes": latest,
+        }
+
+    def shutdown(self):
+        """Wait for all submitted documents, then stop the workers."""
+        self._stopping = True
+        self._collector.join()
+        with self._lock:
+            workers = list(self._processes.values())
+            self._processes.clear()
+        for worker in workers:
+            worker.tasks.put(None)
+        for worker in workers:
+            worker.process.join()
+            worker.results.close()
+
+
+class SyntheticProcessor:
+    """Stand-in processor for soak tests that allocates like a real response."""
+
+    def __init__(self, text_kb: int = 64, leak_kb: int = 0):
+        self.text_kb = text_kb
+        self.leak_kb = leak_kb
+        self._leaked: List[bytes] = []
+
+    def process_document(self, file_path: str, mime_type: str = "application/pdf") -> Dict[str, Any]:
+        text = (file_path + " ") * (self.text_kb * 1024 // (len(file_path) + 1))
+        entities = [
+            {"type": "term", "mention_text": text[i:i + 16], "confidence": 0.9}
+            for i in range(0, min(len(text), 16 * 200), 16)
+        ]
+        if self.leak_kb:
+            # Simulates memory that a long-lived client never gives back
+            self._leaked.append(b"\0" * (self.leak_kb * 1024))
+        return {"text": text[:64], "pages": 1, "entities": entities[:3], "mime_type": mime_type}
+
+
+def main():
+    """Soak test: push synthetic documents through a recycling pool and report memory."""
+    parser = argparse.ArgumentParser(
+        description="Soak test for the recycling worker pool"
+    )
+    parser.add_argument("--documents", type=int, default=10000, help="Synthetic documents to process")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    parser.add_argument("--max-tasks-per-child", type=int, default=2000, help="Documents per worker before recycling")
+    parser.add_argument("--max-rss-mb", type=float, default=256.0, help="RSS ceiling per worker in MiB")
+    parser.add_argument("--leak-kb", type=int, default=16, help="Memory each document leaks in the worker")
+    parser.add_argument("--report-every", type=int, default=1000, help="Documents between memory reports")
+    args = parser.parse_args()
+
+    from functools import partial
+
+    pool = RecyclingWorkerPool(
+        partial(SyntheticProcessor, leak_kb=args.leak_kb),
+        workers=args.workers,
+        max_tasks_per_child=args.max_tasks_per_child,
+        max_rss_mb=args.max_rss_mb
+    )
+    started = time.time()
+    futures = [pool.submit(f"synthetic-{i:06d}.txt", "text/plain") for i in range(args.documents)]
+
+    print(f"{'documents':>10} {'elapsed (s)':>12} {'max RSS (MiB)':>14} {'recycled':>9}")
+    for i, future in enumerate(futures, 1):
+        future.result()
+        if i % args.report_every == 0 or i == len(futures):
+            recent = list(pool.memory_samples)[-args.workers * 4:]
+            peak = max(rss for _, _, _, rss in recent) / (1024 * 1024) if recent else 0.0
+            print(f"{i:>10} {time.time() - started:>12.2f} {peak:>14.1f} {pool.recycled:>9}")
+
+    pool.shutdown()
+    print(f"Processed {args.documents} documents, recycled {pool.recycled} workers, "
+          f"{pool.crashed} crashed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())